@@ -1,10 +1,37 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import plotly.graph_objects as go
+import os
 from datetime import datetime, timedelta
 
+from backtest import DEFAULT_PARAMS, STRATEGIES, price_matrix, run_backtest, run_universe_backtest
+from bar_store import BarStore
+from data_layer import RenderData
+from forecasting import ForecastCache, forecast_path, probability_below, trade_levels
+from fundamentals import FundamentalsStore, empty as empty_fundamentals
+from sweep import DEFAULT_SWEEP, heatmap_table, run_sweep
+from incremental import refresh_state
+from indicators import IndicatorCache, last_valid, rolling_volatility
+from instrumentation import METRICS, instrument, note_error, note_miss
+from model_registry import ModelRegistry
+from option_chain import OptionChainStore, synthetic_table
+import portfolio
+import option_strategies
+import options_pricing
+from prefetch import PrefetchScheduler
+from risk import BENCHMARK, RiskCache
+from providers import provider_from_env
+from screener import EXAMPLE_FILTERS, metric_table, screen
+from shared_cache import cached, caches
+from signals import SignalEngine, SignalStore
+from validation import validate
+
+DATA_DIR = os.environ.get(
+    "SMART_TRADE_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".market_data")
+)
+
 # ----------------------- PAGE CONFIG -----------------------
 st.set_page_config(
     page_title="Smart Trade by Prasanth Subrahmanian", 
@@ -271,54 +298,218 @@ body, .main, .block-container {
 st.markdown(custom_css, unsafe_allow_html=True)
 
 # ----------------------- CACHED FUNCTIONS -----------------------
-@st.cache_data(ttl=300)
+MARKET_INDICES = {
+    'NIFTY 50': '^NSEI',
+    'BANK NIFTY': '^NSEBANK',
+    'NIFTY IT': '^CNXIT',
+    'SENSEX': '^BSESN'
+}
+
+@st.cache_resource
+def get_provider():
+    """Market data provider chosen by SMART_TRADE_PROVIDER (yahoo or replay)"""
+    return provider_from_env()
+
+@st.cache_resource
+def get_bar_store():
+    """Process-wide on-disk bar store, shared by every session"""
+    provider = get_provider()
+    return BarStore(os.path.join(DATA_DIR, "bars", provider.name), provider)
+
+@instrument("get_stock_data")
+@cached("get_stock_data", ttl=300, maxsize=1024)
 def get_stock_data(ticker, period="1y"):
+    """Daily bars for ticker, sliced from the local store"""
+    note_miss()
     try:
-        data = yf.download(ticker, period=period, progress=False)
+        data = get_bar_store().get(ticker, period)
         if hasattr(data, 'empty') and data.empty:
+            note_error("no data returned")
             return pd.DataFrame()
         return data
     except Exception as e:
+        note_error(e)
         return pd.DataFrame()
 
-@st.cache_data(ttl=3600)
+def new_render_data():
+    """Per-render facade fetching the data functions concurrently and deduplicated"""
+    return RenderData({"history": get_stock_data, "info": get_stock_info, "quotes": get_quotes})
+
+@st.cache_resource
+def get_indicator_cache():
+    """Process-wide indicator results keyed by ticker and last bar"""
+    return IndicatorCache()
+
+def get_indicators(ticker, period="2y"):
+    """Indicator frame for ticker, recomputed only when a new bar arrives"""
+    return get_indicator_cache().get(ticker, get_stock_data(ticker, period))
+
+def get_indicator_state(ticker):
+    """Streaming indicators of ticker, fed only the bars stored since their last update (None on error)"""
+    try:
+        return refresh_state(get_bar_store(), ticker)
+    except Exception as e:
+        note_error(e, ticker)
+        return None
+
+@st.cache_resource
+def get_model_registry():
+    """Models trained offline by train_models.py"""
+    return ModelRegistry(os.path.join(DATA_DIR, "models", get_provider().name))
+
+def load_registered_model(ticker):
+    """Latest registry model for ticker, memory-mapped; None when there is none"""
+    try:
+        return get_model_registry().load(ticker)
+    except Exception as e:
+        note_error(e, ticker)
+        return None
+
+@st.cache_resource
+def get_forecast_cache():
+    """Process-wide forecasting models, updated incrementally as bars arrive"""
+    return ForecastCache(loader=load_registered_model)
+
+# Bars the forecasting models and signals are computed from
+FORECAST_PERIOD = "5y"
+
+@instrument("get_forecast")
+def get_forecast(ticker, period=FORECAST_PERIOD):
+    """Model forecast for ticker (None with too little history)"""
+    try:
+        return get_forecast_cache().get(ticker, get_stock_data(ticker, period))
+    except Exception as e:
+        note_error(e, ticker)
+        return None
+
+@instrument("get_validation")
+@cached("get_validation", ttl=6 * 3600, maxsize=256)
+def get_validation(ticker, period=FORECAST_PERIOD):
+    """Walk-forward {horizon: metrics} for ticker, from the registry when train_models.py recorded it"""
+    try:
+        metadata = get_model_registry().metadata(ticker) or {}
+        if metadata.get("validation"):
+            return metadata["validation"]
+        note_miss()
+        return validate(get_stock_data(ticker, period))
+    except Exception as e:
+        note_error(e, ticker)
+        return {}
+
+@st.cache_resource
+def get_option_chain_store():
+    """Option-chain snapshots; files matching SMART_TRADE_OPTION_CHAINS (a glob) are ingested at start"""
+    store = OptionChainStore(os.path.join(DATA_DIR, "option_chains", get_provider().name))
+    pattern = os.environ.get("SMART_TRADE_OPTION_CHAINS")
+    if pattern:
+        store.ingest_files(pattern)
+    return store
+
+@instrument("get_synthetic_chain")
+@cached("get_synthetic_chain", ttl=24 * 3600, maxsize=16, copy=False)
+def get_synthetic_chain(ticker, last_bar):
+    """Synthetic daily chain history up to last_bar, kept in memory only (never in the chain store)"""
+    note_miss()
+    return synthetic_table(ticker, get_stock_data(ticker, "2y"))
+
+@instrument("get_option_chain")
+def get_option_chain(ticker):
+    """(ChainTable, synthetic): stored snapshots of ticker, else a synthetic history from its bars"""
+    table = get_option_chain_store().table(ticker)
+    if len(table):
+        return table, False
+    bars = get_stock_data(ticker, "2y")
+    if bars.empty:
+        return table, False
+    return get_synthetic_chain(ticker, bars.index[-1]), True
+
+@st.cache_resource
+def get_fundamentals_store():
+    """Process-wide fundamentals table for the universe, persisted next to the bars"""
+    provider = get_provider()
+    return FundamentalsStore(os.path.join(DATA_DIR, "fundamentals", provider.name), provider)
+
+@instrument("get_stock_info")
 def get_stock_info(ticker):
-    """Get fundamental data for stocks"""
+    """Fundamentals record (P/E, dividend yield, market cap, beta) for stocks"""
+    store = get_fundamentals_store()
+    if not store.is_fresh(ticker):
+        note_miss()
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        return info
-    except:
+        return store.get(ticker)
+    except Exception as e:
+        note_error(e)
+        return empty_fundamentals(ticker)
+
+@instrument("get_quotes")
+@cached("get_quotes", ttl=300, maxsize=64)
+def get_quotes(tickers):
+    """Last close and change vs previous close for many tickers in one batched fetch"""
+    note_miss()
+    try:
+        result = get_bar_store().get_many(list(tickers), period="5d")
+    except Exception as e:
+        note_error(e)
         return {}
+    for ticker, error in result.errors.items():
+        note_error(error, ticker=ticker)
+
+    quotes = {}
+    for ticker, df in result.frames.items():
+        if len(df) > 1:
+            current_price = float(df['Close'].iloc[-1])
+            prev_price = float(df['Close'].iloc[-2])
+            change = current_price - prev_price
+            quotes[ticker] = {
+                'current': current_price,
+                'change': change,
+                'change_pct': (change / prev_price) * 100 if prev_price else 0.0
+            }
+    return quotes
+
+@instrument("get_price_matrix")
+@cached("get_price_matrix", ttl=300, maxsize=16)
+def get_price_matrix(tickers, period="max"):
+    """Aligned (date x ticker) closes for many tickers plus per-ticker load errors"""
+    note_miss()
+    try:
+        result = get_bar_store().get_many(list(tickers), period)
+    except Exception as e:
+        note_error(e)
+        return pd.DataFrame(), {ticker: str(e) for ticker in tickers}
+    for ticker, error in result.errors.items():
+        note_error(error, ticker=ticker)
+    return price_matrix(result.frames), result.errors
+
+def parse_tickers(text):
+    """Tickers from comma/newline separated symbols; .NS is added when no exchange suffix is given"""
+    symbols = [s.strip().upper() for s in text.replace("\n", ",").split(",") if s.strip()]
+    return [s if "." in s or s.startswith("^") else f"{s}.NS" for s in symbols]
+
+@instrument("get_screener_table")
+@cached("get_screener_table", ttl=300, maxsize=8)
+def get_screener_table(tickers):
+    """Ticker x metric table (returns, indicators, fundamentals) plus per-ticker load errors"""
+    note_miss()
+    try:
+        result = get_bar_store().get_many(list(tickers), "2y")
+        store = get_fundamentals_store()
+        store.refresh_many(tickers)
+        table = metric_table(result.frames, store.table(tickers))
+    except Exception as e:
+        note_error(e)
+        return pd.DataFrame(), {ticker: str(e) for ticker in tickers}
+    for ticker, error in result.errors.items():
+        note_error(error, ticker=ticker)
+    return table, result.errors
 
-@st.cache_data(ttl=3600)
+@instrument("get_market_data")
+@cached("get_market_data", ttl=3600, maxsize=4)
 def get_market_data():
     """Get NIFTY, sector data, gainers, losers"""
-    indices = {
-        'NIFTY 50': '^NSEI',
-        'BANK NIFTY': '^NSEBANK',
-        'NIFTY IT': '^CNXIT',
-        'SENSEX': '^BSESN'
-    }
-    
-    data = {}
-    for name, ticker in indices.items():
-        try:
-            df = yf.download(ticker, period='2d', progress=False)
-            if hasattr(df, 'empty') and not df.empty and len(df) > 1:
-                current_price = float(df['Close'].iloc[-1])
-                prev_price = float(df['Close'].iloc[-2])
-                change = current_price - prev_price
-                change_pct = (change / prev_price) * 100
-                
-                data[name] = {
-                    'current': current_price,
-                    'change': change,
-                    'change_pct': change_pct
-                }
-        except Exception as e:
-            continue
-    return data
+    note_miss()
+    quotes = get_quotes(tuple(MARKET_INDICES.values()))
+    return {name: quotes[ticker] for name, ticker in MARKET_INDICES.items() if ticker in quotes}
 
 # ----------------------- NEW FUNCTIONS FOR TOOLS PAGES -----------------------
 def get_market_intelligence():
@@ -345,14 +536,70 @@ def get_market_news():
         {'title': 'Infrastructure Projects Boost Market', 'source': 'Financial Express', 'impact': 'Positive', 'time': '8 hours ago'}
     ]
 
+@st.cache_resource
+def get_signal_store():
+    """Latest signal per ticker, persisted next to the bars"""
+    return SignalStore(os.path.join(DATA_DIR, "signals", get_provider().name))
+
+def interactive_busy():
+    """True while a data load or a forecast model update is in flight"""
+    return any(cache.busy() for cache in caches().values()) or get_forecast_cache().busy()
+
+@st.cache_resource
+def get_signal_engine():
+    """Signal engine over the forecasting models; run by the prefetcher after each refresh"""
+    return SignalEngine(get_signal_store(), lambda t: get_stock_data(t, FORECAST_PERIOD),
+                        lambda t, df: get_forecast_cache().get(t, df), busy=interactive_busy)
+
 def get_ai_signals():
-    """AI Trading Signals"""
-    return {
-        'RELIANCE': {'signal': 'BUY', 'confidence': '85%', 'target': '₹2,800', 'stop_loss': '₹2,450'},
-        'TCS': {'signal': 'HOLD', 'confidence': '72%', 'target': '₹3,500', 'stop_loss': '₹3,200'},
-        'HDFC BANK': {'signal': 'BUY', 'confidence': '78%', 'target': '₹1,750', 'stop_loss': '₹1,600'},
-        'INFOSYS': {'signal': 'SELL', 'confidence': '65%', 'target': '₹1,450', 'stop_loss': '₹1,600'}
-    }
+    """AI Trading Signals for the universe, strongest first, from the signal store"""
+    store, engine = get_signal_store(), get_signal_engine()
+    if len(store) == 0 and engine.last_run is None:
+        # First start without a prefetched store: fill it in the background
+        engine.start(list(stocks.values()))
+    return store.table()
+
+HOLDINGS_PATH = os.environ.get("SMART_TRADE_HOLDINGS", os.path.join(DATA_DIR, "portfolio", "holdings.csv"))
+
+def load_holdings(upload=None):
+    """(lots, source) from an uploaded CSV, else the holdings file, else the sample portfolio"""
+    if upload is not None:
+        return portfolio.read_holdings(upload), upload.name
+    if os.path.exists(HOLDINGS_PATH):
+        return portfolio.read_holdings(HOLDINGS_PATH), HOLDINGS_PATH
+    return portfolio.SAMPLE_HOLDINGS.copy(), None
+
+def save_holdings(lots):
+    """Write lots to the holdings file used on the next start"""
+    os.makedirs(os.path.dirname(HOLDINGS_PATH), exist_ok=True)
+    tmp_path = f"{HOLDINGS_PATH}.{os.getpid()}.tmp"
+    lots.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, HOLDINGS_PATH)
+
+def value_portfolio(lots):
+    """PortfolioSummary of lots priced with one batched quotes fetch"""
+    quotes = pd.DataFrame.from_dict(get_quotes(tuple(sorted(lots["ticker"].unique()))), orient="index")
+    if quotes.empty:
+        quotes = pd.DataFrame(columns=["current", "change"], dtype=float)
+    return portfolio.value(lots, quotes["current"], quotes["current"] - quotes["change"])
+
+RISK_PERIOD = "5y"
+
+@st.cache_resource
+def get_risk_cache():
+    """Process-wide return moments per holdings set, updated as new bars arrive"""
+    return RiskCache(benchmark=BENCHMARK)
+
+@instrument("get_portfolio_risk")
+def get_portfolio_risk(tickers, values):
+    """RiskReport of positions (tickers and current values) from the cached 5y price matrix, or None"""
+    weights = pd.Series(values, index=list(tickers), dtype=float)
+    close, _ = get_price_matrix(tuple(sorted(set(tickers) | {BENCHMARK})), RISK_PERIOD)
+    try:
+        return get_risk_cache().get(close, weights)
+    except Exception as e:
+        note_error(e)
+        return None
 
 # ----------------------- SESSION STATE -----------------------
 if 'current_section' not in st.session_state:
@@ -370,10 +617,10 @@ st.markdown('<div class="main-header">SMART TRADE PRO</div>', unsafe_allow_html=
 st.markdown('<div class="main-subtitle">by <em>Prasanth Subrahmanian</em> | Advanced Trading Analytics Platform</div>', unsafe_allow_html=True)
 
 # ----------------------- MAIN NAVIGATION -----------------------
-nav_options = ["🏠 Dashboard", "📈 Market Analysis", "🤖 AI Predictions", "💹 Options Trading", "📊 Portfolio", "🔍 Backtesting"]
-nav_labels = ["Home", "Market Trends", "AI Predictions", "Options Trading", "Portfolio Insights", "Backtesting"]
+nav_options = ["🏠 Dashboard", "📈 Market Analysis", "🤖 AI Predictions", "💹 Options Trading", "📊 Portfolio", "🔍 Backtesting", "🔎 Screener"]
+nav_labels = ["Home", "Market Trends", "AI Predictions", "Options Trading", "Portfolio Insights", "Backtesting", "Screener"]
 
-nav_cols = st.columns(6)
+nav_cols = st.columns(len(nav_options))
 for i, (col, option) in enumerate(zip(nav_cols, nav_options)):
     with col:
         btn_type = "primary" if st.session_state.current_section == nav_labels[i] else "secondary"
@@ -423,6 +670,44 @@ stocks = {
     "MSFT": "MSFT"
 }
 
+# ----------------------- BACKGROUND PREFETCH -----------------------
+# Periods the pages read through get_stock_data, kept warm by the prefetcher
+PREFETCH_PERIODS = ("1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", FORECAST_PERIOD)
+
+def warm_market_data(tickers):
+    """Refresh tickers upstream in one batch, reload their cached views, advance their streaming
+    indicators and recompute their signals"""
+    errors = get_bar_store().refresh_many(tickers, force=True)
+    get_fundamentals_store().refresh_many(tickers)
+    for ticker in tickers:
+        if ticker not in errors:
+            for period in PREFETCH_PERIODS:
+                get_stock_data.refresh(ticker, period)
+            # O(new bars) per ticker, persisted next to the bars
+            get_indicator_state(ticker)
+    index_tickers = tuple(MARKET_INDICES.values())
+    if set(index_tickers) & set(tickers):
+        get_quotes.refresh(index_tickers)
+        get_market_data.refresh()
+    # Model updates give way to interactive renders between tickers
+    get_signal_engine().run([t for t in tickers if t not in errors], background=True)
+    return errors
+
+@st.cache_resource
+def get_prefetcher():
+    """Process-wide scheduler keeping the indices and stocks warm (SMART_TRADE_PREFETCH=0 disables it)"""
+    scheduler = PrefetchScheduler(
+        warm_market_data,
+        list(MARKET_INDICES.values()) + list(stocks.values()),
+        interval=int(os.environ.get("SMART_TRADE_PREFETCH_INTERVAL", "300")),
+        busy=interactive_busy
+    )
+    if os.environ.get("SMART_TRADE_PREFETCH", "1") == "1":
+        scheduler.start()
+    return scheduler
+
+get_prefetcher()
+
 # Stock selection available on all pages except Home
 if st.session_state.current_section != "Home":
     col1, col2, col3 = st.columns([1, 1, 1])
@@ -772,6 +1057,9 @@ def show_market_news():
         </div>
         """, unsafe_allow_html=True)
 
+# Signals shown as cards; the rest are in the table
+SIGNAL_CARDS = 8
+
 def show_ai_signals():
     """AI Signals Page"""
     st.markdown(
@@ -783,17 +1071,29 @@ def show_ai_signals():
     )
     
     signals_data = get_ai_signals()
+    if get_signal_engine().running:
+        st.info(f"Generating signals for the universe in the background: {len(signals_data)} of "
+                f"{len(stocks)} ready. Rerun the page to see more.")
+    if signals_data.empty:
+        if not get_signal_engine().running:
+            st.warning("No signals available yet.")
+        return
+    names = {t: name for name, t in stocks.items()}
+    
+    generated = signals_data["generated"].max()
+    st.caption(f"{len(signals_data)} tickers | updated {generated:%Y-%m-%d %H:%M} UTC | "
+               f"refreshed in the background with market data")
     
     # AI Signals Dashboard
     st.markdown("### 🎯 Live Trading Signals")
     
-    for stock, signal in signals_data.items():
+    for ticker_symbol, signal in signals_data.head(SIGNAL_CARDS).iterrows():
         signal_color = '#00ffcc' if signal['signal'] == 'BUY' else '#ff6b6b' if signal['signal'] == 'SELL' else '#ffa726'
         
         st.markdown(f"""
         <div class="feature-card">
             <div style="display: flex; justify-content: between; align-items: center; margin-bottom: 1rem;">
-                <div style="font-weight: 700; color: #ffffff; font-size: 1.2rem;">{stock}</div>
+                <div style="font-weight: 700; color: #ffffff; font-size: 1.2rem;">{names.get(ticker_symbol, ticker_symbol)}</div>
                 <div style="background: {signal_color}; color: #0a0f2d; padding: 0.4rem 1rem; border-radius: 20px; font-weight: 800;">
                     {signal['signal']}
                 </div>
@@ -801,32 +1101,50 @@ def show_ai_signals():
             <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 1rem;">
                 <div>
                     <div style="color: #88aaff; font-size: 0.9rem;">Confidence</div>
-                    <div style="color: #ffffff; font-weight: 600;">{signal['confidence']}</div>
+                    <div style="color: #ffffff; font-weight: 600;">{signal['confidence']:.0%}</div>
                 </div>
                 <div>
                     <div style="color: #88aaff; font-size: 0.9rem;">Target</div>
-                    <div style="color: #00ffcc; font-weight: 600;">{signal['target']}</div>
+                    <div style="color: #00ffcc; font-weight: 600;">₹{signal['target']:,.0f}</div>
                 </div>
                 <div>
                     <div style="color: #88aaff; font-size: 0.9rem;">Stop Loss</div>
-                    <div style="color: #ff6b6b; font-weight: 600;">{signal['stop_loss']}</div>
+                    <div style="color: #ff6b6b; font-weight: 600;">₹{signal['stop_loss']:,.0f}</div>
                 </div>
             </div>
         </div>
         """, unsafe_allow_html=True)
     
+    with st.expander(f"All signals ({len(signals_data)})"):
+        st.dataframe(pd.DataFrame({
+            "Name": [names.get(t, t) for t in signals_data.index],
+            "Signal": signals_data["signal"],
+            "Score": signals_data["score"].round(2),
+            "Confidence": (signals_data["confidence"] * 100).round(0),
+            "Price": signals_data["price"].round(2),
+            "Target": signals_data["target"].round(2),
+            "Stop Loss": signals_data["stop_loss"].round(2),
+            "Exp. Return 1M %": (signals_data["expected_return"] * 100).round(2),
+            "RSI": signals_data["rsi"].round(1),
+            "Bar": signals_data["bar_time"].dt.date,
+        }), use_container_width=True)
+    
     # AI Model Performance
     st.markdown("### 📊 Model Performance")
     
+    counts = signals_data["signal"].value_counts()
+    buys = signals_data[signals_data["signal"] == "BUY"]
     perf_cols = st.columns(4)
     with perf_cols[0]:
-        st.metric("Accuracy", "78.5%", "+2.3%")
+        st.metric("Accuracy", f"{signals_data['accuracy'].mean() * 100:.1f}%", "next-week hit rate", delta_color="off")
     with perf_cols[1]:
-        st.metric("Win Rate", "72.8%", "+1.5%")
+        st.metric("Buy / Sell", f"{counts.get('BUY', 0)} / {counts.get('SELL', 0)}", f"{counts.get('HOLD', 0)} hold",
+                  delta_color="off")
     with perf_cols[2]:
-        st.metric("Avg Return", "15.2%", "+0.8%")
+        avg_return = buys["expected_return"].mean() * 100 if not buys.empty else 0.0
+        st.metric("Avg Expected Return", f"{avg_return:.1f}%", "BUY signals, 1 month", delta_color="off")
     with perf_cols[3]:
-        st.metric("Sharpe Ratio", "1.45", "+0.12")
+        st.metric("Avg Confidence", f"{signals_data['confidence'].mean() * 100:.1f}%")
 
 # ----------------------- MARKET TRENDS PAGE -----------------------
 def show_market_trends():
@@ -839,19 +1157,27 @@ def show_market_trends():
         unsafe_allow_html=True,
     )
     
+    period_map = {
+        "1D": "5d",
+        "1W": "1mo", 
+        "1M": "3mo",
+        "3M": "6mo",
+        "6M": "1y",
+        "1Y": "2y"
+    }
+    selected_period = period_map.get(timeframe, "3mo")
+    is_index = stock_name in ["NIFTY 50", "BANK NIFTY", "NIFTY IT", "SENSEX"]
+    
+    # Price history, the indicator history and fundamentals are fetched
+    # concurrently, so a cold ticker costs the slowest fetch, not the sum
+    requests = {"prices": ("history", ticker, selected_period), "indicators": ("history", ticker, "2y")}
+    if not is_index:
+        requests["info"] = ("info", ticker)
+    page_data = new_render_data().fetch(requests)
+    
     # Current Price Overview
     try:
-        period_map = {
-            "1D": "5d",
-            "1W": "1mo", 
-            "1M": "3mo",
-            "3M": "6mo",
-            "6M": "1y",
-            "1Y": "2y"
-        }
-        
-        selected_period = period_map.get(timeframe, "3mo")
-        df = get_stock_data(ticker, selected_period)
+        df = page_data["prices"]
         
         # Simple and clear DataFrame check
         if df is not None and hasattr(df, 'empty') and not df.empty and len(df) > 1:
@@ -894,26 +1220,26 @@ def show_market_trends():
         st.error(f"Error loading price data: {str(e)}")
     
     # Fundamental Data for Stocks (not indices)
-    if stock_name not in ["NIFTY 50", "BANK NIFTY", "NIFTY IT", "SENSEX"]:
+    if not is_index:
         st.markdown("### 📊 Fundamental Analysis")
         
-        stock_info = get_stock_info(ticker)
-        if stock_info:
+        stock_info = page_data["info"]
+        if pd.notna(stock_info.updated):
             fund_cols = st.columns(4)
             with fund_cols[0]:
-                pe_ratio = stock_info.get('trailingPE', 'N/A')
-                st.metric("P/E Ratio", f"{pe_ratio}" if pe_ratio != 'N/A' else "N/A")
+                pe_ratio = stock_info.trailingPE
+                st.metric("P/E Ratio", f"{pe_ratio:.2f}" if pd.notna(pe_ratio) else "N/A")
             
             with fund_cols[1]:
-                dividend_yield = stock_info.get('dividendYield', 'N/A')
-                if dividend_yield != 'N/A' and dividend_yield is not None:
+                dividend_yield = stock_info.dividendYield
+                if pd.notna(dividend_yield):
                     st.metric("Dividend Yield", f"{dividend_yield*100:.2f}%")
                 else:
                     st.metric("Dividend Yield", "N/A")
             
             with fund_cols[2]:
-                market_cap = stock_info.get('marketCap', 'N/A')
-                if market_cap != 'N/A' and market_cap is not None:
+                market_cap = stock_info.marketCap
+                if pd.notna(market_cap):
                     if market_cap > 1e12:
                         st.metric("Market Cap", f"₹{market_cap/1e12:.2f}T")
                     elif market_cap > 1e9:
@@ -924,25 +1250,15 @@ def show_market_trends():
                     st.metric("Market Cap", "N/A")
             
             with fund_cols[3]:
-                beta = stock_info.get('beta', 'N/A')
-                st.metric("Beta", f"{beta}" if beta != 'N/A' else "N/A")
+                beta = stock_info.beta
+                st.metric("Beta", f"{beta:.2f}" if pd.notna(beta) else "N/A")
     
     # Advanced Charting - CHANGED TO LINE GRAPH
     st.markdown(f"### 📊 {stock_name} Price Chart")
     
     try:
-        # Get chart data
-        chart_period_map = {
-            "1D": "5d",
-            "1W": "1mo", 
-            "1M": "3mo",
-            "3M": "6mo",
-            "6M": "1y",
-            "1Y": "2y"
-        }
-        
-        selected_chart_period = chart_period_map.get(timeframe, "3mo")
-        df_chart = get_stock_data(ticker, selected_chart_period)
+        # Chart uses the same period as the price overview
+        df_chart = page_data["prices"]
         
         # Simple and clear data validation
         if (df_chart is not None and 
@@ -967,24 +1283,19 @@ def show_market_trends():
                 fillcolor='rgba(0, 212, 255, 0.1)'
             ))
             
-            # Simple moving average calculation
-            if len(df_chart) > 20:
-                try:
-                    ma20 = df_chart['Close'].rolling(window=20).mean()
-                    # Use .any() instead of ambiguous boolean
-                    if ma20.notna().any():
-                        fig.add_trace(go.Scatter(
-                            x=df_chart.index, 
-                            y=ma20, 
-                            mode='lines', 
-                            name='MA20',
-                            line=dict(color='#ff6b6b', width=2, dash='dash')
-                        ))
-                except:
-                    pass
+            # Indicators come from the shared engine, computed once per new bar
+            indicator_df = get_indicators(ticker).reindex(df_chart.index)
+            ma20 = indicator_df['sma20'] if 'sma20' in indicator_df else pd.Series(dtype=float)
+            if ma20.notna().any():
+                fig.add_trace(go.Scatter(
+                    x=df_chart.index, 
+                    y=ma20, 
+                    mode='lines', 
+                    name='MA20',
+                    line=dict(color='#ff6b6b', width=2, dash='dash')
+                ))
             
             # Chart layout
-            is_index = stock_name in ["NIFTY 50", "BANK NIFTY", "NIFTY IT", "SENSEX"]
             chart_title = f"{stock_name} - {timeframe} Price Chart"
             y_axis_title = "Index Value" if is_index else "Price (₹)"
             
@@ -1009,67 +1320,75 @@ def show_market_trends():
             st.markdown("### 🔧 Technical Indicators")
             
             tech_cols = st.columns(4)
+            close = df_chart['Close'].to_numpy(dtype=float)
+            latest = {name: last_valid(indicator_df[name]) for name in indicator_df.columns}
+            # Latest values from the streaming state, which follows the forming bar in O(1)
+            state = get_indicator_state(ticker)
+            if state is not None:
+                latest.update({name: value for name, value in state.values().items() if not np.isnan(value)})
             
             with tech_cols[0]:
-                # Simple RSI calculation
-                try:
-                    if len(df_chart) > 14:
-                        delta = df_chart['Close'].diff()
-                        gain = (delta.where(delta > 0, 0)).fillna(0)
-                        loss = (-delta.where(delta < 0, 0)).fillna(0)
-                        avg_gain = gain.rolling(window=14).mean()
-                        avg_loss = loss.rolling(window=14).mean()
-                        rs = avg_gain / avg_loss
-                        rsi = 100 - (100 / (1 + rs))
-                        current_rsi = float(rsi.iloc[-1]) if not pd.isna(rsi.iloc[-1]) else 50
-                    else:
-                        current_rsi = 50
-                except:
-                    current_rsi = 50
-                
+                current_rsi = latest.get('rsi14', np.nan)
+                current_rsi = 50 if np.isnan(current_rsi) else current_rsi
                 rsi_status = "Overbought" if current_rsi > 70 else "Oversold" if current_rsi < 30 else "Neutral"
                 st.metric("RSI (14)", f"{current_rsi:.1f}", rsi_status)
                 
             with tech_cols[1]:
-                # Simple trend detection
-                try:
-                    if len(df_chart) > 5:
-                        recent_prices = df_chart['Close'].tail(5)
-                        trend = "Bullish" if recent_prices.iloc[-1] > recent_prices.iloc[0] else "Bearish"
-                    else:
-                        trend = "Neutral"
-                except:
+                # Direction over the last 5 bars
+                if len(close) > 5:
+                    trend = "Bullish" if close[-1] > close[-5] else "Bearish"
+                else:
                     trend = "Neutral"
-                
                 st.metric("Trend", trend, "")
                 
             with tech_cols[2]:
-                # Volume indicator
-                try:
-                    if 'Volume' in df_chart.columns:
-                        current_vol = float(df_chart['Volume'].iloc[-1])
-                        avg_vol = float(df_chart['Volume'].mean())
-                        vol_ratio = current_vol / avg_vol if avg_vol > 0 else 1
-                        st.metric("Volume", f"{vol_ratio:.1f}x", "High" if vol_ratio > 1.5 else "Normal")
-                    else:
-                        st.metric("Volume", "N/A", "")
-                except:
+                volume = df_chart['Volume'].to_numpy(dtype=float) if 'Volume' in df_chart.columns else np.array([])
+                avg_vol = float(np.nanmean(volume)) if len(volume) else 0.0
+                if avg_vol > 0:
+                    vol_ratio = volume[-1] / avg_vol
+                    st.metric("Volume", f"{vol_ratio:.1f}x", "High" if vol_ratio > 1.5 else "Normal")
+                else:
                     st.metric("Volume", "N/A", "")
                 
             with tech_cols[3]:
-                # Simple volatility
-                try:
-                    if len(df_chart) > 1:
-                        daily_returns = df_chart['Close'].pct_change().dropna()
-                        if len(daily_returns) > 0:
-                            vol = float(daily_returns.std() * 100)
-                            st.metric("Volatility", f"{vol:.1f}%", "High" if vol > 2 else "Low")
-                        else:
-                            st.metric("Volatility", "N/A", "")
-                    else:
-                        st.metric("Volatility", "N/A", "")
-                except:
+                # 20-day volatility of daily returns
+                vol = latest.get('volatility20', np.nan) * 100
+                if np.isnan(vol):
                     st.metric("Volatility", "N/A", "")
+                else:
+                    st.metric("Volatility", f"{vol:.1f}%", "High" if vol > 2 else "Low")
+            
+            ext_cols = st.columns(4)
+            
+            with ext_cols[0]:
+                macd_hist = latest.get('macd_hist', np.nan)
+                if np.isnan(macd_hist):
+                    st.metric("MACD Hist", "N/A", "")
+                else:
+                    st.metric("MACD Hist", f"{macd_hist:+.2f}", "Bullish" if macd_hist > 0 else "Bearish")
+            
+            with ext_cols[1]:
+                band_width = latest.get('bb_upper', np.nan) - latest.get('bb_lower', np.nan)
+                if np.isnan(band_width) or band_width <= 0:
+                    st.metric("Bollinger %B", "N/A", "")
+                else:
+                    percent_b = (close[-1] - latest['bb_lower']) / band_width
+                    band_status = "Above Upper" if percent_b > 1 else "Below Lower" if percent_b < 0 else "Inside Bands"
+                    st.metric("Bollinger %B", f"{percent_b:.2f}", band_status)
+            
+            with ext_cols[2]:
+                current_atr = latest.get('atr14', np.nan)
+                if np.isnan(current_atr):
+                    st.metric("ATR (14)", "N/A", "")
+                else:
+                    st.metric("ATR (14)", f"{current_atr:,.2f}", f"{current_atr / close[-1] * 100:.1f}% of price")
+            
+            with ext_cols[3]:
+                current_ema = latest.get('ema20', np.nan)
+                if np.isnan(current_ema):
+                    st.metric("EMA (20)", "N/A", "")
+                else:
+                    st.metric("EMA (20)", f"{current_ema:,.2f}", "Price Above" if close[-1] > current_ema else "Price Below")
                     
         else:
             st.warning(f"Chart data not available for {stock_name}. Trying fallback data...")
@@ -1129,79 +1448,126 @@ def show_ai_predictions():
         unsafe_allow_html=True,
     )
     
-    # Current price
-    current_price = 2500
-    try:
-        df = get_stock_data(ticker, "1mo")
-        if df is not None and hasattr(df, 'empty') and not df.empty and len(df) > 0:
-            current_price = float(df['Close'].iloc[-1])
-            st.info(f"{stock_name} Current Price: ₹{current_price:.2f}")
-    except:
-        current_price = 2500
-    
+    forecast = get_forecast(ticker)
+    if forecast is None or not forecast.horizons:
+        st.warning(f"Not enough price history to train a forecast for {stock_name}.")
+        return
+    current_price = forecast.price
+    st.info(f"{stock_name} Current Price: ₹{current_price:.2f}")
+
     # AI Predictions Dashboard
     st.markdown("### 🎯 Price Forecast Dashboard")
-    
+
+    validation = get_validation(ticker)
     pred_cols = st.columns(3)
-    with pred_cols[0]:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown('<div class="feature-icon">📅</div>', unsafe_allow_html=True)
-        st.markdown('<div class="feature-title">Next Week</div>', unsafe_allow_html=True)
-        st.metric("Target Price", f"₹{current_price * 1.025:.2f}", "+2.5%")
-        st.markdown('<div class="confidence-text">Confidence: 78%</div>', unsafe_allow_html=True)
-        st.progress(78)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    with pred_cols[1]:
-        st.markdown('<div class="feature-card">', unsafe_allow_html=True)
-        st.markdown('<div class="feature-icon">📊</div>', unsafe_allow_html=True)
-        st.markdown('<div class="feature-title">Next Month</div>', unsafe_allow_html=True)
-        st.metric("Target Price", f"₹{current_price * 1.068:.2f}", "+6.8%")
-        st.markdown('<div class="confidence-text">Confidence: 72%</div>', unsafe_allow_html=True)
-        st.progress(72)
-        st.markdown('</div>', unsafe_allow_html=True)
-    
+    for col, (icon, title, horizon) in zip(pred_cols, [("📅", "Next Week", "next_week"),
+                                                       ("📊", "Next Month", "next_month")]):
+        h = forecast.horizons[horizon]
+        # Walk-forward hit rate and MAE; the model's running scores until validation is available
+        stats = validation.get(horizon) or {"hit_rate": h["hit_rate"], "mae": h["mae"]}
+        confidence = 0 if np.isnan(stats["hit_rate"]) else int(round(stats["hit_rate"] * 100))
+        error = "" if np.isnan(stats["mae"]) else f', ±{stats["mae"] * 100:.1f}% MAE'
+        with col:
+            st.markdown('<div class="feature-card">', unsafe_allow_html=True)
+            st.markdown(f'<div class="feature-icon">{icon}</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="feature-title">{title}</div>', unsafe_allow_html=True)
+            st.metric("Target Price", f"₹{h['price']:.2f}", f"{h['return'] * 100:+.1f}%")
+            st.markdown(f'<div class="confidence-text">Confidence: {confidence}% '
+                        f'(directional hit rate{error})</div>', unsafe_allow_html=True)
+            st.progress(confidence)
+            st.markdown('</div>', unsafe_allow_html=True)
+
     with pred_cols[2]:
+        volatility = forecast.volatility
+        risk_level = "LOW" if volatility < 0.20 else "MEDIUM" if volatility < 0.35 else "HIGH"
+        drawdown_risk = probability_below(forecast, "next_month", -0.05)
+        drawdown_risk = 0 if np.isnan(drawdown_risk) else int(round(drawdown_risk * 100))
         st.markdown('<div class="feature-card">', unsafe_allow_html=True)
         st.markdown('<div class="feature-icon">🎯</div>', unsafe_allow_html=True)
         st.markdown('<div class="feature-title">Risk Assessment</div>', unsafe_allow_html=True)
-        st.metric("Risk Level", "LOW", "-15%")
-        st.markdown('<div class="confidence-text">Drawdown Risk: 25%</div>', unsafe_allow_html=True)
-        st.progress(25)
+        st.metric("Risk Level", risk_level, f"{volatility * 100:.0f}% annual volatility", delta_color="off")
+        st.markdown(f'<div class="confidence-text">Drawdown Risk (>5% in a month): {drawdown_risk}%</div>',
+                    unsafe_allow_html=True)
+        st.progress(drawdown_risk)
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
+    if validation:
+        with st.expander("🔬 Walk-forward validation"):
+            table = pd.DataFrame.from_dict(validation, orient='index')
+            st.dataframe(pd.DataFrame({
+                "Samples": table["samples"],
+                "Hit Rate": (table["hit_rate"] * 100).map("{:.1f}%".format),
+                "MAE": (table["mae"] * 100).map("{:.2f}%".format),
+                "Naive MAE": (table["baseline_mae"] * 100).map("{:.2f}%".format),
+                "±1σ Coverage": (table["coverage"] * 100).map("{:.0f}%".format),
+            }), use_container_width=True)
+            st.caption("Out-of-sample scores of models retrained on expanding windows and tested on the "
+                       "following month. Naive MAE predicts a zero return; a calibrated ±1σ band covers about 68%.")
+
+            # Calibration: realized vs predicted return per predicted-return quintile
+            fig = go.Figure()
+            for horizon, metrics in validation.items():
+                bins = pd.DataFrame(metrics.get("calibration") or [])
+                if bins.empty:
+                    continue
+                fig.add_trace(go.Scatter(
+                    x=bins["predicted"] * 100, y=bins["realized"] * 100, mode="lines+markers",
+                    name=horizon.replace("_", " ").title(),
+                    customdata=np.column_stack([bins["hit_rate"] * 100, bins["samples"]]),
+                    hovertemplate="Predicted %{x:.2f}%<br>Realized %{y:.2f}%<br>"
+                                  "Hit rate %{customdata[0]:.0f}% (%{customdata[1]} samples)<extra></extra>"))
+            if fig.data:
+                edge = max(max(abs(np.concatenate([t.x, t.y]))) for t in fig.data)
+                fig.add_trace(go.Scatter(x=[-edge, edge], y=[-edge, edge], mode="lines", name="Perfect",
+                                         line=dict(color="#888", dash="dot")))
+                fig.update_layout(title=dict(text="Calibration by Horizon", font=dict(color='#00d4ff')),
+                                  template="plotly_dark", height=320, xaxis_title="Mean predicted return (%)",
+                                  yaxis_title="Mean realized return (%)")
+                st.plotly_chart(fig, use_container_width=True)
+                st.caption("Out-of-sample predictions split into five equal-count bins by predicted return. "
+                           "Points on the dotted line are calibrated; a flatter line means overconfident forecasts.")
+
     # Stop Loss and Risk Management
     st.markdown("### 🛡 Risk Management")
-    
+
+    stop_loss, target_1, target_2 = trade_levels(forecast)
     risk_cols = st.columns(4)
     with risk_cols[0]:
-        stop_loss = current_price * 0.95
-        st.metric("Stop Loss", f"₹{stop_loss:.2f}", "-5.0%")
-    
+        st.metric("Stop Loss", f"₹{stop_loss:.2f}", f"{(stop_loss / current_price - 1) * 100:+.1f}% (2 ATR)")
+
     with risk_cols[1]:
-        target_1 = current_price * 1.08
-        st.metric("Target 1", f"₹{target_1:.2f}", "+8.0%")
-    
+        st.metric("Target 1", f"₹{target_1:.2f}", f"{(target_1 / current_price - 1) * 100:+.1f}%")
+
     with risk_cols[2]:
-        target_2 = current_price * 1.15
-        st.metric("Target 2", f"₹{target_2:.2f}", "+15.0%")
-    
+        st.metric("Target 2", f"₹{target_2:.2f}", f"{(target_2 / current_price - 1) * 100:+.1f}%")
+
     with risk_cols[3]:
-        risk_reward = (target_1 - current_price) / (current_price - stop_loss)
-        st.metric("Risk/Reward", f"{risk_reward:.2f}:1", "Good" if risk_reward > 1.5 else "Fair")
-    
+        risk = current_price - stop_loss
+        risk_reward = (target_1 - current_price) / risk if risk > 0 else 0.0
+        st.metric("Risk/Reward", f"{risk_reward:.2f}:1",
+                  "Good" if risk_reward > 1.5 else "Fair" if risk_reward > 1 else "Poor")
+
     # Prediction Chart
     st.markdown("### 📈 AI Prediction Chart")
-    
+
     try:
-        # Create prediction chart
-        dates = pd.date_range(start=datetime.now(), periods=30, freq='D')
-        # Mock prediction data
-        base_price = current_price
-        predictions = [base_price * (1 + 0.002 * i + np.random.normal(0, 0.01)) for i in range(30)]
-        
+        days, predictions, lower, upper = forecast_path(forecast)
+        last_date = forecast.version[1]
+        dates = pd.bdate_range(start=last_date, periods=len(days))
+
         fig = go.Figure()
-        
+
+        # Confidence band (one RMSE either side)
+        fig.add_trace(go.Scatter(
+            x=list(dates) + list(dates[::-1]),
+            y=list(upper) + list(lower[::-1]),
+            fill='toself',
+            fillcolor='rgba(255, 167, 38, 0.15)',
+            line=dict(width=0),
+            hoverinfo='skip',
+            name='±1 RMSE'
+        ))
+
         # Current price line
         fig.add_trace(go.Scatter(
             x=[dates[0]], 
@@ -1210,7 +1576,7 @@ def show_ai_predictions():
             name='Current Price',
             marker=dict(color='#00d4ff', size=10)
         ))
-        
+
         # Prediction line
         fig.add_trace(go.Scatter(
             x=dates, 
@@ -1219,28 +1585,29 @@ def show_ai_predictions():
             name='AI Prediction',
             line=dict(color='#ffa726', width=2.5, dash='dot')
         ))
-        
+
         # Stop loss line
         fig.add_hline(y=stop_loss, line_dash="dash", line_color="#ff6b6b", 
                      annotation_text="Stop Loss", annotation_position="bottom right")
-        
+
         # Target lines
         fig.add_hline(y=target_1, line_dash="dash", line_color="#00d4ff",
                      annotation_text="Target 1", annotation_position="top right")
         fig.add_hline(y=target_2, line_dash="dash", line_color="#0099ff",
                      annotation_text="Target 2", annotation_position="top right")
-        
+
         fig.update_layout(
-            title=dict(text=f"AI Price Prediction for {stock_name} (Next 30 Days)", font=dict(color='#00d4ff')),
+            title=dict(text=f"AI Price Prediction for {stock_name} (Next {len(days) - 1} Trading Days)",
+                       font=dict(color='#00d4ff')),
             template="plotly_dark",
             height=350,
             showlegend=True,
             xaxis_title="Date",
             yaxis_title="Price (₹)"
         )
-        
+
         st.plotly_chart(fig, use_container_width=True)
-        
+
     except Exception as e:
         st.error(f"Error generating prediction chart: {str(e)}")
 
@@ -1265,17 +1632,133 @@ def show_options_trading():
     except:
         current_price = 2500
     
+    chain_table, synthetic = get_option_chain(ticker)
+    snapshot = chain_table.snapshot()
+    previous = chain_table.snapshot(snapshot.timestamp - pd.Timedelta(microseconds=1)) if snapshot else None
+    iv_stats = chain_table.iv_stats() if snapshot else None
+    
     # Options Overview
     st.markdown("### 📊 Options Overview")
-    overview_cols = st.columns(4)
-    with overview_cols[0]:
-        st.metric("IV Rank", "78%", "High")
-    with overview_cols[1]:
-        st.metric("Put/Call Ratio", "0.82", "Bullish")
-    with overview_cols[2]:
-        st.metric("Open Interest", "2.8M", "+15%")
-    with overview_cols[3]:
-        st.metric("Volume", "1.9M", "+22%")
+    if snapshot is None:
+        st.warning("No option-chain data for this instrument.")
+    else:
+        st.caption(f"{'Synthetic chain (no chain feed configured)' if synthetic else 'Chain snapshot'} "
+                   f"as of {snapshot.timestamp:%d %b %Y %H:%M}")
+        totals = snapshot.totals()
+        before = previous.totals() if previous is not None else None
+        
+        def change(key):
+            return f"{(totals[key] / before[key] - 1) * 100:+.0f}%" if before and before[key] else None
+        
+        overview_cols = st.columns(4)
+        with overview_cols[0]:
+            if iv_stats is None or np.isnan(iv_stats.rank):
+                st.metric("IV Rank", "n/a")
+            else:
+                st.metric("IV Rank", f"{iv_stats.rank * 100:.0f}%",
+                          "High" if iv_stats.rank > 0.5 else "Low", delta_color="off",
+                          help=f"ATM IV {iv_stats.current * 100:.1f}% within its {iv_stats.days}-day range "
+                               f"{iv_stats.low * 100:.1f}%–{iv_stats.high * 100:.1f}%")
+        with overview_cols[1]:
+            pcr = totals["pcr"]
+            st.metric("Put/Call Ratio", f"{pcr:.2f}",
+                      "Bullish" if pcr > 1 else "Neutral" if pcr > 0.7 else "Bearish", delta_color="off")
+        with overview_cols[2]:
+            st.metric("Open Interest", f"{totals['oi'] / 1e6:.1f}M", change("oi"))
+        with overview_cols[3]:
+            st.metric("Volume", f"{totals['volume'] / 1e6:.1f}M", change("volume"))
+        
+        with st.expander("📋 Option chain snapshot"):
+            chain_expiry = st.selectbox("Snapshot expiry", snapshot.expiries(), format_func=lambda e: f"{e:%d %b %Y}")
+            atm = snapshot.atm_strike(chain_expiry, current_price)
+            chain_view = snapshot.table(chain_expiry)
+            st.dataframe(chain_view.style.format(precision=2).apply(
+                lambda row: ["background-color: rgba(0, 212, 255, 0.15)" if row.name == atm else "" for _ in row],
+                axis=1), use_container_width=True, height=300)
+            fig = go.Figure()
+            fig.add_trace(go.Bar(x=chain_view.index, y=chain_view["Call OI"], name="Call OI", marker_color="#ff6b6b"))
+            fig.add_trace(go.Bar(x=chain_view.index, y=chain_view["Put OI"], name="Put OI", marker_color="#00ffcc"))
+            fig.add_vline(x=atm, line_dash="dash", line_color="#ffa726", annotation_text="ATM")
+            fig.update_layout(title=dict(text="Open Interest by Strike", font=dict(color='#00d4ff')),
+                              template="plotly_dark", height=300, barmode="group", xaxis_title="Strike")
+            st.plotly_chart(fig, use_container_width=True)
+    
+    # Option Chain Greeks
+    st.markdown("### 🧮 Option Chain Greeks")
+    volatility = np.nan
+    history = get_stock_data(ticker, "1y")
+    if history is not None and not history.empty:
+        volatility = last_valid(rolling_volatility(history['Close'], annualize=True))
+    if snapshot is not None and not np.isnan(snapshot.atm_iv()):
+        volatility = snapshot.atm_iv()
+    if np.isnan(volatility):
+        volatility = 0.2
+    
+    greek_cols = st.columns(4)
+    with greek_cols[0]:
+        sigma = st.number_input("Volatility (%)", 1.0, 200.0, round(float(volatility) * 100, 1), 0.5,
+                                help="Defaults to the near-expiry ATM implied volatility, "
+                                     "else the 20-day historical volatility") / 100
+    with greek_cols[1]:
+        rate = st.number_input("Risk-free rate (%)", 0.0, 20.0, options_pricing.RISK_FREE_RATE * 100, 0.25) / 100
+    with greek_cols[2]:
+        strike_count = st.slider("Strikes", 11, 201, 41, 10)
+    with greek_cols[3]:
+        model = st.radio("Model", ["Black-Scholes", "Black-76"], horizontal=True,
+                         help="Black-76 prices options on the future, forward = spot × e^(rT)")
+    
+    expiries = options_pricing.expiry_dates()
+    years = np.array([options_pricing.years_to(e) for e in expiries])
+    strikes = options_pricing.strike_ladder(current_price, strike_count)
+    # Black-76 on the forward is Black-Scholes with carry q = r
+    underlying = current_price * np.exp(rate * years)[:, None] if model == "Black-76" else current_price
+    chain = options_pricing.chain_greeks(underlying, strikes, years, rate, sigma,
+                                         q=rate if model == "Black-76" else 0.0)
+    
+    expiry_labels = [f"{e:%d %b %Y} ({(e - datetime.now().date()).days}d)" for e in expiries]
+    expiry_index = st.selectbox("Chain expiry", range(len(expiries)), format_func=lambda i: expiry_labels[i])
+    chain_table = pd.DataFrame({
+        "Call Δ": chain["call"]["delta"][expiry_index],
+        "Call Θ": chain["call"]["theta"][expiry_index],
+        "Call": chain["call"]["price"][expiry_index],
+        "Strike": strikes,
+        "Put": chain["put"]["price"][expiry_index],
+        "Put Θ": chain["put"]["theta"][expiry_index],
+        "Put Δ": chain["put"]["delta"][expiry_index],
+        "Γ": chain["call"]["gamma"][expiry_index],
+        "Vega": chain["call"]["vega"][expiry_index],
+    })
+    st.dataframe(chain_table.style.format({"Strike": "{:.0f}", "Γ": "{:.5f}"}, precision=2),
+                 use_container_width=True, hide_index=True, height=300)
+    
+    fig = go.Figure(go.Heatmap(
+        z=chain["call"]["delta"], x=strikes, y=expiry_labels,
+        colorscale="Blues", colorbar=dict(title="Call Δ")
+    ))
+    fig.add_vline(x=current_price, line_dash="dash", line_color="#ffa726")
+    fig.update_layout(title=dict(text="Call Delta by Strike and Expiry", font=dict(color='#00d4ff')),
+                      template="plotly_dark", height=300, xaxis_title="Strike", yaxis_title="Expiry")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    with st.expander("Implied volatility calculator"):
+        iv_cols = st.columns(4)
+        with iv_cols[0]:
+            iv_type = st.radio("Type", ["Call", "Put"], horizontal=True, key="iv_type")
+        with iv_cols[1]:
+            iv_strike = st.number_input("Strike", value=float(strikes[len(strikes) // 2]), key="iv_strike")
+        with iv_cols[2]:
+            iv_expiry = st.selectbox("Expiry", range(len(expiries)), format_func=lambda i: expiry_labels[i],
+                                     key="iv_expiry")
+        with iv_cols[3]:
+            iv_price = st.number_input("Option price", min_value=0.0,
+                                       value=float(np.round(chain["call"]["price"][0][len(strikes) // 2], 2)),
+                                       key="iv_price")
+        implied = options_pricing.implied_volatility(iv_price, current_price, iv_strike, years[iv_expiry], rate,
+                                                     is_call=iv_type == "Call")
+        if np.isnan(implied):
+            st.warning("Price is outside the no-arbitrage bounds for this option.")
+        else:
+            st.metric("Implied Volatility", f"{float(implied) * 100:.2f}%")
     
     # Strategy Builder
     st.markdown("### 🛠 Strategy Builder")
@@ -1285,23 +1768,80 @@ def show_options_trading():
         st.markdown('<div class="feature-card">', unsafe_allow_html=True)
         st.markdown('<div class="feature-title">Strategy Configuration</div>', unsafe_allow_html=True)
         
-        strategy = st.selectbox("Select Strategy", 
-                              ["Long Call", "Long Put", "Covered Call", "Bull Spread", "Iron Condor"])
+        strategy = st.selectbox("Select Strategy", list(option_strategies.STRATEGIES))
         expiry = st.selectbox("Expiry", ["Weekly", "Monthly"])
-        strike = st.selectbox("Strike", ["ATM", "OTM 10%", "OTM 20%", "ITM 10%"])
-        
-        if st.button("Analyze Strategy", use_container_width=True):
-            st.success("Strategy analyzed successfully!")
+        strike_choices = option_strategies.strike_choices(strategy)
+        strike = st.selectbox("Strike", list(strike_choices))
+        step = options_pricing.strike_step(current_price)
+        width_steps = st.slider("Wing width (strikes)", 1, 40, max(1, int(round(current_price * 0.05 / step))))
+        lots = st.number_input("Lots", 1, 1000, 1)
+        lot_size = st.number_input("Lot size", 1, 10000, 75 if stock_name in MARKET_INDICES else 1)
         st.markdown('</div>', unsafe_allow_html=True)
     
+    # Weekly: the nearest expiry; Monthly: the nearest month-end expiry
+    monthly = [e for e in expiries if e.month != (e + timedelta(days=7)).month]
+    strategy_expiry = expiries[0] if expiry == "Weekly" or not monthly else monthly[0]
+    T = options_pricing.years_to(strategy_expiry)
+    legs = option_strategies.build(strategy, current_price, T, sigma, rate,
+                                   strike_choices[strike], width_steps * step, step)
+    units = lots * lot_size
+    analysis = option_strategies.analyze(legs, current_price, T, sigma, rate)
+    
+    def money(value):
+        return "Unlimited" if np.isinf(value) else f"₹{value * units:,.0f}"
+    
     with strat_cols[1]:
         st.markdown('<div class="feature-card">', unsafe_allow_html=True)
         st.markdown('<div class="feature-title">Strategy Analysis</div>', unsafe_allow_html=True)
         
-        st.metric("Max Profit", "₹12,500")
-        st.metric("Max Loss", "₹1,500")
-        st.metric("Breakeven", f"₹{current_price + 15:.2f}")
+        metric_cols = st.columns(2)
+        with metric_cols[0]:
+            st.metric("Max Profit", money(analysis["max_profit"]))
+            st.metric("Max Loss", money(-analysis["max_loss"]))
+            premium = analysis["net_premium"] * units
+            st.metric("Net Premium", f"₹{abs(premium):,.0f}", "debit" if premium > 0 else "credit", delta_color="off")
+        with metric_cols[1]:
+            st.metric("Breakeven", " / ".join(f"₹{b:,.2f}" for b in analysis["breakevens"]) or "None")
+            st.metric("Probability of Profit", f"{analysis['probability_of_profit'] * 100:.1f}%")
+            st.metric("Expiry", f"{strategy_expiry:%d %b}", f"{(strategy_expiry - datetime.now().date()).days} days",
+                      delta_color="off")
+        st.dataframe(pd.DataFrame({
+            "Leg": [f"{'Long' if l.quantity > 0 else 'Short'} {l.kind}" for l in legs],
+            "Strike": [l.strike if l.kind != "stock" else None for l in legs],
+            "Price": [l.premium for l in legs],
+            "Qty": [int(l.quantity * units) for l in legs],
+        }), use_container_width=True, hide_index=True)
         st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Scenario grid: spot x days elapsed x IV, valued in one pass
+    spots = np.linspace(current_price * 0.8, current_price * 1.2, 121)
+    days_to_expiry = max((strategy_expiry - datetime.now().date()).days, 1)
+    days = np.linspace(0, days_to_expiry, min(days_to_expiry, 30) + 1)
+    iv_grid = np.clip(sigma + np.arange(-0.10, 0.1001, 0.025), 0.01, None)
+    surface = option_strategies.pnl_surface(legs, spots, days, iv_grid, T, rate) * units
+    
+    iv_index = st.select_slider("Scenario IV", options=list(range(len(iv_grid))),
+                                value=int(np.argmin(np.abs(iv_grid - sigma))),
+                                format_func=lambda i: f"{iv_grid[i] * 100:.1f}%")
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=spots, y=option_strategies.payoff(legs, spots) * units, name="At expiry",
+                             line=dict(color='#00d4ff', width=2.5)))
+    fig.add_trace(go.Scatter(x=spots, y=surface[:, 0, iv_index], name="Today",
+                             line=dict(color='#ffa726', width=2, dash='dot')))
+    fig.add_hline(y=0, line_color="#888888")
+    fig.add_vline(x=current_price, line_dash="dash", line_color="#ffffff", annotation_text="Spot")
+    for breakeven in analysis["breakevens"]:
+        fig.add_vline(x=breakeven, line_dash="dot", line_color="#ff6b6b")
+    fig.update_layout(title=dict(text=f"{strategy} Payoff", font=dict(color='#00d4ff')), template="plotly_dark",
+                      height=350, xaxis_title="Spot at expiry (₹)", yaxis_title="P&L (₹)")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    fig = go.Figure(go.Heatmap(z=surface[:, :, iv_index].T, x=spots, y=days, colorscale="RdYlGn", zmid=0,
+                               colorbar=dict(title="P&L (₹)")))
+    fig.update_layout(title=dict(text="P&L by Spot and Days Elapsed", font=dict(color='#00d4ff')),
+                      template="plotly_dark", height=350, xaxis_title="Spot (₹)", yaxis_title="Days elapsed")
+    st.plotly_chart(fig, use_container_width=True)
 
 # ----------------------- PORTFOLIO INSIGHTS PAGE -----------------------
 def show_portfolio_insights():
@@ -1314,49 +1854,57 @@ def show_portfolio_insights():
         unsafe_allow_html=True,
     )
     
+    # Holdings: an uploaded CSV, the saved holdings file, or the sample portfolio
+    with st.expander("📂 Holdings", expanded=False):
+        upload = st.file_uploader("Upload holdings CSV (ticker, quantity, avg_price; one row per lot)",
+                                  type=["csv"])
+        try:
+            lots, source = load_holdings(upload)
+        except (ValueError, pd.errors.ParserError) as e:
+            st.error(f"Could not read holdings: {e}")
+            lots, source = portfolio.SAMPLE_HOLDINGS.copy(), None
+        if source is None:
+            st.caption("Showing a sample portfolio. Upload your holdings to track your own.")
+        else:
+            st.caption(f"{len(lots):,} lots from {source}")
+        if upload is not None and st.button("Save as my holdings"):
+            save_holdings(lots)
+            st.success(f"Saved to {HOLDINGS_PATH}")
+
+    if lots.empty:
+        st.info("No holdings to show.")
+        return
+
+    summary = value_portfolio(lots)
+    portfolio_df = summary.positions
+    if summary.missing:
+        st.warning(f"No price for {len(summary.missing)} holding(s), left out of the totals: "
+                   f"{', '.join(summary.missing[:10])}{' ...' if len(summary.missing) > 10 else ''}")
+
     # Portfolio Overview
     st.markdown("### 📈 Portfolio Overview")
-    
-    # Sample portfolio data
-    portfolio_data = {
-        'Stock': ['RELIANCE', 'TCS', 'HDFC BANK', 'INFOSYS', 'ICICI BANK'],
-        'Quantity': [10, 25, 15, 30, 20],
-        'Avg Price': [2450, 3200, 1650, 1500, 950],
-        'Current Price': [2650, 3350, 1720, 1580, 1020],
-        'Investment': [24500, 80000, 24750, 45000, 19000],
-        'Current Value': [26500, 83750, 25800, 47400, 20400]
-    }
-    
-    portfolio_df = pd.DataFrame(portfolio_data)
-    portfolio_df['P&L'] = portfolio_df['Current Value'] - portfolio_df['Investment']
-    portfolio_df['P&L %'] = (portfolio_df['P&L'] / portfolio_df['Investment']) * 100
-    
-    # Portfolio Metrics
-    total_investment = portfolio_df['Investment'].sum()
-    total_current = portfolio_df['Current Value'].sum()
-    total_pnl = total_current - total_investment
-    total_pnl_pct = (total_pnl / total_investment) * 100
-    
+
     metric_cols = st.columns(4)
     with metric_cols[0]:
-        st.metric("Total Investment", f"₹{total_investment:,.0f}")
+        st.metric("Total Investment", f"₹{summary.investment:,.0f}")
     with metric_cols[1]:
-        st.metric("Current Value", f"₹{total_current:,.0f}")
+        st.metric("Current Value", f"₹{summary.value:,.0f}")
     with metric_cols[2]:
-        st.metric("Total P&L", f"₹{total_pnl:,.0f}", f"{total_pnl_pct:.2f}%")
+        st.metric("Total P&L", f"₹{summary.pnl:,.0f}", f"{summary.pnl_pct:.2f}%")
     with metric_cols[3]:
-        st.metric("Daily Change", "₹+2,850", "+1.2%")
-    
+        st.metric("Daily Change", f"₹{summary.day_change:+,.0f}", f"{summary.day_change_pct:+.2f}%")
+
     # Portfolio Allocation Chart
     st.markdown("### 🎯 Portfolio Allocation")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        # Pie chart for allocation
+        # Pie chart for allocation: the largest positions plus "Others"
+        slices = portfolio.allocation(portfolio_df)
         fig_pie = go.Figure(data=[go.Pie(
-            labels=portfolio_df['Stock'],
-            values=portfolio_df['Current Value'],
+            labels=slices.index.str.replace(".NS", "", regex=False),
+            values=slices.values,
             hole=0.4,
             marker_colors=['#00d4ff', '#0099ff', '#ff6b6b', '#ffa726', '#9966ff']
         )])
@@ -1366,15 +1914,17 @@ def show_portfolio_insights():
             height=350
         )
         st.plotly_chart(fig_pie, use_container_width=True)
-    
+
     with col2:
-        # Performance bar chart
+        # Performance bar chart of the largest positions
+        largest = portfolio_df.dropna(subset=["Current Value"]).nlargest(15, "Current Value")
+        pnl_pct = largest['P&L %'].to_numpy()
         fig_bar = go.Figure()
         fig_bar.add_trace(go.Bar(
-            x=portfolio_df['Stock'],
-            y=portfolio_df['P&L %'],
-            marker_color=['#00d4ff' if x >= 0 else '#ff6b6b' for x in portfolio_df['P&L %']],
-            text=portfolio_df['P&L %'].round(2).astype(str) + '%',
+            x=largest.index.str.replace(".NS", "", regex=False),
+            y=pnl_pct,
+            marker_color=np.where(pnl_pct >= 0, '#00d4ff', '#ff6b6b'),
+            text=largest['P&L %'].round(2).astype(str) + '%',
             textposition='auto',
         ))
         fig_bar.update_layout(
@@ -1385,44 +1935,135 @@ def show_portfolio_insights():
             yaxis_title="P&L %"
         )
         st.plotly_chart(fig_bar, use_container_width=True)
-    
+
     # Portfolio Details Table
     st.markdown("### 📋 Portfolio Details")
-    
-    # Format the dataframe for display
-    display_df = portfolio_df.copy()
-    display_df['Avg Price'] = display_df['Avg Price'].apply(lambda x: f'₹{x:,.0f}')
-    display_df['Current Price'] = display_df['Current Price'].apply(lambda x: f'₹{x:,.0f}')
-    display_df['Investment'] = display_df['Investment'].apply(lambda x: f'₹{x:,.0f}')
-    display_df['Current Value'] = display_df['Current Value'].apply(lambda x: f'₹{x:,.0f}')
-    display_df['P&L'] = display_df['P&L'].apply(lambda x: f'₹{x:,.0f}')
-    display_df['P&L %'] = display_df['P&L %'].apply(lambda x: f'{x:.2f}%')
-    
-    st.dataframe(display_df, use_container_width=True)
-    
+
+    # Formatting is done by the Styler, not per row
+    rupees = "₹{:,.0f}"
+    st.dataframe(
+        portfolio_df.sort_values("Current Value", ascending=False).style.format({
+            "Quantity": "{:,.0f}", "Avg Price": "₹{:,.2f}", "Current Price": "₹{:,.2f}",
+            "Investment": rupees, "Current Value": rupees, "P&L": rupees, "Day Change": rupees,
+            "P&L %": "{:.2f}%", "Day Change %": "{:+.2f}%", "Weight": "{:.1%}",
+        }, na_rep="—"),
+        use_container_width=True
+    )
+
     # Risk Analysis
     st.markdown("### 🛡 Risk Analysis")
     
+    valued = portfolio_df["Current Value"].dropna()
+    report = get_portfolio_risk(tuple(valued.index), valued.to_numpy())
+    if report is None:
+        st.info("Not enough price history to analyze portfolio risk.")
+        return
+
+    beta_label = "High" if report.beta > 1.1 else "Low" if report.beta < 0.9 else "Market"
+    vol_label = "High" if report.volatility > 0.25 else "Low" if report.volatility < 0.15 else "Medium"
     risk_cols = st.columns(3)
     with risk_cols[0]:
         st.markdown('<div class="feature-card">', unsafe_allow_html=True)
         st.markdown('<div class="feature-title">Portfolio Beta</div>', unsafe_allow_html=True)
-        st.metric("Beta", "1.12", "High")
+        st.metric("Beta", f"{report.beta:.2f}", beta_label, delta_color="off",
+                  help="Beta of the portfolio's daily returns vs NIFTY 50")
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
     with risk_cols[1]:
         st.markdown('<div class="feature-card">', unsafe_allow_html=True)
         st.markdown('<div class="feature-title">Volatility</div>', unsafe_allow_html=True)
-        st.metric("Annual Vol", "18.5%", "Medium")
+        st.metric("Annual Vol", f"{report.volatility:.1%}", vol_label, delta_color="off")
         st.markdown('</div>', unsafe_allow_html=True)
-    
+
     with risk_cols[2]:
         st.markdown('<div class="feature-card">', unsafe_allow_html=True)
         st.markdown('<div class="feature-title">Diversification</div>', unsafe_allow_html=True)
-        st.metric("Score", "7.2/10", "Good")
+        st.metric("Diversification Ratio", f"{report.diversification_ratio:.2f}x",
+                  f"{report.effective_holdings:.1f} effective holdings", delta_color="off",
+                  help="Weighted average stock volatility over portfolio volatility (1 = undiversified)")
         st.markdown('</div>', unsafe_allow_html=True)
 
+    var_cols = st.columns(4)
+    for col, label, loss in zip(var_cols,
+                                ("1-Day VaR 95%", "1-Day CVaR 95%", "Parametric VaR 95%", "Parametric CVaR 95%"),
+                                (report.var, report.cvar, report.parametric_var, report.parametric_cvar)):
+        with col:
+            st.metric(label, f"₹{loss * summary.value:,.0f}", f"{loss:.2%}", delta_color="off")
+    st.caption(f"{report.observations:,} daily returns over {RISK_PERIOD}, covering "
+               f"{report.coverage:.0%} of the portfolio value. VaR and CVaR are one-day losses: "
+               "historical from the portfolio's return series, parametric from a normal fit.")
+
 # ----------------------- BACKTESTING PAGE -----------------------
+def show_backtest_results(result, initial_capital):
+    """Metrics, equity curve and trade list of a run_backtest() result"""
+    metrics = result.metrics
+    total_pnl = metrics['final_equity'] - initial_capital
+    excess = (metrics['total_return'] - metrics['benchmark_return']) * 100
+    
+    # Backtest Results
+    st.markdown("### 📊 Backtest Results")
+    
+    result_cols = st.columns(4)
+    with result_cols[0]:
+        st.metric("Total Return", f"₹{total_pnl:,.0f}", f"{metrics['total_return'] * 100:+.2f}%")
+    with result_cols[1]:
+        st.metric("Win Rate", f"{metrics['win_rate'] * 100:.1f}%", f"{metrics['trades']} trades")
+    with result_cols[2]:
+        drawdown = metrics['max_drawdown'] * 100
+        st.metric("Max Drawdown", f"{drawdown:.1f}%",
+                  "Low" if drawdown > -10 else "Moderate" if drawdown > -20 else "High")
+    with result_cols[3]:
+        sharpe = metrics['sharpe']
+        st.metric("Sharpe Ratio", f"{sharpe:.2f}",
+                  "Good" if sharpe >= 1 else "Fair" if sharpe >= 0.5 else "Poor")
+    
+    # Performance Chart
+    st.markdown("### 📈 Strategy Performance")
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=result.equity.index, 
+        y=result.equity.values,
+        mode='lines',
+        name='Strategy',
+        line=dict(color='#00d4ff', width=2.5)
+    ))
+    
+    # Add benchmark (buy & hold)
+    fig.add_trace(go.Scatter(
+        x=result.benchmark.index, 
+        y=result.benchmark.values,
+        mode='lines',
+        name='Buy & Hold',
+        line=dict(color='#ff6b6b', width=2, dash='dash')
+    ))
+    
+    fig.update_layout(
+        title=dict(text=f"Strategy vs Buy & Hold Performance ({excess:+.1f}% vs benchmark)", font=dict(color='#00d4ff')),
+        template="plotly_dark",
+        height=350,
+        xaxis_title="Date",
+        yaxis_title="Portfolio Value (₹)"
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Trade Analysis
+    st.markdown("### 📋 Trade Analysis")
+    
+    if result.trades.empty:
+        st.info("The strategy did not trade in the selected lookback period.")
+    else:
+        trade_df = result.trades.copy()
+        trade_df['Entry Date'] = trade_df['Entry Date'].dt.strftime('%Y-%m-%d')
+        trade_df['Exit Date'] = trade_df['Exit Date'].dt.strftime('%Y-%m-%d')
+        trade_df['Entry Price'] = trade_df['Entry Price'].apply(lambda x: f'₹{x:,.2f}')
+        trade_df['Exit Price'] = trade_df['Exit Price'].apply(lambda x: f'₹{x:,.2f}')
+        trade_df['Quantity'] = trade_df['Quantity'].round(2)
+        trade_df['Return %'] = trade_df['Return %'].apply(lambda x: f'{x:+.2f}%')
+        trade_df['P&L'] = trade_df['P&L'].apply(lambda x: f'₹{x:,.0f}')
+        st.dataframe(trade_df, use_container_width=True)
+
 def show_backtesting():
     """Backtesting - Test trading strategies"""
     st.markdown(
@@ -1440,7 +2081,7 @@ def show_backtesting():
     with config_cols[0]:
         strategy_type = st.selectbox(
             "Strategy Type",
-            ["Moving Average Crossover", "RSI Strategy", "MACD Strategy", "Bollinger Bands"]
+            list(STRATEGIES.keys())
         )
         lookback_period = st.select_slider(
             "Lookback Period",
@@ -1456,87 +2097,413 @@ def show_backtesting():
     with config_cols[2]:
         take_profit = st.slider("Take Profit (%)", 5, 50, 15)
         commission = st.number_input("Commission per Trade (₹)", value=20)
-        if st.button("Run Backtest", use_container_width=True):
-            st.success("Backtest completed successfully!")
+        engine_label = st.radio(
+            "Engine",
+            ["Vectorized", "Event-Driven"],
+            horizontal=True,
+            help="Event-Driven walks each bar and fills stops and targets inside the bar from its High/Low"
+        )
+        slippage_bps = st.number_input(
+            "Slippage (bps)",
+            value=5,
+            min_value=0,
+            step=1,
+            help="Charged on market and stop fills by the event-driven engine",
+            disabled=engine_label != "Event-Driven"
+        )
+        run_clicked = st.button("Run Backtest", use_container_width=True)
+    
+    strategy_key = STRATEGIES[strategy_type]
+    with st.expander("Strategy Parameters"):
+        defaults = DEFAULT_PARAMS[strategy_key]
+        param_cols = st.columns(len(defaults))
+        strategy_params = {}
+        for col, (name, default) in zip(param_cols, defaults.items()):
+            with col:
+                if isinstance(default, float):
+                    strategy_params[name] = st.number_input(name.replace('_', ' ').title(), value=default, step=0.5)
+                else:
+                    strategy_params[name] = int(st.number_input(name.replace('_', ' ').title(), value=default, step=1))
+    
+    # Signals are warmed up on the full history, trading starts at the lookback
+    lookback_map = {"1M": "1mo", "3M": "3mo", "6M": "6mo", "1Y": "1y", "2Y": "2y", "5Y": "5y"}
+    df_full = get_stock_data(ticker, "max")
+    df_window = get_stock_data(ticker, lookback_map[lookback_period])
+    
+    if df_full.empty or len(df_window) < 2:
+        st.warning(f"Not enough price history for {stock_name} to run a backtest.")
+        return
+    
+    # Results are kept per configuration; changing a setting asks for a new run
+    backtest_key = (ticker, strategy_key, lookback_period, float(initial_capital), position_size, stop_loss,
+                    take_profit, float(commission), engine_label, slippage_bps, tuple(strategy_params.items()))
+    if run_clicked:
+        started = datetime.now()
+        try:
+            result = run_backtest(
+                df_full,
+                strategy_key,
+                params=strategy_params,
+                start=df_window.index[0],
+                capital=float(initial_capital),
+                position_size=position_size / 100,
+                stop_loss=stop_loss / 100,
+                take_profit=take_profit / 100,
+                commission=float(commission),
+                engine="event" if engine_label == "Event-Driven" else "vectorized",
+                slippage=slippage_bps / 10000
+            )
+            st.session_state.backtest_results = {
+                'key': backtest_key,
+                'result': result,
+                'engine': engine_label,
+                'capital': float(initial_capital),
+                'ms': (datetime.now() - started).total_seconds() * 1000
+            }
+        except Exception as e:
+            st.session_state.backtest_results = None
+            st.error(f"Backtest failed: {str(e)}")
+    
+    backtest_state = st.session_state.get('backtest_results')
+    if backtest_state and backtest_state['key'] == backtest_key:
+        st.success(f"{backtest_state['engine']} backtest completed in {backtest_state['ms']:.1f} ms")
+        show_backtest_results(backtest_state['result'], backtest_state['capital'])
+    elif backtest_state and backtest_state['key'][0] == ticker:
+        st.info("Settings changed since the last run. Click Run Backtest to update the results.")
+    else:
+        st.info("Configure the strategy above and click Run Backtest.")
+    
+    # Parameter Sweep
+    st.markdown("### 🧪 Parameter Sweep")
+    
+    with st.form("parameter_sweep"):
+        st.caption("Comma-separated values for each strategy parameter; every combination is evaluated.")
+        sweep_defaults = DEFAULT_SWEEP[strategy_key]
+        range_cols = st.columns(len(sweep_defaults))
+        range_text = {}
+        for col, (name, values) in zip(range_cols, sweep_defaults.items()):
+            with col:
+                range_text[name] = st.text_input(name.replace('_', ' ').title(), ", ".join(str(v) for v in values))
+        
+        risk_cols = st.columns(3)
+        with risk_cols[0]:
+            sl_range = st.slider("Stop Loss Range (%)", 1, 20, (2, 10))
+            sl_step = st.number_input("Stop Loss Step (%)", value=2, min_value=1)
+        with risk_cols[1]:
+            tp_range = st.slider("Take Profit Range (%)", 5, 50, (5, 30))
+            tp_step = st.number_input("Take Profit Step (%)", value=5, min_value=1)
+        with risk_cols[2]:
+            size_choices = st.multiselect("Position Sizes (%)", [5, 10, 20, 30, 50, 75, 100], default=[10, 20, 50])
+            rank_by = st.selectbox("Rank By", ["sharpe", "total_return", "max_drawdown", "win_rate"])
+        
+        sweep_clicked = st.form_submit_button("Run Sweep", use_container_width=True)
     
-    # Backtest Results
-    st.markdown("### 📊 Backtest Results")
+    if sweep_clicked:
+        try:
+            cast = {name: type(values[0]) for name, values in sweep_defaults.items()}
+            param_ranges = {
+                name: [cast[name](float(v)) for v in text.split(",") if v.strip()]
+                for name, text in range_text.items()
+            }
+            stop_losses = np.arange(sl_range[0], sl_range[1] + 1e-9, sl_step) / 100
+            take_profits = np.arange(tp_range[0], tp_range[1] + 1e-9, tp_step) / 100
+            position_sizes = np.array(size_choices or [position_size], dtype=float) / 100
+            
+            started = datetime.now()
+            with st.spinner("Running parameter sweep..."):
+                sweep_df = run_sweep(
+                    df_full['Close'].to_numpy(dtype=float),
+                    strategy_key,
+                    param_ranges,
+                    stop_losses,
+                    take_profits,
+                    position_sizes,
+                    first=int(df_full.index.searchsorted(df_window.index[0])),
+                    capital=float(initial_capital),
+                    commission=float(commission),
+                    rank_by=rank_by
+                )
+            st.session_state.sweep_results = {
+                'key': (ticker, strategy_key, lookback_period),
+                'results': sweep_df,
+                'params': list(param_ranges),
+                'seconds': (datetime.now() - started).total_seconds()
+            }
+        except Exception as e:
+            st.error(f"Parameter sweep failed: {str(e)}")
     
-    result_cols = st.columns(4)
-    with result_cols[0]:
-        st.metric("Total Return", "₹24,850", "+24.85%")
-    with result_cols[1]:
-        st.metric("Win Rate", "68.2%", "+8.2%")
-    with result_cols[2]:
-        st.metric("Max Drawdown", "-12.3%", "Moderate")
-    with result_cols[3]:
-        st.metric("Sharpe Ratio", "1.45", "Good")
+    sweep_state = st.session_state.get('sweep_results')
+    if sweep_state and sweep_state['key'] == (ticker, strategy_key, lookback_period) and not sweep_state['results'].empty:
+        sweep_df = sweep_state['results']
+        st.success(f"Evaluated {len(sweep_df):,} parameter sets in {sweep_state['seconds']:.2f}s")
+        
+        display_df = sweep_df.head(20).copy()
+        for col in ['stop_loss', 'take_profit', 'position_size', 'total_return', 'max_drawdown', 'win_rate']:
+            display_df[col] = display_df[col].apply(lambda x: f'{x * 100:.1f}%')
+        display_df['sharpe'] = display_df['sharpe'].round(2)
+        st.dataframe(display_df, use_container_width=True)
+        
+        sweep_params = sweep_state['params']
+        heat_x, heat_y = (sweep_params + ['take_profit', 'stop_loss'])[:2] if len(sweep_params) < 2 else sweep_params[:2]
+        heat = heatmap_table(sweep_df, heat_x, heat_y, metric='sharpe')
+        fig_heat = go.Figure(data=go.Heatmap(
+            z=heat.values,
+            x=[str(v) for v in heat.columns],
+            y=[str(v) for v in heat.index],
+            colorscale='RdYlGn',
+            colorbar=dict(title='Sharpe')
+        ))
+        fig_heat.update_layout(
+            title=dict(text=f"Best Sharpe by {heat_y} × {heat_x}", font=dict(color='#00d4ff')),
+            template="plotly_dark",
+            height=400,
+            xaxis_title=heat_x,
+            yaxis_title=heat_y
+        )
+        st.plotly_chart(fig_heat, use_container_width=True)
     
-    # Performance Chart
-    st.markdown("### 📈 Strategy Performance")
+    # Universe Backtest
+    st.markdown("### 🌐 Universe Backtest")
     
-    # Generate sample backtest data
-    dates = pd.date_range(start='2023-01-01', end='2024-01-01', freq='D')
-    portfolio_value = [100000]
-    for i in range(1, len(dates)):
-        daily_return = np.random.normal(0.001, 0.02)
-        new_value = portfolio_value[-1] * (1 + daily_return)
-        portfolio_value.append(new_value)
+    with st.form("universe_backtest"):
+        universe_choice = st.radio("Universe", ["All Stocks", "Custom List"], horizontal=True)
+        custom_text = st.text_area(
+            "Custom Tickers",
+            "",
+            help="NSE symbols separated by commas or new lines; .NS is added when no exchange suffix is given"
+        )
+        universe_clicked = st.form_submit_button("Run Universe Backtest", use_container_width=True)
     
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=dates, 
-        y=portfolio_value,
-        mode='lines',
-        name='Strategy',
-        line=dict(color='#00d4ff', width=2.5)
-    ))
+    if universe_clicked:
+        if universe_choice == "All Stocks":
+            universe = list(stocks.values())
+        else:
+            universe = parse_tickers(custom_text)
+        
+        if not universe:
+            st.warning("Enter at least one ticker for a custom universe.")
+        else:
+            started = datetime.now()
+            with st.spinner(f"Backtesting {len(universe)} tickers..."):
+                close_matrix, load_errors = get_price_matrix(tuple(dict.fromkeys(universe)))
+                try:
+                    window_start = close_matrix.index[int(close_matrix.index.searchsorted(df_window.index[0]))] \
+                        if not close_matrix.empty else None
+                    leaderboard, portfolio_curve, hold_curve = run_universe_backtest(
+                        close_matrix,
+                        strategy_key,
+                        params=strategy_params,
+                        start=window_start,
+                        capital=float(initial_capital),
+                        position_size=position_size / 100,
+                        stop_loss=stop_loss / 100,
+                        take_profit=take_profit / 100,
+                        commission=float(commission)
+                    )
+                    st.session_state.universe_results = {
+                        'key': (strategy_key, lookback_period, tuple(universe)),
+                        'leaderboard': leaderboard,
+                        'portfolio': portfolio_curve,
+                        'benchmark': hold_curve,
+                        'errors': load_errors,
+                        'seconds': (datetime.now() - started).total_seconds()
+                    }
+                except Exception as e:
+                    st.session_state.universe_results = None
+                    st.error(f"Universe backtest failed: {str(e)}")
+    
+    universe_state = st.session_state.get('universe_results')
+    if universe_state and universe_state['key'][:2] == (strategy_key, lookback_period):
+        leaderboard = universe_state['leaderboard']
+        st.success(f"Backtested {len(leaderboard)} tickers in {universe_state['seconds']:.2f}s")
+        if universe_state['errors']:
+            st.caption("No data for: " + ", ".join(sorted(universe_state['errors'])))
+        
+        fig_universe = go.Figure()
+        fig_universe.add_trace(go.Scatter(
+            x=universe_state['portfolio'].index,
+            y=universe_state['portfolio'].values,
+            mode='lines',
+            name='Equal-Weight Strategy',
+            line=dict(color='#00d4ff', width=2.5)
+        ))
+        fig_universe.add_trace(go.Scatter(
+            x=universe_state['benchmark'].index,
+            y=universe_state['benchmark'].values,
+            mode='lines',
+            name='Equal-Weight Buy & Hold',
+            line=dict(color='#ff6b6b', width=2, dash='dash')
+        ))
+        fig_universe.update_layout(
+            title=dict(text="Universe Portfolio Performance", font=dict(color='#00d4ff')),
+            template="plotly_dark",
+            height=350,
+            xaxis_title="Date",
+            yaxis_title="Portfolio Value (₹)"
+        )
+        st.plotly_chart(fig_universe, use_container_width=True)
+        
+        names = {v: k for k, v in stocks.items()}
+        display_df = leaderboard.copy()
+        display_df.insert(0, 'Name', display_df['Ticker'].map(names).fillna(display_df['Ticker']))
+        for col in ['Total Return', 'Max Drawdown', 'Win Rate', 'Exposure', 'Buy & Hold']:
+            display_df[col] = display_df[col].apply(lambda x: f'{x * 100:.1f}%')
+        display_df['Sharpe'] = display_df['Sharpe'].round(2)
+        st.dataframe(display_df, use_container_width=True)
+
+# ----------------------- SCREENER PAGE -----------------------
+def show_screener():
+    """Screener - Filter the whole universe on technicals and fundamentals"""
+    st.markdown(
+        '<div class="compact-header">'
+        '<h2>🔎 Universe Screener</h2>'
+        '<p>Filter every ticker at once on indicators, returns and fundamentals</p>'
+        '</div>',
+        unsafe_allow_html=True,
+    )
     
-    # Add benchmark (buy & hold)
-    benchmark_value = [100000]
-    for i in range(1, len(dates)):
-        daily_return = np.random.normal(0.0008, 0.015)
-        new_value = benchmark_value[-1] * (1 + daily_return)
-        benchmark_value.append(new_value)
+    universe_cols = st.columns([1, 2])
+    with universe_cols[0]:
+        universe_choice = st.radio("Universe", ["All Stocks", "Custom List"], horizontal=True, key="screener_universe")
+    with universe_cols[1]:
+        custom_text = st.text_input(
+            "Custom Tickers",
+            "",
+            help="NSE symbols separated by commas; .NS is added when no exchange suffix is given",
+            disabled=universe_choice != "Custom List"
+        )
+    universe = list(stocks.values()) if universe_choice == "All Stocks" else parse_tickers(custom_text)
+    if not universe:
+        st.warning("Enter at least one ticker for a custom universe.")
+        return
+    
+    with st.spinner(f"Building metrics for {len(universe)} tickers..."):
+        table, load_errors = get_screener_table(tuple(dict.fromkeys(universe)))
+    if table.empty:
+        st.warning("No price history available for this universe.")
+        return
+    
+    filter_cols = st.columns([1, 2])
+    with filter_cols[0]:
+        preset = st.selectbox("Preset", ["Custom"] + list(EXAMPLE_FILTERS.keys()))
+    with filter_cols[1]:
+        expression = st.text_input(
+            "Filter Expression",
+            EXAMPLE_FILTERS.get(preset, ""),
+            help="Compare metrics with numbers or each other, combined with and / or / not, e.g. rsi14 < 30 and pe < 20"
+        )
     
-    fig.add_trace(go.Scatter(
-        x=dates, 
-        y=benchmark_value,
-        mode='lines',
-        name='Buy & Hold',
-        line=dict(color='#ff6b6b', width=2, dash='dash')
-    ))
+    sort_cols = st.columns(3)
+    with sort_cols[0]:
+        sort_by = st.selectbox("Sort By", list(table.columns), index=list(table.columns).index("return_1m"))
+    with sort_cols[1]:
+        ascending = st.checkbox("Ascending", value=False)
+    with sort_cols[2]:
+        limit = st.number_input("Max Rows", value=50, min_value=1, step=10)
     
-    fig.update_layout(
-        title=dict(text="Strategy vs Buy & Hold Performance", font=dict(color='#00d4ff')),
-        template="plotly_dark",
-        height=350,
-        xaxis_title="Date",
-        yaxis_title="Portfolio Value (₹)"
-    )
+    started = datetime.now()
+    try:
+        matches = screen(table, expression, sort_by=sort_by, ascending=ascending)
+    except Exception as e:
+        st.error(f"Filter error: {str(e)}")
+        return
+    elapsed_ms = (datetime.now() - started).total_seconds() * 1000
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.success(f"{len(matches)} of {len(table)} tickers match ({elapsed_ms:.1f} ms)")
+    if load_errors:
+        st.caption("No data for: " + ", ".join(sorted(load_errors)))
     
-    # Trade Analysis
-    st.markdown("### 📋 Trade Analysis")
+    names = {v: k for k, v in stocks.items()}
+    display_df = matches.head(int(limit)).round(2)
+    display_df.insert(0, 'Name', [names.get(t, t) for t in display_df.index])
+    st.dataframe(display_df, use_container_width=True)
     
-    # Sample trade data
-    trade_data = {
-        'Date': ['2023-01-15', '2023-02-20', '2023-03-10', '2023-04-05', '2023-05-12'],
-        'Stock': ['RELIANCE', 'TCS', 'HDFC BANK', 'INFOSYS', 'ICICI BANK'],
-        'Action': ['BUY', 'BUY', 'SELL', 'BUY', 'SELL'],
-        'Price': [2450, 3200, 1700, 1480, 980],
-        'Quantity': [10, 15, 20, 25, 30],
-        'P&L': ['-', '-', '₹2,500', '-', '₹900']
-    }
+    with st.expander("Available Metrics"):
+        st.markdown(
+            "- **price**, **change_pct**, **return_1w/1m/3m/1y** - last close and returns in %\n"
+            "- **sma20**, **ema20**, **rsi14**, **macd**, **macd_signal**, **macd_hist**, **atr14** - same indicators as Market Analysis\n"
+            "- **bb_mid/bb_upper/bb_lower**, **bb_pct** - Bollinger bands (20, 2) and position inside them (0 lower, 1 upper)\n"
+            "- **vs_sma20**, **atr_pct** - distance from SMA 20 and ATR as % of price\n"
+            "- **volatility20** - annualized 20-day volatility in %\n"
+            "- **pe**, **dividend_yield** (%), **market_cap**, **beta** - fundamentals"
+        )
+
+# ----------------------- DIAGNOSTICS -----------------------
+def show_diagnostics():
+    """Hidden diagnostics - data function metrics (open with ?diagnostics=1)"""
+    st.markdown(
+        '<div class="compact-header">'
+        '<h2>🩺 Diagnostics</h2>'
+        '<p>Cache hit rates, latency and upstream errors of the data functions</p>'
+        '</div>',
+        unsafe_allow_html=True,
+    )
     
-    trade_df = pd.DataFrame(trade_data)
-    st.dataframe(trade_df, use_container_width=True)
+    control_cols = st.columns(3)
+    with control_cols[0]:
+        enabled = st.toggle("Record metrics", value=METRICS.enabled)
+        if enabled != METRICS.enabled:
+            METRICS.enabled = enabled
+    with control_cols[1]:
+        if st.button("Reset Metrics", use_container_width=True):
+            METRICS.reset()
+    with control_cols[2]:
+        st.download_button(
+            "Download Prometheus Text",
+            METRICS.prometheus(),
+            file_name="smart_trade_metrics.prom",
+            mime="text/plain",
+            use_container_width=True
+        )
+    
+    if not METRICS.enabled:
+        st.info("Metrics are off. Turn on recording here or start the app with SMART_TRADE_METRICS=1.")
+    
+    cache_stats = pd.DataFrame.from_dict(
+        {name: dict(cache.stats, entries=len(cache), ttl=cache.ttl) for name, cache in caches().items()},
+        orient='index'
+    ).fillna(0)
+    if not cache_stats.empty:
+        st.markdown("### 🗄 Shared Cache")
+        st.dataframe(cache_stats, use_container_width=True)
+    
+    st.markdown("### 🔄 Prefetch Scheduler")
+    st.json({k: str(v) if isinstance(v, datetime) else v for k, v in get_prefetcher().status().items()})
+    
+    registry_summary = get_model_registry().summary()
+    if not registry_summary.empty:
+        st.markdown("### 🧠 Model Registry")
+        st.dataframe(registry_summary, use_container_width=True, hide_index=True)
+    
+    summary = pd.DataFrame(METRICS.summary())
+    if summary.empty:
+        st.write("No calls recorded yet.")
+        return
+    
+    st.markdown("### ⏱ Data Functions")
+    st.dataframe(summary.round(3), use_container_width=True)
+    
+    st.markdown("### 🎯 By Ticker")
+    st.dataframe(pd.DataFrame(METRICS.summary(by_ticker=True)).round(3), use_container_width=True)
+    
+    errors = METRICS.recent_errors()
+    if errors:
+        st.markdown("### ⚠ Recent Errors")
+        error_df = pd.DataFrame(errors)
+        error_df['time'] = pd.to_datetime(error_df['time'], unit='s')
+        st.dataframe(error_df, use_container_width=True)
+    
+    with st.expander("Prometheus Text"):
+        st.code(METRICS.prometheus(), language="text")
 
 # ----------------------- MAIN APP LOGIC -----------------------
 def main():
     """Main application logic"""
     
+    if st.query_params.get("diagnostics") == "1":
+        show_diagnostics()
+        return
+    
     # Check if we're in a tools page
     if st.session_state.current_tool:
         if st.session_state.current_tool == "Market Intelligence":
@@ -1563,6 +2530,8 @@ def main():
             show_portfolio_insights()
         elif section == "Backtesting":
             show_backtesting()
+        elif section == "Screener":
+            show_screener()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
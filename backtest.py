@@ -0,0 +1,434 @@
+"""Vectorized strategy backtester.
+
+Signals are generated for a whole price array at once and positions are
+accounted without a per-bar Python loop. Arrays are shaped (time,) or
+(time, tickers). A signal seen at a bar's close is traded at that close and
+held from the next bar; stop loss and take profit are checked on closes.
+
+The event-driven engine (simulate_events) walks one ticker's bars in order
+instead, so stops and targets fire inside the bar from its High and Low and
+fills can pay slippage.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+try:
+    from numba import njit
+except ImportError:  # optional: without it the event loop runs as plain Python
+    njit = None
+
+STRATEGIES = {
+    "Moving Average Crossover": "ma_crossover",
+    "RSI Strategy": "rsi",
+    "MACD Strategy": "macd",
+    "Bollinger Bands": "bollinger",
+}
+
+DEFAULT_PARAMS = {
+    "ma_crossover": {"fast": 20, "slow": 50},
+    "rsi": {"period": 14, "lower": 30, "upper": 70},
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+    "bollinger": {"window": 20, "num_std": 2.0},
+}
+
+TRADING_DAYS = 252
+
+BacktestResult = namedtuple("BacktestResult", ["equity", "benchmark", "trades", "metrics"])
+
+
+def _ffill(x):
+    # Forward-fill NaNs along axis 0 without a loop.
+    idx = np.where(np.isnan(x), 0, np.arange(len(x)).reshape((-1,) + (1,) * (x.ndim - 1)))
+    idx = np.maximum.accumulate(idx, axis=0)
+    return np.take_along_axis(x, idx, axis=0)
+
+
+def _latch(enter, exit_):
+    # 1 from an enter bar until the next exit bar, 0 otherwise.
+    state = np.where(enter, 1.0, np.where(exit_, 0.0, np.nan))
+    return np.nan_to_num(_ffill(state))
+
+
+def signal_positions(strategy, close, **params):
+    """Desired position (1 long, 0 flat) at each bar's close.
+
+    strategy is a key of DEFAULT_PARAMS; params override its defaults.
+    """
+    if strategy not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    p = dict(DEFAULT_PARAMS[strategy], **params)
+    close = np.asarray(close, dtype=float)
+
+    with np.errstate(invalid="ignore"):
+        if strategy == "ma_crossover":
+            fast = indicators.sma(close, int(p["fast"]))
+            slow = indicators.sma(close, int(p["slow"]))
+            return (fast > slow).astype(float)
+        if strategy == "rsi":
+            rsi = indicators.rsi(close, int(p["period"]))
+            return _latch(rsi < p["lower"], rsi > p["upper"])
+        if strategy == "macd":
+            line, signal_line, _ = indicators.macd(close, int(p["fast"]), int(p["slow"]), int(p["signal"]))
+            return (line > signal_line).astype(float)
+        mid, _, lower = indicators.bollinger(close, int(p["window"]), float(p["num_std"]))
+        return _latch(close < lower, close > mid)
+
+
+def _shift(x, fill=0.0):
+    out = np.empty_like(x)
+    out[0] = fill
+    out[1:] = x[:-1]
+    return out
+
+
+def _next(x, fill):
+    out = np.empty_like(x)
+    out[-1] = fill
+    out[:-1] = x[1:]
+    return out
+
+
+def simulate(close, target, stop_loss=None, take_profit=None, position_size=1.0,
+             commission=0.0, capital=100000.0):
+    """Account a target position series into equity.
+
+    Each trade commits ``position_size`` (fraction) of equity at entry and
+    pays ``commission`` (currency) on entry and exit. ``stop_loss`` and
+    ``take_profit`` are fractions measured from the entry close. The risk
+    settings may also be arrays broadcasting against the ticker axis, which
+    is how a sweep evaluates many settings in one call.
+
+    Returns a dict of arrays shaped like close: equity, held (1 while the
+    position is carried over the bar), entry_bar (index of the bar whose
+    close the trade was entered at, -1 when flat) and exit_code (1 signal,
+    2 stop loss, 3 take profit on the bar a trade is closed, else 0).
+    """
+    close = np.asarray(close, dtype=float)
+    target = np.nan_to_num(np.asarray(target, dtype=float))
+    bars = np.arange(len(close)).reshape((-1,) + (1,) * (close.ndim - 1))
+    # Bars without a price (and the bar right after one) are never held.
+    priced = ~np.isnan(close)
+    close_f = _ffill(close)
+
+    wanted = (_shift(target) > 0) & priced & _shift(priced, False)
+    starts = wanted & ~_shift(wanted, False)
+    seg_start = np.maximum.accumulate(np.where(starts, bars, -1), axis=0)
+    entry_bar = np.where(wanted, seg_start - 1, -1)
+    entry_price = np.take_along_axis(close_f, np.maximum(entry_bar, 0), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        run_ret = np.where(wanted, close_f / entry_price - 1.0, 0.0)
+
+    no_hit = np.zeros(close.shape, dtype=bool)
+    stop_hit = wanted & (run_ret <= -np.asarray(stop_loss)) if stop_loss is not None else no_hit
+    target_hit = wanted & (run_ret >= np.asarray(take_profit)) if take_profit is not None else no_hit
+    hit = stop_hit | target_hit
+    # The first stop/target hit closes the trade; the rest of that signal
+    # segment stays flat until the strategy exits and enters again.
+    last_hit = np.maximum.accumulate(np.where(hit, bars, -1), axis=0)
+    held = wanted & ~(_shift(last_hit, -1) >= seg_start)
+    entry_bar = np.where(held, entry_bar, -1)
+    run_ret = np.where(held, run_ret, 0.0)
+
+    # A trade closes on its last held bar; one still held on the final bar
+    # stays open unless its stop or target fired there.
+    closes = held & ~_next(held, True)
+    closes[-1] = held[-1] & hit[-1]
+    exit_code = np.where(closes, np.where(stop_hit, 2, np.where(target_hit, 3, 1)), 0)
+
+    # Equity follows E[t] = a[t] * E[t-1] + b[t]: a carries the position's
+    # price move (position_size of the equity at entry), b the fixed
+    # commissions. Solved in closed form with cumulative products and sums,
+    # so there is no loop over bars or trades.
+    growth = 1.0 + np.asarray(position_size) * run_ret
+    a = np.where(held, growth / _shift(growth, 1.0), 1.0)
+    b = -commission * (_next(starts, False).astype(float) + closes)
+    A = np.cumprod(a, axis=0)
+    equity = A * (capital + np.cumsum(b / A, axis=0))
+
+    return {"equity": equity, "held": held.astype(float), "entry_bar": entry_bar, "exit_code": exit_code}
+
+
+def _event_loop(open_, high, low, close, target, stop_loss, take_profit, position_size,
+                commission, slippage, capital, equity, held, entry_bar, exit_code, fill, quantity):
+    # One pass over the bars with scalar state only, so numba can compile it
+    # as is; without numba the inputs and outputs are plain lists.
+    cash = capital
+    qty = 0.0
+    entry_price = 0.0
+    entered = -1
+    blocked = False
+    mark = math.nan
+    last = len(close) - 1
+    for t in range(last + 1):
+        c = close[t]
+        if c == c:
+            mark = c
+        if qty > 0.0:
+            held[t] = 1.0
+            entry_bar[t] = entered
+            code = 0
+            px = 0.0
+            if c == c:
+                stop_px = entry_price * (1.0 - stop_loss)
+                take_px = entry_price * (1.0 + take_profit)
+                o = open_[t]
+                # A gap through a level fills at the open; when both levels lie
+                # inside the bar the stop is assumed to have come first.
+                if o >= take_px:
+                    code, px = 3, o
+                elif o <= stop_px:
+                    code, px = 2, o * (1.0 - slippage)
+                elif low[t] <= stop_px:
+                    code, px = 2, stop_px * (1.0 - slippage)
+                elif high[t] >= take_px:
+                    code, px = 3, take_px
+                elif target[t] <= 0.0:
+                    code, px = 1, c * (1.0 - slippage)
+            if code > 0:
+                cash += qty * px - commission
+                exit_code[t] = code
+                fill[t] = px
+                qty = 0.0
+                # Stopped out: stay flat until the strategy exits and re-enters
+                blocked = code > 1
+        if target[t] <= 0.0:
+            blocked = False
+        elif qty == 0.0 and not blocked and c == c and t < last:
+            px = c * (1.0 + slippage)
+            cash -= commission
+            qty = position_size * cash / px
+            cash -= qty * px
+            entry_price = px
+            entered = t
+            fill[t] = px
+            quantity[t] = qty
+        equity[t] = cash + qty * mark
+
+
+_event_kernel = njit(cache=True)(_event_loop) if njit is not None else _event_loop
+
+
+def simulate_events(open_, high, low, close, target, stop_loss=None, take_profit=None,
+                    position_size=1.0, commission=0.0, slippage=0.0, capital=100000.0):
+    """Event-driven simulation of one ticker with intrabar stop and target fills.
+
+    Signals are traded at the signal bar's close like simulate(). While a
+    position is held each bar's Low and High are checked against the stop
+    and target levels (measured from the entry fill); a gap through a level
+    fills at the open. Market and stop fills pay ``slippage`` (fraction of
+    price) against the trade, the take profit is a limit order filled at its
+    price. Missing Open/High/Low values fall back to the close.
+
+    Returns the same arrays as simulate() plus ``fill`` (fill price on entry
+    and exit bars) and ``quantity`` (shares bought on entry bars).
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    ohl = [close if x is None else np.where(np.isnan(np.asarray(x, dtype=float)), close, np.asarray(x, dtype=float))
+           for x in (open_, high, low)]
+    target = np.nan_to_num(np.asarray(target, dtype=float))
+    stop_loss = math.inf if stop_loss is None else float(stop_loss)
+    take_profit = math.inf if take_profit is None else float(take_profit)
+
+    outputs = [np.zeros(n), np.zeros(n), np.full(n, -1, dtype=np.int64), np.zeros(n, dtype=np.int64),
+               np.full(n, np.nan), np.zeros(n)]
+    inputs = ohl + [close, target]
+    if njit is None:
+        # Python floats in lists are several times faster than numpy scalars
+        inputs = [x.tolist() for x in inputs]
+        outputs = [x.tolist() for x in outputs]
+    _event_kernel(*inputs, stop_loss, take_profit, float(position_size), float(commission),
+                  float(slippage), float(capital), *outputs)
+
+    equity, held, entry_bar, exit_code, fill, quantity = outputs
+    return {
+        "equity": np.asarray(equity, dtype=float),
+        "held": np.asarray(held, dtype=float),
+        "entry_bar": np.asarray(entry_bar, dtype=np.int64),
+        "exit_code": np.asarray(exit_code, dtype=np.int64),
+        "fill": np.asarray(fill, dtype=float),
+        "quantity": np.asarray(quantity, dtype=float),
+    }
+
+
+def performance(equity, capital, periods_per_year=TRADING_DAYS):
+    """Total return, max drawdown and Sharpe for an equity array (per column)"""
+    equity = np.asarray(equity, dtype=float)
+    prev = np.concatenate([np.full_like(equity[:1], capital), equity[:-1]])
+    daily = equity / prev - 1.0
+    std = daily.std(axis=0, ddof=1) if len(daily) > 1 else np.zeros(equity.shape[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, daily.mean(axis=0) / std * np.sqrt(periods_per_year), 0.0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1.0
+    return {
+        "total_return": equity[-1] / capital - 1.0,
+        "max_drawdown": drawdown.min(axis=0),
+        "sharpe": sharpe,
+    }
+
+
+def trade_stats(sim, commission):
+    """Trade count and win rate of closed trades per column"""
+    equity, exit_code, entry_bar = sim["equity"], sim["exit_code"], sim["entry_bar"]
+    closed = exit_code > 0
+    entry_equity = np.take_along_axis(equity, np.maximum(entry_bar, 0), axis=0)
+    wins = closed & (equity - (entry_equity + commission) > 0)
+    n_closed = closed.sum(axis=0)
+    open_trade = (sim["held"][-1] > 0) & ~closed[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rate = np.where(n_closed > 0, wins.sum(axis=0) / n_closed, 0.0)
+    return {"trades": n_closed + open_trade, "win_rate": win_rate}
+
+
+EXIT_REASONS = {1: "Signal", 2: "Stop Loss", 3: "Take Profit"}
+
+TRADE_COLUMNS = ["Entry Date", "Entry Price", "Exit Date", "Exit Price",
+                 "Quantity", "Return %", "P&L", "Exit Reason"]
+
+
+def trade_table(index, close, sim, position_size, commission):
+    """One row per trade of a 1-D simulation; the last may still be open"""
+    held, entry_bar, exit_code, equity = sim["held"] > 0, sim["entry_bar"], sim["exit_code"], sim["equity"]
+    last = len(close) - 1
+    ends = np.flatnonzero(exit_code > 0)
+    if held[last] and exit_code[last] == 0:
+        ends = np.append(ends, last)
+    if len(ends) == 0:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+
+    starts = entry_bar[ends]
+    if "fill" in sim:
+        # Event-driven fills: actual prices, open trades marked at the close
+        entry_price = sim["fill"][starts]
+        exit_price = np.where(exit_code[ends] > 0, sim["fill"][ends], close[ends])
+        quantity = sim["quantity"][starts]
+        pnl = quantity * (exit_price - entry_price) - 2 * commission
+    else:
+        entry_equity = equity[starts]
+        entry_price, exit_price = close[starts], close[ends]
+        quantity = position_size * entry_equity / entry_price
+        pnl = equity[ends] - (entry_equity + commission)
+    return pd.DataFrame({
+        "Entry Date": index[starts],
+        "Entry Price": entry_price,
+        "Exit Date": index[ends],
+        "Exit Price": exit_price,
+        "Quantity": quantity,
+        "Return %": (exit_price / entry_price - 1.0) * 100,
+        "P&L": pnl,
+        "Exit Reason": [EXIT_REASONS.get(code, "Open") for code in exit_code[ends]],
+    })
+
+
+ENGINES = ("vectorized", "event")
+
+
+def run_backtest(df, strategy, params=None, start=None, capital=100000.0, position_size=0.2,
+                 stop_loss=None, take_profit=None, commission=0.0, engine="vectorized", slippage=0.0):
+    """Backtest one strategy on an OHLCV frame.
+
+    Signals use the whole frame (so indicators are warmed up) while trading
+    and metrics cover bars from ``start`` onwards. ``engine="event"`` uses
+    simulate_events (intrabar stops and targets, ``slippage``) instead of
+    the close-to-close simulate(). Returns a BacktestResult with equity and
+    buy & hold benchmark Series, a trade table and metrics.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    close_all = df['Close'].to_numpy(dtype=float)
+    target_all = signal_positions(strategy, close_all, **(params or {}))
+    first = 0 if start is None else int(df.index.searchsorted(pd.Timestamp(start)))
+    index, close, target = df.index[first:], close_all[first:], target_all[first:]
+    if len(close) < 2:
+        raise ValueError("Not enough bars to backtest")
+
+    if engine == "event":
+        ohl = [df[col].to_numpy(dtype=float)[first:] if col in df else None for col in ("Open", "High", "Low")]
+        sim = simulate_events(*ohl, close, target, stop_loss, take_profit, position_size,
+                              commission, slippage, capital)
+    else:
+        sim = simulate(close, target, stop_loss, take_profit, position_size, commission, capital)
+    equity = sim["equity"]
+    trades = trade_table(index, close, sim, position_size, commission)
+    perf = performance(equity, capital)
+    closed = trades[trades["Exit Reason"] != "Open"]
+    metrics = {
+        "final_equity": float(equity[-1]),
+        "total_return": float(perf["total_return"]),
+        "max_drawdown": float(perf["max_drawdown"]),
+        "sharpe": float(perf["sharpe"]),
+        "trades": int(len(trades)),
+        "win_rate": float((closed["P&L"] > 0).mean()) if len(closed) else 0.0,
+        "exposure": float(sim["held"].mean()),
+        "benchmark_return": float(close[-1] / close[0] - 1.0),
+    }
+    return BacktestResult(
+        equity=pd.Series(equity, index=index, name="Strategy"),
+        benchmark=pd.Series(capital * close / close[0], index=index, name="Buy & Hold"),
+        trades=trades,
+        metrics=metrics,
+    )
+
+
+def price_matrix(frames, column="Close"):
+    """Align {ticker: OHLCV frame} into one (date x ticker) frame.
+
+    Gaps from differing holiday calendars are forward-filled; bars before a
+    ticker's first price stay NaN so it is simply flat until it lists.
+    """
+    if not frames:
+        return pd.DataFrame()
+    matrix = pd.concat({ticker: df[column] for ticker, df in frames.items()}, axis=1).sort_index()
+    return matrix.ffill()
+
+
+def run_universe_backtest(close, strategy, params=None, start=None, capital=100000.0, position_size=0.2,
+                          stop_loss=None, take_profit=None, commission=0.0, rank_by="sharpe"):
+    """Backtest one strategy on every column of a (date x ticker) close frame.
+
+    Signals, accounting and metrics are computed on the whole matrix at once.
+    Every ticker is traded as its own sleeve of ``capital`` so leaderboard
+    figures match a single-ticker backtest; the portfolio curve is the
+    equal-weight average of the sleeves. Returns (leaderboard frame sorted
+    by rank_by, portfolio equity Series, buy & hold Series).
+    """
+    values = close.to_numpy(dtype=float)
+    target = signal_positions(strategy, values, **(params or {}))
+    first = 0 if start is None else int(close.index.searchsorted(pd.Timestamp(start)))
+    index, values, target = close.index[first:], values[first:], target[first:]
+    if len(values) < 2:
+        raise ValueError("Not enough bars to backtest")
+
+    sim = simulate(values, target, stop_loss, take_profit, position_size, commission, capital)
+    perf = performance(sim["equity"], capital)
+    stats = trade_stats(sim, commission)
+
+    first_price = pd.DataFrame(values).bfill().to_numpy()[0]
+    last_price = pd.DataFrame(values).ffill().to_numpy()[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        benchmark_return = last_price / first_price - 1.0
+        hold_growth = np.nan_to_num(values / first_price, nan=1.0)
+
+    leaderboard = pd.DataFrame({
+        "Ticker": close.columns,
+        "Total Return": perf["total_return"],
+        "Sharpe": perf["sharpe"],
+        "Max Drawdown": perf["max_drawdown"],
+        "Trades": stats["trades"],
+        "Win Rate": stats["win_rate"],
+        "Exposure": sim["held"].mean(axis=0),
+        "Buy & Hold": benchmark_return,
+    })
+    leaderboard = leaderboard.sort_values(
+        {"sharpe": "Sharpe", "total_return": "Total Return", "max_drawdown": "Max Drawdown",
+         "win_rate": "Win Rate"}.get(rank_by, "Sharpe"),
+        ascending=False, ignore_index=True,
+    )
+    portfolio = pd.Series(sim["equity"].mean(axis=1), index=index, name="Strategy")
+    benchmark = pd.Series(capital * hold_growth.mean(axis=1), index=index, name="Buy & Hold")
+    return leaderboard, portfolio, benchmark
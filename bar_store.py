@@ -0,0 +1,258 @@
+"""Persistent per-ticker daily bar store.
+
+Each ticker's full daily history lives in one memory-mappable ``.npy`` file.
+A refresh only asks the provider for bars from the last stored session
+onwards, and any ``period`` ("5d", "3mo", "1y", "max", ...) is answered by
+slicing the stored history instead of downloading it again.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from providers import OHLCV_COLUMNS, BatchResult, safe_filename, empty_ohlcv, fetch_many, period_start
+
+BAR_DTYPE = np.dtype([("ts", "<i8")] + [(col, "<f8") for col in OHLCV_COLUMNS])
+
+# Bars re-requested before the last stored one so that a revised (split or
+# dividend adjusted) history is detected and reloaded in full.
+OVERLAP_BARS = 5
+
+
+def _to_records(df):
+    records = np.empty(len(df), dtype=BAR_DTYPE)
+    records["ts"] = df.index.values.astype("datetime64[ns]").astype(np.int64)
+    for col in OHLCV_COLUMNS:
+        records[col] = df[col].to_numpy(dtype=float, na_value=np.nan)
+    return records
+
+
+def _to_frame(records):
+    index = pd.DatetimeIndex(np.asarray(records["ts"]).astype("datetime64[ns]"), name="Date")
+    return pd.DataFrame({col: np.array(records[col]) for col in OHLCV_COLUMNS}, index=index)
+
+
+class BarStore:
+    """Full daily history per ticker on disk, refreshed incrementally.
+
+    ``provider`` is any object with ``history(ticker, start=None, period=None)``
+    returning a normalized OHLCV frame, so a local source can stand in for the
+    network. ``min_refresh_interval`` (seconds) stops several periods, sessions
+    or worker processes from asking upstream for the same ticker back to back.
+    A failed refresh of a stored ticker counts as an attempt too, so an
+    upstream outage is retried once per interval instead of on every read.
+    """
+
+    def __init__(self, root, provider, seed_period="max", min_refresh_interval=300):
+        self.root = root
+        self.provider = provider
+        self.seed_period = seed_period
+        self.min_refresh_interval = min_refresh_interval
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._failed_at = {}
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"{safe_filename(ticker)}.npy")
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _records(self, ticker):
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=BAR_DTYPE)
+        return np.load(path, mmap_mode="r")
+
+    def _write(self, ticker, records):
+        path = self.path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, records)
+        os.replace(tmp_path, path)
+
+    def is_fresh(self, ticker):
+        """True when the ticker was refreshed, or a refresh failed, within min_refresh_interval"""
+        now = time.time()
+        if now - self._failed_at.get(ticker, -np.inf) < self.min_refresh_interval:
+            return True
+        path = self.path(ticker)
+        return os.path.exists(path) and now - os.path.getmtime(path) < self.min_refresh_interval
+
+    def _note_failure(self, ticker):
+        self._failed_at[ticker] = time.time()
+
+    def load(self, ticker):
+        """Stored history as a DataFrame, without touching the provider"""
+        records = self._records(ticker)
+        return _to_frame(records) if len(records) else empty_ohlcv()
+
+    def bars_since(self, ticker, ts=None):
+        """Stored bars at or after ts (all bars when ts is None)"""
+        records = self._records(ticker)
+        if ts is not None and len(records):
+            records = records[int(np.searchsorted(records["ts"], pd.Timestamp(ts).value, side="left")):]
+        return _to_frame(records) if len(records) else empty_ohlcv()
+
+    def origin(self, ticker):
+        """[timestamp, close] of the first stored bar; changes when history is reloaded"""
+        records = self._records(ticker)
+        if len(records) == 0:
+            return None
+        return [int(records["ts"][0]), float(records["Close"][0])]
+
+    def state_path(self, ticker, name):
+        return os.path.join(self.root, f"{safe_filename(ticker)}.{name}.json")
+
+    def load_state(self, ticker, name):
+        """JSON state saved next to a ticker's bars, or None"""
+        try:
+            with open(self.state_path(ticker, name)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def save_state(self, ticker, name, data):
+        """Persist JSON-serializable state next to a ticker's bars"""
+        path = self.state_path(ticker, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, path)
+
+    def _update_start(self, stored):
+        return pd.Timestamp(int(stored["ts"][-min(OVERLAP_BARS, len(stored))])).normalize()
+
+    def _merge(self, ticker, stored, fetched_df):
+        # Caller holds the ticker lock. Returns the number of bars added.
+        fetched = _to_records(fetched_df)
+        if len(stored) == 0:
+            records = fetched
+        elif self._history_revised(stored[-OVERLAP_BARS:-1], fetched):
+            records = _to_records(self.provider.history(ticker, period=self.seed_period))
+        elif len(fetched):
+            keep = stored[stored["ts"] < fetched["ts"][0]]
+            records = np.concatenate([keep, fetched])
+        else:
+            records = np.array(stored)
+
+        if len(records) == 0:
+            return 0
+        self._write(ticker, records)
+        return max(len(records) - len(stored), 0)
+
+    def refresh(self, ticker, force=False):
+        """Fetch bars after the last stored one and append them.
+
+        Returns the number of bars written. If the provider fails, the stored
+        history is kept and the error is raised only when nothing is stored.
+        """
+        with self._lock(ticker):
+            if not force and self.is_fresh(ticker):
+                return 0
+            stored = self._records(ticker)
+            try:
+                if len(stored) == 0:
+                    fetched = self.provider.history(ticker, period=self.seed_period)
+                else:
+                    fetched = self.provider.history(ticker, start=self._update_start(stored))
+                added = self._merge(ticker, stored, fetched)
+            except Exception:
+                if len(stored) == 0:
+                    raise
+                self._note_failure(ticker)
+                return 0
+            self._failed_at.pop(ticker, None)
+            return added
+
+    def refresh_many(self, tickers, force=False):
+        """Refresh several tickers with at most two batched provider calls.
+
+        Tickers with no history are seeded in one request and the rest are
+        updated from the earliest of their last stored sessions in another.
+        Returns {ticker: error message} for tickers that could not be fetched.
+        """
+        stale = [t for t in dict.fromkeys(tickers) if force or not self.is_fresh(t)]
+        stored = {t: self._records(t) for t in stale}
+        seed = [t for t in stale if len(stored[t]) == 0]
+        update = [t for t in stale if len(stored[t]) > 0]
+
+        errors = {}
+        requests = []
+        if seed:
+            requests.append((seed, dict(period=self.seed_period)))
+        if update:
+            start = min(self._update_start(stored[t]) for t in update)
+            requests.append((update, dict(start=start)))
+
+        for batch, kwargs in requests:
+            try:
+                result = fetch_many(self.provider, batch, **kwargs)
+            except Exception as e:
+                result = BatchResult({}, {ticker: str(e) for ticker in batch})
+            errors.update(result.errors)
+            for ticker, df in result.frames.items():
+                with self._lock(ticker):
+                    try:
+                        self._merge(ticker, self._records(ticker), df)
+                        self._failed_at.pop(ticker, None)
+                    except Exception as e:
+                        errors[ticker] = str(e)
+        for ticker in errors:
+            if len(stored.get(ticker, ())):
+                self._note_failure(ticker)
+        return errors
+
+    @staticmethod
+    def _history_revised(overlap, fetched):
+        # Settled bars that come back with different closes mean the provider
+        # re-adjusted the series; the still-forming last bar is excluded.
+        if len(overlap) == 0 or len(fetched) == 0:
+            return False
+        common, stored_idx, fetched_idx = np.intersect1d(overlap["ts"], fetched["ts"], return_indices=True)
+        if len(common) == 0:
+            return False
+        old = np.asarray(overlap["Close"])[stored_idx]
+        new = fetched["Close"][fetched_idx]
+        return not np.allclose(old, new, rtol=1e-6, equal_nan=True)
+
+    @staticmethod
+    def _slice(records, period):
+        if len(records) == 0:
+            return empty_ohlcv()
+        start = period_start(period, pd.Timestamp(int(records["ts"][-1])))
+        if start is None:
+            first = 0
+        elif isinstance(start, int):
+            first = max(len(records) - start, 0)
+        else:
+            first = int(np.searchsorted(records["ts"], start.value, side="left"))
+        return _to_frame(records[first:])
+
+    def get(self, ticker, period="1y", refresh=True):
+        """History for ticker sliced to period, refreshing first if stale"""
+        if refresh:
+            self.refresh(ticker)
+        return self._slice(self._records(ticker), period)
+
+    def get_many(self, tickers, period="1y", refresh=True):
+        """Sliced history for many tickers, refreshed with batched fetches.
+
+        Returns a BatchResult; tickers without any stored history are listed
+        in errors, the others are served even if their refresh failed.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        fetch_errors = self.refresh_many(tickers) if refresh else {}
+        frames, errors = {}, {}
+        for ticker in tickers:
+            df = self._slice(self._records(ticker), period)
+            if df.empty:
+                errors[ticker] = fetch_errors.get(ticker, "no stored history")
+            else:
+                frames[ticker] = df
+        return BatchResult(frames, errors)
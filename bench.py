@@ -0,0 +1,329 @@
+"""Headless benchmark of every page in app.py.
+
+Each page is rendered with Streamlit's AppTest against replayed fixture data
+(synthetic by default, or a directory written by providers.record_fixtures)
+and measured for:
+
+* cold_s   - wall time of the first render with empty caches and bar store
+* warm_s   - best wall time of the following reruns (caches populated)
+* fetches  - provider requests made during the cold render
+* peak_mb  - peak Python memory of a cold render (tracemalloc)
+
+With --profile the cold render is also profiled and its time split into
+data, indicators, backtest and plotly phases.
+
+Results are compared with a stored baseline and the run fails (exit code 1)
+when a page is slower or heavier than the baseline allows:
+
+    python bench.py                      # compare against bench_baseline.json
+    python bench.py --update-baseline    # record a new baseline
+    python bench.py --pages home backtesting --profile
+"""
+import argparse
+import ast
+import cProfile
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "app.py")
+DEFAULT_BASELINE = os.path.join(HERE, "bench_baseline.json")
+
+# Session state that routes main() to each show_* page.
+PAGES = {
+    "home": {"current_section": "Home"},
+    "market_trends": {"current_section": "Market Trends"},
+    "ai_predictions": {"current_section": "AI Predictions"},
+    "options_trading": {"current_section": "Options Trading"},
+    "portfolio_insights": {"current_section": "Portfolio Insights"},
+    "backtesting": {"current_section": "Backtesting"},
+    "screener": {"current_section": "Screener"},
+    "market_intelligence": {"current_section": "Home", "current_tool": "Market Intelligence"},
+    "market_news": {"current_section": "Home", "current_tool": "Market News"},
+    "ai_signals": {"current_section": "Home", "current_tool": "AI Signals"},
+}
+
+PHASES = {
+    "data": ("providers.py", "bar_store.py"),
+    "indicators": ("indicators.py", "incremental.py"),
+    "backtest": ("backtest.py", "sweep.py"),
+    "plotly": (),
+}
+
+# Allowed growth over the baseline before a metric counts as a regression.
+# Times also get an absolute slack so millisecond-scale pages are not flaky.
+DEFAULT_BUDGET = {"time": 0.25, "time_slack_s": 0.05, "memory": 0.25}
+
+_TICKER = re.compile(r"^(\^[A-Z0-9]+|[A-Z0-9&\-]+\.(NS|BO))$")
+
+
+# ----------------------- FIXTURES -----------------------
+def app_tickers(path=APP):
+    """Every ticker app.py can request: the stocks dict plus ticker-like literals"""
+    tree = ast.parse(open(path).read())
+    tickers = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "stocks" for t in node.targets) \
+                and isinstance(node.value, ast.Dict):
+            tickers.extend(v.value for v in node.value.values if isinstance(v, ast.Constant))
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) and _TICKER.match(node.value):
+            tickers.append(node.value)
+    return list(dict.fromkeys(tickers))
+
+
+def write_fixtures(root, tickers, bars=1500, end="2025-12-31"):
+    """Deterministic random-walk OHLCV and info fixtures for a ReplayProvider"""
+    from providers import safe_filename
+
+    os.makedirs(root, exist_ok=True)
+    index = pd.bdate_range(end=end, periods=bars, name="Date")
+    for ticker in tickers:
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        close = rng.uniform(50, 5000) * np.exp(np.cumsum(rng.normal(3e-4, 0.015, bars)))
+        open_ = close * (1 + rng.normal(0, 0.004, bars))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, bars)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, bars)))
+        volume = rng.integers(100_000, 5_000_000, bars)
+        df = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+                          index=index)
+        df.to_csv(os.path.join(root, f"{safe_filename(ticker)}.csv"))
+        info = {
+            "longName": ticker,
+            "trailingPE": round(float(rng.uniform(8, 60)), 2),
+            "dividendYield": round(float(rng.uniform(0, 0.04)), 4),
+            "marketCap": float(rng.uniform(1e10, 2e13)),
+            "beta": round(float(rng.uniform(0.5, 1.8)), 2),
+            "sector": "Synthetic",
+        }
+        with open(os.path.join(root, f"{safe_filename(ticker)}.info.json"), "w") as fh:
+            json.dump(info, fh)
+
+
+# ----------------------- MEASUREMENT -----------------------
+def _track_providers():
+    # Keep every provider the app builds so its request counter can be read.
+    import providers
+
+    created = []
+    original = providers.provider_from_env
+
+    def tracking(environ=None):
+        provider = original(environ)
+        created.append(provider)
+        return provider
+
+    providers.provider_from_env = tracking
+    return created
+
+
+def _fresh_app(state, data_dir, timeout):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import shared_cache
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    shared_cache.clear_all()
+    shutil.rmtree(data_dir, ignore_errors=True)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at
+
+
+def _fetches(created):
+    return sum(sum(getattr(p, "calls", {}).values()) for p in created)
+
+
+def _render(at):
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+def _profiled_render(at):
+    # AppTest runs the script on its own thread, so the profiler is switched
+    # on from inside that thread the first time it executes.
+    profiler = cProfile.Profile()
+
+    def bootstrap(frame, event, arg):
+        sys.setprofile(None)
+        if threading.current_thread().name.startswith("ScriptRunner"):
+            profiler.enable()
+
+    threading.setprofile(bootstrap)
+    try:
+        elapsed = _render(at)
+    finally:
+        threading.setprofile(None)
+        profiler.disable()
+    return elapsed, profiler
+
+
+def phase_times(profiler):
+    """Seconds spent in each PHASES group, counted where it is entered from outside"""
+    import pstats
+
+    import plotly
+
+    plotly_dir = os.path.dirname(plotly.__file__)
+    files = {name: {os.path.join(HERE, f) for f in modules} for name, modules in PHASES.items()}
+
+    def phase_of(filename):
+        if filename.startswith(plotly_dir):
+            return "plotly"
+        for name, paths in files.items():
+            if filename in paths:
+                return name
+        return None
+
+    totals = dict.fromkeys(PHASES, 0.0)
+    for func, (_, _, _, _, callers) in pstats.Stats(profiler).stats.items():
+        phase = phase_of(func[0])
+        if phase is None:
+            continue
+        for caller, stats in callers.items():
+            if phase_of(caller[0]) != phase:
+                totals[phase] += stats[3]
+    return totals
+
+
+def measure_page(name, state, data_dir, created, repeat=3, profile=False, timeout=120):
+    """Cold, warm, fetch, memory (and optional phase) measurements for one page"""
+    at = _fresh_app(state, data_dir, timeout)
+    del created[:]
+    cold = _render(at)
+    result = {"cold_s": cold, "fetches": _fetches(created)}
+    result["warm_s"] = min(_render(at) for _ in range(repeat))
+
+    at = _fresh_app(state, data_dir, timeout)
+    tracemalloc.start()
+    try:
+        _render(at)
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+    if profile:
+        at = _fresh_app(state, data_dir, timeout)
+        _, profiler = _profiled_render(at)
+        result.update({f"{phase}_s": seconds for phase, seconds in phase_times(profiler).items()})
+    return result
+
+
+# ----------------------- BASELINE -----------------------
+def regressions(results, baseline, budget=DEFAULT_BUDGET):
+    """Human readable list of metrics that exceed the baseline's budget"""
+    problems = []
+    for page, now in results.items():
+        before = baseline.get("pages", {}).get(page)
+        if not before:
+            continue
+        for metric in ("cold_s", "warm_s"):
+            limit = max(before[metric] * (1 + budget["time"]), before[metric] + budget["time_slack_s"])
+            if now[metric] > limit:
+                problems.append(f"{page}: {metric} {now[metric]:.3f}s > {limit:.3f}s (baseline {before[metric]:.3f}s)")
+        if now["fetches"] > before["fetches"]:
+            problems.append(f"{page}: fetches {now['fetches']} > baseline {before['fetches']}")
+        limit = before["peak_mb"] * (1 + budget["memory"])
+        if now["peak_mb"] > limit:
+            problems.append(f"{page}: peak_mb {now['peak_mb']:.1f} > {limit:.1f} (baseline {before['peak_mb']:.1f})")
+    return problems
+
+
+def load_baseline(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def format_table(results):
+    columns = ["cold_s", "warm_s", "fetches", "peak_mb"] + [f"{p}_s" for p in PHASES]
+    frame = pd.DataFrame.from_dict(results, orient="index")
+    return frame[[c for c in columns if c in frame]].round(3).to_string()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app.py pages against a stored baseline")
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), help="pages to run (default: all)")
+    parser.add_argument("--fixtures", help="replay fixture directory (default: synthetic fixtures)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds slept per provider request")
+    parser.add_argument("--repeat", type=int, default=3, help="warm reruns per page")
+    parser.add_argument("--profile", action="store_true", help="split cold renders into phases")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET["time"],
+                        help="allowed fractional slowdown (default 0.25)")
+    parser.add_argument("--output", help="also write the results as JSON")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="smart-trade-bench-")
+    try:
+        fixtures = args.fixtures
+        if fixtures is None:
+            fixtures = os.path.join(workdir, "fixtures")
+            write_fixtures(fixtures, app_tickers())
+        data_dir = os.path.join(workdir, "data")
+        os.environ.update({
+            "SMART_TRADE_PROVIDER": "replay",
+            "SMART_TRADE_REPLAY_DIR": fixtures,
+            "SMART_TRADE_REPLAY_LATENCY": str(args.latency),
+            "SMART_TRADE_DATA_DIR": data_dir,
+            "SMART_TRADE_PREFETCH": "0",
+        })
+        sys.path.insert(0, HERE)
+        created = _track_providers()
+
+        results = {}
+        for name in args.pages or list(PAGES):
+            print(f"running {name}...", file=sys.stderr)
+            results[name] = measure_page(name, PAGES[name], data_dir, created,
+                                         repeat=args.repeat, profile=args.profile, timeout=args.timeout)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(format_table(results))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline) or {}
+        baseline.setdefault("pages", {}).update(
+            {page: {k: now[k] for k in ("cold_s", "warm_s", "fetches", "peak_mb")} for page, now in results.items()})
+        baseline["python"] = sys.version.split()[0]
+        with open(args.baseline, "w") as fh:
+            json.dump(baseline, fh, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    problems = regressions(results, baseline, dict(DEFAULT_BUDGET, time=args.budget))
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
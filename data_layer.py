@@ -0,0 +1,74 @@
+"""Concurrent data access for a page render.
+
+The app's data functions are synchronous (they block on the bar store and
+the provider). RenderData runs them with ``asyncio.to_thread`` so that the
+requests of one page - price history, fundamentals, quotes - are in flight
+at the same time and a cold ticker costs the slowest fetch instead of the
+sum of all of them. Identical requests made during the same render share
+one call.
+
+Pages use the sync facade::
+
+    data = RenderData({"history": get_stock_data, "info": get_stock_info})
+    result = data.fetch({"prices": ("history", ticker, "1y"), "info": ("info", ticker)})
+"""
+import asyncio
+import threading
+
+
+class RenderData:
+    """Per-render request deduplication over named sync data sources"""
+
+    def __init__(self, sources):
+        self.sources = sources
+        self._results = {}
+        self._tasks = {}
+
+    async def get(self, name, *args):
+        """Result of sources[name](*args), computed once per render"""
+        key = (name,) + args
+        if key in self._results:
+            return self._results[key]
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(asyncio.to_thread(self.sources[name], *args))
+        value = await task
+        self._results[key] = value
+        return value
+
+    async def gather(self, requests):
+        """{label: (source, *args)} -> {label: result}, all fetched concurrently"""
+        labels = list(requests)
+        try:
+            values = await asyncio.gather(*(self.get(*requests[label]) for label in labels))
+        finally:
+            # Tasks belong to this event loop; results are kept for the render
+            self._tasks.clear()
+        return dict(zip(labels, values))
+
+    def fetch(self, requests):
+        """Sync facade over gather() for Streamlit scripts"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.gather(requests))
+
+        # Called from inside a running event loop: run on a helper thread
+        outcome = {}
+
+        def run():
+            try:
+                outcome["value"] = asyncio.run(self.gather(requests))
+            except BaseException as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=run, name="render-data")
+        thread.start()
+        thread.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["value"]
+
+    def get_sync(self, name, *args):
+        """Single request through the same per-render memo"""
+        return self.fetch({"value": (name,) + args})["value"]
@@ -0,0 +1,372 @@
+"""Return forecasts from an online scikit-learn model per ticker.
+
+Features are causal (each row only uses bars up to that date): lagged log
+returns, the indicator engine's RSI, MACD histogram, Bollinger position,
+distance from SMA 20, volatility and ATR, and volume features. For every
+horizon an SGD regressor on standardized features predicts the forward log
+return. Models are trained with ``partial_fit``: the first fit makes a few
+passes over the history, and later data refreshes only feed the new bars.
+Accuracy is measured prequentially - new bars are predicted before the
+model learns from them - which gives the hit rate and RMSE reported with
+every forecast.
+"""
+import math
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+import indicators
+
+# Forecast horizons in trading days.
+HORIZONS = {"next_day": 1, "next_week": 5, "next_month": 21}
+
+RETURN_LAGS = (1, 2, 3, 5, 10, 21)
+
+FEATURE_NAMES = tuple(f"ret_{lag}" for lag in RETURN_LAGS) + (
+    "rsi14", "macd_hist", "bb_pct", "vs_sma20", "volatility20", "atr_pct", "volume_z", "volume_change",
+)
+
+MIN_TRAIN_ROWS = 120
+INITIAL_EPOCHS = 5
+HOLDOUT = 0.2
+
+# Targets are fitted in percent so SGD's default step sizes are well scaled.
+TARGET_SCALE = 100.0
+
+Forecast = namedtuple("Forecast", ["price", "atr", "volatility", "horizons", "version"])
+
+
+def features(df):
+    """(bars, len(FEATURE_NAMES)) feature matrix for an OHLCV frame; warm-up rows are NaN"""
+    close = df['Close'].to_numpy(dtype=float)
+    high = df['High'].to_numpy(dtype=float) if 'High' in df else close
+    low = df['Low'].to_numpy(dtype=float) if 'Low' in df else close
+    volume = df['Volume'].to_numpy(dtype=float) if 'Volume' in df else np.full(len(close), np.nan)
+    log_close = np.log(close)
+
+    columns = []
+    for lag in RETURN_LAGS:
+        lagged = np.full(len(close), np.nan)
+        lagged[lag:] = log_close[lag:] - log_close[:-lag]
+        columns.append(lagged)
+
+    ind = indicators.compute(close, high, low, ("rsi14", "macd_hist", "bb_upper", "bb_lower", "sma20",
+                                                "volatility20", "atr14"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        width = ind["bb_upper"] - ind["bb_lower"]
+        log_volume = np.log1p(np.where(volume > 0, volume, np.nan))
+        volume_mean = indicators.sma(log_volume, 20)
+        volume_std = indicators.rolling_std(log_volume, 20)
+        volume_change = np.full(len(close), np.nan)
+        volume_change[1:] = log_volume[1:] - log_volume[:-1]
+        columns += [
+            ind["rsi14"] / 100 - 0.5,
+            ind["macd_hist"] / close,
+            np.where(width > 0, (close - ind["bb_lower"]) / width - 0.5, 0.0),
+            close / ind["sma20"] - 1.0,
+            ind["volatility20"],
+            ind["atr14"] / close,
+            np.where(volume_std > 0, (log_volume - volume_mean) / volume_std, 0.0),
+            volume_change,
+        ]
+    X = np.column_stack(columns)
+    # Missing volume (indices) should not drop the row
+    X[:, -2:] = np.nan_to_num(X[:, -2:])
+    return X
+
+
+def forward_returns(close, horizon):
+    """Log return from each bar to ``horizon`` bars later (NaN where unknown)"""
+    log_close = np.log(np.asarray(close, dtype=float))
+    out = np.full(len(log_close), np.nan)
+    out[:-horizon] = log_close[horizon:] - log_close[:-horizon]
+    return out
+
+
+def _own_arrays(estimator):
+    # Models loaded from the registry memory-map their arrays read-only;
+    # partial_fit writes into them, so take private copies first.
+    for name, value in vars(estimator).items():
+        if isinstance(value, np.memmap):
+            setattr(estimator, name, np.array(value))
+
+
+class HorizonModel:
+    """Scaler + SGD regressor for one horizon, with prequential error stats"""
+
+    def __init__(self, seed=0):
+        self.scaler = StandardScaler()
+        self.model = SGDRegressor(loss="huber", epsilon=1.0, alpha=1e-3, learning_rate="invscaling",
+                                  eta0=0.005, random_state=seed)
+        self.rng = np.random.default_rng(seed)
+        self.samples = 0
+        self.evaluated = 0
+        self.hits = 0
+        self.squared_error = 0.0
+        self.absolute_error = 0.0
+
+    def _partial_fit(self, X, y, epochs=1):
+        _own_arrays(self.scaler)
+        _own_arrays(self.model)
+        self.scaler.partial_fit(X)
+        Xs = self.scaler.transform(X)
+        for _ in range(epochs):
+            order = self.rng.permutation(len(y))
+            self.model.partial_fit(Xs[order], y[order] * TARGET_SCALE)
+        self.samples += len(y)
+
+    def _evaluate(self, X, y):
+        predicted = self.predict(X)
+        self.evaluated += len(y)
+        self.hits += int(np.sum(np.sign(predicted) == np.sign(y)))
+        self.squared_error += float(np.sum((predicted - y) ** 2))
+        self.absolute_error += float(np.sum(np.abs(predicted - y)))
+
+    def fit(self, X, y):
+        """First fit: train on the older rows, score the newest HOLDOUT, then learn them too"""
+        split = int(len(y) * (1 - HOLDOUT))
+        self._partial_fit(X[:split], y[:split], epochs=INITIAL_EPOCHS)
+        self._evaluate(X[split:], y[split:])
+        self._partial_fit(X[split:], y[split:], epochs=INITIAL_EPOCHS)
+
+    def update(self, X, y):
+        """Incremental fit on new rows, scored before they are learned"""
+        self._evaluate(X, y)
+        self._partial_fit(X, y)
+
+    def predict(self, X):
+        return self.model.predict(self.scaler.transform(X)) / TARGET_SCALE
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.evaluated if self.evaluated else math.nan
+
+    @property
+    def rmse(self):
+        return math.sqrt(self.squared_error / self.evaluated) if self.evaluated else math.nan
+
+    @property
+    def mae(self):
+        return self.absolute_error / self.evaluated if self.evaluated else math.nan
+
+    def __setstate__(self, state):
+        # Artifacts saved before MAE was tracked leave it unknown
+        state.setdefault("absolute_error", math.nan)
+        self.__dict__.update(state)
+
+
+class ForecastModel:
+    """All horizon models of one ticker plus how far each has been trained"""
+
+    def __init__(self, horizons=HORIZONS, seed=0):
+        self.horizons = dict(horizons)
+        self.models = {name: HorizonModel(seed) for name in self.horizons}
+        self.trained_through = {name: None for name in self.horizons}
+        self.origin = None
+
+    def update(self, df):
+        """Learn every labeled bar of df not seen yet. Returns the number of new rows"""
+        X = features(df)
+        close = df['Close'].to_numpy(dtype=float)
+        valid = ~np.isnan(X).any(axis=1)
+        added = 0
+        for name, horizon in self.horizons.items():
+            y = forward_returns(close, horizon)
+            rows = valid & ~np.isnan(y)
+            last = self.trained_through[name]
+            if last is not None:
+                rows &= df.index > last
+            idx = np.flatnonzero(rows)
+            model = self.models[name]
+            if model.samples == 0:
+                if len(idx) < MIN_TRAIN_ROWS:
+                    continue
+                model.fit(X[idx], y[idx])
+            elif len(idx):
+                model.update(X[idx], y[idx])
+            else:
+                continue
+            self.trained_through[name] = df.index[idx[-1]]
+            added += len(idx)
+        return added
+
+    def continues(self, df):
+        """True when df picks up where training stopped: the last trained bar of
+        every horizon is still in df. A sliding window that moved forward keeps
+        the model; a history that no longer contains those bars does not."""
+        trained = [ts for ts in self.trained_through.values() if ts is not None]
+        return all(ts in df.index for ts in trained)
+
+    def predict(self, df):
+        """{horizon: predicted log return} from the last bar of df"""
+        x = features(df)[-1:]
+        if np.isnan(x).any():
+            return {}
+        return {name: float(model.predict(x)[0]) for name, model in self.models.items() if model.samples}
+
+    def metadata(self):
+        """JSON-serializable description: features, train window and accuracy per horizon"""
+        def iso(ts):
+            return None if ts is None else pd.Timestamp(ts).isoformat()
+        return {
+            "features": list(FEATURE_NAMES),
+            "horizons": dict(self.horizons),
+            "origin": iso(self.origin),
+            "trained_through": {name: iso(ts) for name, ts in self.trained_through.items()},
+            "metrics": {name: {"samples": m.samples, "evaluated": m.evaluated,
+                               "hit_rate": None if math.isnan(m.hit_rate) else m.hit_rate,
+                               "rmse": None if math.isnan(m.rmse) else m.rmse,
+                               "mae": None if math.isnan(m.mae) else m.mae}
+                        for name, m in self.models.items()},
+        }
+
+
+def _version(df):
+    return (df.index[0], df.index[-1], len(df), float(df['Close'].iloc[-1]))
+
+
+class ForecastCache:
+    """Per-ticker models kept warm across reruns, plus the forecast of each data version.
+
+    A rerun with unchanged data returns the stored Forecast (a dict lookup);
+    new bars are fed to the existing model with partial_fit, including when
+    the history window slides forward. A model whose last trained bars are
+    no longer in the history (reloaded data, a gap) is retrained.
+    ``loader(ticker)``, when given, supplies a pretrained ForecastModel (or
+    None) the first time a ticker is requested.
+
+    Training and loading hold only that ticker's lock, so one ticker's
+    update never delays another ticker's forecast.
+    """
+
+    def __init__(self, maxsize=256, horizons=HORIZONS, loader=None):
+        self.maxsize = maxsize
+        self.horizons = dict(horizons)
+        self.loader = loader
+        self._models = OrderedDict()
+        self._forecasts = {}
+        self._ticker_locks = {}
+        self._lock = threading.Lock()
+
+    def model(self, ticker):
+        with self._lock:
+            return self._models.get(ticker)
+
+    def busy(self):
+        """True while any ticker is being loaded or trained"""
+        with self._lock:
+            return any(lock.locked() for lock in self._ticker_locks.values())
+
+    def _cached(self, ticker, version):
+        # Caller holds self._lock
+        cached = self._forecasts.get(ticker)
+        if cached is not None and cached.version == version:
+            if ticker in self._models:
+                self._models.move_to_end(ticker)
+            return cached
+        return None
+
+    def get(self, ticker, df):
+        """Forecast for the last bar of df, or None with too little history"""
+        if df is None or df.empty or len(df) < MIN_TRAIN_ROWS + max(self.horizons.values()) + 30:
+            return None
+        version = _version(df)
+        with self._lock:
+            cached = self._cached(ticker, version)
+            if cached is not None:
+                return cached
+            ticker_lock = self._ticker_locks.setdefault(ticker, threading.Lock())
+
+        with ticker_lock:
+            with self._lock:
+                # Another thread may have produced it while we waited
+                cached = self._cached(ticker, version)
+                if cached is not None:
+                    return cached
+                model = self._models.get(ticker)
+            if model is None and self.loader is not None:
+                model = self.loader(ticker)
+            if model is None or model.horizons != self.horizons or not model.continues(df):
+                model = ForecastModel(self.horizons)
+                model.origin = df.index[0]
+            model.update(df)
+            forecast = self._forecast(model, df, version)
+
+            with self._lock:
+                self._models[ticker] = model
+                self._models.move_to_end(ticker)
+                self._forecasts[ticker] = forecast
+                while len(self._models) > self.maxsize:
+                    evicted, _ = self._models.popitem(last=False)
+                    self._forecasts.pop(evicted, None)
+                    self._ticker_locks.pop(evicted, None)
+            return forecast
+
+    def _forecast(self, model, df, version):
+        price = float(df['Close'].iloc[-1])
+        atr = indicators.last_valid(indicators.atr(df['High'], df['Low'], df['Close'])) \
+            if 'High' in df and 'Low' in df else math.nan
+        volatility = indicators.last_valid(indicators.rolling_volatility(df['Close'], annualize=True))
+        predicted = model.predict(df)
+        horizons = {}
+        for name, log_return in predicted.items():
+            m = model.models[name]
+            horizons[name] = {
+                "days": self.horizons[name],
+                "return": math.expm1(log_return),
+                "price": price * math.exp(log_return),
+                "rmse": m.rmse,
+                "mae": m.mae,
+                "hit_rate": m.hit_rate,
+                "samples": m.samples,
+            }
+        return Forecast(price, atr, volatility, horizons, version)
+
+
+def probability_below(forecast, horizon, threshold):
+    """P(return over horizon < threshold) under a normal around the forecast with its RMSE"""
+    h = forecast.horizons.get(horizon)
+    if not h or not h["rmse"] or math.isnan(h["rmse"]):
+        return math.nan
+    z = (math.log1p(threshold) - math.log1p(h["return"])) / h["rmse"]
+    return 0.5 * (1 + math.erf(z / math.sqrt(2)))
+
+
+def forecast_path(forecast):
+    """(days ahead, price, lower, upper) through the horizon forecasts, one point per trading day.
+
+    The expected log return and its RMSE are interpolated linearly between
+    today (zero) and each horizon; the band is +/- one RMSE.
+    """
+    points = sorted((h["days"], math.log1p(h["return"]), h["rmse"]) for h in forecast.horizons.values())
+    if not points:
+        return np.zeros(0, dtype=int), np.zeros(0), np.zeros(0), np.zeros(0)
+    known = [(0, 0.0, 0.0)] + [p for p in points if not math.isnan(p[2])]
+    days = np.arange(points[-1][0] + 1)
+    center = np.interp(days, [p[0] for p in points], [p[1] for p in points], left=0.0)
+    center[0] = 0.0
+    spread = np.interp(days, [p[0] for p in known], [p[2] for p in known])
+    price = forecast.price
+    return days, price * np.exp(center), price * np.exp(center - spread), price * np.exp(center + spread)
+
+
+def trade_levels(forecast, atr_multiple=2.0):
+    """Stop loss at ``atr_multiple`` ATRs below the price; targets at the upper
+    one-RMSE edge of the next-week and next-month forecasts"""
+    price = forecast.price
+    if forecast.atr and not math.isnan(forecast.atr):
+        stop_loss = price - atr_multiple * forecast.atr
+    else:
+        stop_loss = price * (1 - atr_multiple * forecast.volatility / math.sqrt(252))
+    targets = []
+    for name in ("next_week", "next_month"):
+        h = forecast.horizons.get(name)
+        if h is None or math.isnan(h["rmse"]):
+            targets.append(math.nan)
+        else:
+            targets.append(h["price"] * math.exp(h["rmse"]))
+    return stop_loss, targets[0], targets[1]
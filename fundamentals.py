@@ -0,0 +1,162 @@
+"""Compact fundamentals for the whole ticker universe.
+
+Only the handful of ``info`` fields the app reads are kept. A single
+ticker's data is a ``Fundamentals`` namedtuple. The universe is one
+columnar structured array (one row per ticker, one float column per field)
+persisted as ``fundamentals.npy``, so it survives restarts and can be
+screened as a whole with ``table()``.
+"""
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FUNDAMENTAL_FIELDS = ("trailingPE", "dividendYield", "marketCap", "beta")
+
+Fundamentals = namedtuple("Fundamentals", ("ticker",) + FUNDAMENTAL_FIELDS + ("updated",))
+
+RECORD_DTYPE = np.dtype([("ticker", "U32")] + [(f, "<f8") for f in FUNDAMENTAL_FIELDS] + [("updated", "<f8")])
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return value if math.isfinite(value) else math.nan
+
+
+def project(ticker, info, updated=None):
+    """Fundamentals record holding only FUNDAMENTAL_FIELDS of an info dict (NaN when missing)"""
+    info = info or {}
+    values = [_number(info.get(field)) for field in FUNDAMENTAL_FIELDS]
+    return Fundamentals(ticker, *values, time.time() if updated is None else updated)
+
+
+def empty(ticker):
+    """Record with every field missing, for a ticker that could not be loaded"""
+    return Fundamentals(ticker, *([math.nan] * len(FUNDAMENTAL_FIELDS)), math.nan)
+
+
+class FundamentalsStore:
+    """Universe-wide fundamentals table, refreshed from ``provider.info``.
+
+    Records older than ``max_age`` seconds are refetched on access. A failed
+    fetch counts as an attempt too, so during an upstream outage a ticker is
+    retried once per ``max_age`` instead of on every read. Bulk refreshes call
+    the provider from a bounded thread pool (``info`` has no batch endpoint)
+    and write the table to disk once.
+    """
+
+    def __init__(self, root, provider, max_age=3600, max_workers=8):
+        self.root = root
+        self.provider = provider
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._failed_at = {}
+        os.makedirs(root, exist_ok=True)
+        self._records = self._read()
+        self._rows = {t: i for i, t in enumerate(self._records["ticker"])}
+
+    @property
+    def path(self):
+        return os.path.join(self.root, "fundamentals.npy")
+
+    def _read(self):
+        try:
+            records = np.load(self.path)
+        except (OSError, ValueError):
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return records if records.dtype == RECORD_DTYPE else np.empty(0, dtype=RECORD_DTYPE)
+
+    def _save(self):
+        # Caller holds the lock.
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, self._records)
+        os.replace(tmp_path, self.path)
+
+    def _put(self, records):
+        # Caller holds the lock.
+        new = [r for r in records if r.ticker not in self._rows]
+        if new:
+            start = len(self._records)
+            self._records = np.concatenate([self._records, np.zeros(len(new), dtype=RECORD_DTYPE)])
+            for i, record in enumerate(new):
+                self._rows[record.ticker] = start + i
+        for record in records:
+            self._records[self._rows[record.ticker]] = tuple(record)
+
+    def __len__(self):
+        return len(self._records)
+
+    def record(self, ticker):
+        """Stored record for ticker or None, without touching the provider"""
+        with self._lock:
+            row = self._rows.get(ticker)
+            return None if row is None else Fundamentals(*self._records[row].tolist())
+
+    def is_fresh(self, ticker):
+        """True when the ticker was fetched, or a fetch failed, within max_age"""
+        now = time.time()
+        if now - self._failed_at.get(ticker, -math.inf) < self.max_age:
+            return True
+        record = self.record(ticker)
+        return record is not None and now - record.updated < self.max_age
+
+    def get(self, ticker, refresh=True):
+        """Fundamentals for ticker, refetched when stale.
+
+        A failed refetch falls back to the stored record; the error is raised
+        only when nothing is stored. Until the failure is ``max_age`` old the
+        ticker is not refetched and an empty record is returned instead.
+        """
+        if refresh and not self.is_fresh(ticker):
+            errors = self.refresh_many([ticker], force=True)
+            if ticker in errors and self.record(ticker) is None:
+                raise RuntimeError(errors[ticker])
+        return self.record(ticker) or empty(ticker)
+
+    def refresh_many(self, tickers, force=False):
+        """Refetch stale (or all, with force) tickers. Returns {ticker: error}"""
+        stale = [t for t in dict.fromkeys(tickers) if force or not self.is_fresh(t)]
+        if not stale:
+            return {}
+
+        def fetch_one(ticker):
+            try:
+                return project(ticker, self.provider.info(ticker)), None
+            except Exception as e:
+                return ticker, str(e)
+
+        records, errors = [], {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(stale)))) as pool:
+            for result, error in pool.map(fetch_one, stale):
+                if error is None:
+                    records.append(result)
+                else:
+                    errors[result] = error
+        if records:
+            with self._lock:
+                self._put(records)
+                self._save()
+        now = time.time()
+        for record in records:
+            self._failed_at.pop(record.ticker, None)
+        for ticker in errors:
+            self._failed_at[ticker] = now
+        return errors
+
+    def table(self, tickers=None):
+        """Ticker x field DataFrame (plus ``updated``) for screening"""
+        with self._lock:
+            records = self._records.copy()
+        frame = pd.DataFrame({name: records[name] for name in RECORD_DTYPE.names[1:]},
+                             index=pd.Index(records["ticker"], name="Ticker"))
+        return frame if tickers is None else frame.reindex(list(tickers))
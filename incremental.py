@@ -0,0 +1,340 @@
+"""Streaming indicators updated one bar at a time.
+
+Each indicator keeps just enough state to take the next value in O(1) and
+matches the batch definitions in indicators.py bar for bar (same SMA seeding
+for EMA and Wilder averages). States serialize to plain dicts so they can be
+stored next to a ticker's bars and resumed after a restart.
+"""
+import math
+from collections import deque
+
+import pandas as pd
+
+NAN = float("nan")
+
+
+class RollingMean:
+    """Mean of the last `window` values"""
+
+    def __init__(self, window=20):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        self.updates += 1
+        # Re-sum once per window so floating point drift cannot accumulate;
+        # amortized this is still O(1) per bar.
+        if self.updates % self.window == 0:
+            self.total = math.fsum(self.values)
+        return self.value
+
+    @property
+    def value(self):
+        return self.total / self.window if len(self.values) == self.window else NAN
+
+    def to_dict(self):
+        return {"window": self.window, "values": list(self.values), "updates": self.updates}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["window"])
+        obj.values.extend(data["values"])
+        obj.total = math.fsum(obj.values)
+        obj.updates = data["updates"]
+        return obj
+
+
+class RollingStd:
+    """Standard deviation of the last `window` values"""
+
+    def __init__(self, window=20, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) > self.window:
+            self.values.popleft()
+        return self.value
+
+    @property
+    def value(self):
+        # The window is small and fixed, so this stays O(1) per bar and avoids
+        # the cancellation error of a running sum of squares.
+        if len(self.values) < self.window:
+            return NAN
+        mean = math.fsum(self.values) / self.window
+        var = math.fsum((v - mean) ** 2 for v in self.values) / (self.window - self.ddof)
+        return math.sqrt(var)
+
+    def to_dict(self):
+        return {"window": self.window, "ddof": self.ddof, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["window"], data["ddof"])
+        obj.values.extend(data["values"])
+        return obj
+
+
+class EMA:
+    """Exponential average seeded with the SMA of the first `span` values.
+
+    ``alpha`` defaults to 2 / (span + 1); Wilder smoothing uses 1 / span.
+    """
+
+    def __init__(self, span=20, alpha=None):
+        self.span = span
+        self.alpha = 2.0 / (span + 1) if alpha is None else alpha
+        self.seed = RollingMean(span)
+        self.value = NAN
+
+    def update(self, x):
+        if self.value != self.value:
+            self.value = self.seed.update(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def to_dict(self):
+        return {"span": self.span, "alpha": self.alpha, "value": self.value,
+                "seed": self.seed.to_dict() if self.value != self.value else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["span"], data["alpha"])
+        obj.value = data["value"]
+        if data["seed"] is not None:
+            obj.seed = RollingMean.from_dict(data["seed"])
+        return obj
+
+
+class WilderRSI:
+    """Relative strength index with Wilder smoothing"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = NAN
+        self.avg_gain = EMA(period, alpha=1.0 / period)
+        self.avg_loss = EMA(period, alpha=1.0 / period)
+
+    def update(self, close):
+        if self.prev_close == self.prev_close:
+            delta = close - self.prev_close
+            self.avg_gain.update(max(delta, 0.0))
+            self.avg_loss.update(max(-delta, 0.0))
+        self.prev_close = close
+        return self.value
+
+    @property
+    def value(self):
+        gain, loss = self.avg_gain.value, self.avg_loss.value
+        if gain != gain or loss != loss:
+            return NAN
+        if loss == 0:
+            return 100.0 if gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def to_dict(self):
+        return {"period": self.period, "prev_close": self.prev_close,
+                "avg_gain": self.avg_gain.to_dict(), "avg_loss": self.avg_loss.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["period"])
+        obj.prev_close = data["prev_close"]
+        obj.avg_gain = EMA.from_dict(data["avg_gain"])
+        obj.avg_loss = EMA.from_dict(data["avg_loss"])
+        return obj
+
+
+class MACD:
+    """MACD line, signal and histogram from fast/slow/signal EMAs"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, close):
+        line = self.fast.update(close) - self.slow.update(close)
+        if line == line:
+            self.signal.update(line)
+        return self.value
+
+    @property
+    def value(self):
+        line = self.fast.value - self.slow.value
+        return line - self.signal.value
+
+    @property
+    def line(self):
+        return self.fast.value - self.slow.value
+
+    def to_dict(self):
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls()
+        obj.fast = EMA.from_dict(data["fast"])
+        obj.slow = EMA.from_dict(data["slow"])
+        obj.signal = EMA.from_dict(data["signal"])
+        return obj
+
+
+class _ReturnStd(RollingStd):
+    # Rolling std of one-bar returns, fed with closes (volatility20).
+    def __init__(self, window=20, ddof=1):
+        super().__init__(window, ddof)
+        self.prev_close = NAN
+
+    def update(self, close):
+        if self.prev_close == self.prev_close and self.prev_close != 0:
+            super().update(close / self.prev_close - 1.0)
+        self.prev_close = close
+        return self.value
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["prev_close"] = self.prev_close
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["window"], data["ddof"])
+        obj.values.extend(data["values"])
+        obj.prev_close = data["prev_close"]
+        return obj
+
+
+_KINDS = {
+    "sma": (RollingMean, lambda w: RollingMean(w)),
+    "ema": (EMA, lambda w: EMA(w)),
+    "rsi": (WilderRSI, lambda w: WilderRSI(w)),
+    "volatility": (_ReturnStd, lambda w: _ReturnStd(w)),
+    "macd_hist": (MACD, lambda w: MACD()),
+}
+
+DEFAULT_STREAMING = ("sma20", "ema20", "rsi14", "volatility20", "macd_hist")
+
+
+def _split_name(name):
+    if name == "macd_hist":
+        return "macd_hist", 0
+    kind = name.rstrip("0123456789")
+    return kind, int(name[len(kind):])
+
+
+class IndicatorState:
+    """A ticker's streaming indicators plus the timestamp of the last bar fed.
+
+    ``update(ts, close)`` appends a bar in O(1). Feeding the same timestamp
+    again (an intraday bar that is still forming) replaces the previous
+    value by restoring the checkpoint taken before that bar.
+    """
+
+    def __init__(self, names=DEFAULT_STREAMING):
+        self.names = tuple(names)
+        self.indicators = {}
+        for name in self.names:
+            kind, window = _split_name(name)
+            if kind not in _KINDS:
+                raise ValueError(f"No streaming version of indicator: {name}")
+            self.indicators[name] = _KINDS[kind][1](window)
+        self.last_ts = None
+        self.bars = 0
+        self.origin = None
+        self._checkpoint = None
+
+    def update(self, ts, close, checkpoint=True):
+        ts = pd.Timestamp(ts)
+        if self.last_ts is not None and ts < self.last_ts:
+            raise ValueError(f"Bar at {ts} is older than the last bar {self.last_ts}")
+        if self.last_ts is not None and ts == self.last_ts:
+            if self._checkpoint is None:
+                raise ValueError(f"No checkpoint to revise the bar at {ts}")
+            restored = IndicatorState.from_dict(self._checkpoint)
+            self.indicators, self.bars = restored.indicators, restored.bars
+        else:
+            # Snapshot taken before the bar so a revision of it can be undone.
+            self._checkpoint = self._state_dict() if checkpoint else None
+        for indicator in self.indicators.values():
+            indicator.update(float(close))
+        self.last_ts = ts
+        self.bars += 1
+        return self.values()
+
+    def catch_up(self, df):
+        """Feed the bars of an OHLCV frame at or after the last bar seen"""
+        if df is None or df.empty:
+            return 0
+        if self.last_ts is not None:
+            df = df[df.index >= self.last_ts]
+        last = len(df) - 1
+        for i, (ts, close) in enumerate(zip(df.index, df['Close'].to_numpy(dtype=float))):
+            # Only the newest bar can still be revised, so only it needs a checkpoint
+            self.update(ts, close, checkpoint=i == last)
+        return len(df)
+
+    def values(self):
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    def _state_dict(self):
+        return {
+            "names": list(self.names),
+            "bars": self.bars,
+            "last_ts": None if self.last_ts is None else self.last_ts.isoformat(),
+            "origin": self.origin,
+            "indicators": {name: ind.to_dict() for name, ind in self.indicators.items()},
+        }
+
+    def to_dict(self):
+        data = self._state_dict()
+        data["checkpoint"] = self._checkpoint
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["names"])
+        for name, state in data["indicators"].items():
+            obj.indicators[name] = _KINDS[_split_name(name)[0]][0].from_dict(state)
+        obj.bars = data["bars"]
+        obj.last_ts = None if data["last_ts"] is None else pd.Timestamp(data["last_ts"])
+        obj.origin = data.get("origin")
+        obj._checkpoint = data.get("checkpoint")
+        return obj
+
+
+def refresh_state(store, ticker, names=DEFAULT_STREAMING):
+    """Bring a ticker's persisted IndicatorState up to date with its stored bars.
+
+    Only bars at or after the state's last bar are read and fed, so the cost
+    of a refresh is proportional to the number of new bars, not the history.
+    The state is rebuilt from scratch when the store's history was reloaded
+    (its first bar changed, e.g. after a split adjustment).
+    """
+    origin = store.origin(ticker)
+    data = store.load_state(ticker, "indicators")
+    state = None
+    if data and tuple(data["names"]) == tuple(names) and data.get("origin") == origin:
+        state = IndicatorState.from_dict(data)
+    if state is None:
+        state = IndicatorState(names)
+        state.origin = origin
+    if state.catch_up(store.bars_since(ticker, state.last_ts)):
+        store.save_state(ticker, "indicators", state.to_dict())
+    return state
+
+
+def values_frame(states):
+    """Latest streaming values for {ticker: IndicatorState} as a ticker x indicator frame"""
+    rows = {ticker: state.values() for ticker, state in states.items()}
+    return pd.DataFrame.from_dict(rows, orient="index").astype(float) if rows else pd.DataFrame(dtype=float)
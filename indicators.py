@@ -0,0 +1,247 @@
+"""Vectorized technical indicators.
+
+Every function takes a price array shaped (time,) or (time, tickers) and
+works along axis 0, so a whole universe is computed in one call. Leading
+NaNs (a ticker listed later than the others) are allowed; each column is
+seeded from its own first full window. Results have the input's shape with
+NaN where the indicator is not yet defined.
+"""
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_INDICATORS = (
+    "sma20", "ema20", "rsi14", "macd", "macd_signal", "macd_hist",
+    "bb_mid", "bb_upper", "bb_lower", "atr14", "volatility20",
+)
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=float)
+
+
+def _rolling_sum(x, window):
+    # NaN-aware rolling sum: defined only where the whole window is valid.
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    zeros = np.zeros((1,) + x.shape[1:])
+    csum = np.concatenate([zeros, np.cumsum(filled, axis=0)])
+    ccount = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        sums = csum[window:] - csum[:-window]
+        counts = ccount[window:] - ccount[:-window]
+        out[window - 1:] = np.where(counts == window, sums, np.nan)
+    return out
+
+
+def sma(x, window=20):
+    """Simple moving average"""
+    return _rolling_sum(_as_float(x), window) / window
+
+
+def rolling_std(x, window=20, ddof=1):
+    """Rolling standard deviation"""
+    x = _as_float(x)
+    # Shift each column by its mean so the sum-of-squares trick stays accurate
+    # for index levels in the tens of thousands.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        centre = np.nanmean(x, axis=0)
+    shifted = x - np.nan_to_num(centre)
+    s1 = _rolling_sum(shifted, window)
+    s2 = _rolling_sum(shifted * shifted, window)
+    var = (s2 - s1 * s1 / window) / (window - ddof)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def _smooth(x, alpha, seed):
+    # Recursive smoother y[t] = y[t-1] + alpha * (x[t] - y[t-1]), started per
+    # column at the first non-NaN value of seed. Loops over time only, so
+    # each step is vectorized across tickers; a single series runs on plain
+    # floats, which is several times faster than 0-d array arithmetic.
+    if x.ndim == 1:
+        out = []
+        prev = np.nan
+        for value, start in zip(x.tolist(), seed.tolist()):
+            if prev != prev:
+                prev = start
+            elif value == value:
+                prev += alpha * (value - prev)
+            out.append(prev)
+        return np.array(out, dtype=float)
+
+    out = np.full(x.shape, np.nan)
+    prev = np.full(x.shape[1:], np.nan)
+    for t in range(len(x)):
+        step = prev + alpha * (x[t] - prev)
+        step = np.where(np.isnan(x[t]), prev, step)
+        prev = np.where(np.isnan(prev), seed[t], step)
+        out[t] = prev
+    return out
+
+
+def ema(x, span=20):
+    """Exponential moving average seeded with the first SMA"""
+    x = _as_float(x)
+    return _smooth(x, 2.0 / (span + 1), sma(x, span))
+
+
+def wilder(x, period=14):
+    """Wilder's smoothing (alpha = 1/period) seeded with the first SMA"""
+    x = _as_float(x)
+    return _smooth(x, 1.0 / period, sma(x, period))
+
+
+def rsi(close, period=14):
+    """Wilder RSI"""
+    close = _as_float(close)
+    delta = np.full(close.shape, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    missing = np.isnan(delta)
+    avg_gain = wilder(np.where(missing, np.nan, np.maximum(delta, 0.0)), period)
+    avg_loss = wilder(np.where(missing, np.nan, np.maximum(-delta, 0.0)), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        out = 100.0 - 100.0 / (1.0 + rs)
+    out = np.where((avg_loss == 0) & (avg_gain > 0), 100.0, out)
+    return np.where((avg_loss == 0) & (avg_gain == 0), 50.0, out)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    close = _as_float(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window=20, num_std=2.0):
+    """Bollinger middle, upper and lower bands (population std)"""
+    close = _as_float(close)
+    mid = sma(close, window)
+    width = num_std * rolling_std(close, window, ddof=0)
+    return mid, mid + width, mid - width
+
+
+def true_range(high, low, close):
+    """True range; the first bar falls back to high - low"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    prev_close = np.full(close.shape, np.nan)
+    prev_close[1:] = close[:-1]
+    # fmax ignores the NaN gaps against a missing previous close
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, period=14):
+    """Average true range with Wilder smoothing"""
+    return wilder(true_range(high, low, close), period)
+
+
+def returns(close):
+    """Simple one-bar returns (first row NaN)"""
+    close = _as_float(close)
+    out = np.full(close.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = close[1:] / close[:-1] - 1.0
+    return out
+
+
+def rolling_volatility(close, window=20, annualize=False, periods_per_year=252):
+    """Rolling standard deviation of one-bar returns"""
+    vol = rolling_std(returns(close), window)
+    return vol * np.sqrt(periods_per_year) if annualize else vol
+
+
+def compute(close, high=None, low=None, indicators=DEFAULT_INDICATORS):
+    """Compute several indicators at once, sharing intermediate results.
+
+    Names follow ``<kind><window>`` (sma20, ema50, rsi14, atr14,
+    volatility20) plus macd/macd_signal/macd_hist and bb_mid/bb_upper/
+    bb_lower (20, 2). ATR needs high and low. Returns {name: array}.
+    """
+    close = _as_float(close)
+    memo = {}
+
+    def once(key, fn):
+        if key not in memo:
+            memo[key] = fn()
+        return memo[key]
+
+    out = {}
+    for name in indicators:
+        if name in ("macd", "macd_signal", "macd_hist"):
+            line, signal_line, hist = once("macd", lambda: macd(close))
+            out[name] = {"macd": line, "macd_signal": signal_line, "macd_hist": hist}[name]
+        elif name in ("bb_mid", "bb_upper", "bb_lower"):
+            mid = once("sma20", lambda: sma(close, 20))
+            width = once("bb_width", lambda: 2.0 * rolling_std(close, 20, ddof=0))
+            out[name] = {"bb_mid": mid, "bb_upper": mid + width, "bb_lower": mid - width}[name]
+        else:
+            kind = name.rstrip("0123456789")
+            window = int(name[len(kind):] or 0)
+            if kind == "sma":
+                out[name] = once(name, lambda: sma(close, window))
+            elif kind == "ema":
+                out[name] = once(name, lambda: ema(close, window))
+            elif kind == "rsi":
+                out[name] = rsi(close, window)
+            elif kind == "atr":
+                if high is None or low is None:
+                    raise ValueError("atr needs high and low prices")
+                out[name] = atr(high, low, close, window)
+            elif kind == "volatility":
+                out[name] = rolling_volatility(close, window)
+            else:
+                raise ValueError(f"Unknown indicator: {name}")
+    return out
+
+
+def last_valid(values, default=np.nan):
+    """Last non-NaN value of a 1-D indicator array"""
+    values = np.asarray(values, dtype=float)
+    valid = values[~np.isnan(values)]
+    return float(valid[-1]) if len(valid) else default
+
+
+class IndicatorCache:
+    """LRU of indicator frames keyed by (ticker, last bar timestamp and values).
+
+    A ticker's indicators are only recomputed when a new bar arrives or the
+    forming bar changes, so reruns and other sessions viewing the same
+    symbol reuse the result. The bar count is part of the key so different
+    history windows never collide. Callers get their own copy of the frame.
+    """
+
+    def __init__(self, maxsize=512, indicators=DEFAULT_INDICATORS):
+        self.maxsize = maxsize
+        self.indicators = tuple(indicators)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ticker, df):
+        """Indicator frame for an OHLCV frame, indexed like df"""
+        if df is None or df.empty:
+            return pd.DataFrame(columns=list(self.indicators), dtype=float)
+        # The last bar's values change intraday while its date and the length do not
+        last = tuple(float(df[col].iloc[-1]) for col in ('Close', 'High', 'Low', 'Volume') if col in df)
+        key = (ticker, df.index[-1], len(df), last)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key].copy()
+
+        values = compute(df['Close'].to_numpy(dtype=float),
+                         df['High'].to_numpy(dtype=float) if 'High' in df else None,
+                         df['Low'].to_numpy(dtype=float) if 'Low' in df else None,
+                         self.indicators)
+        frame = pd.DataFrame(values, index=df.index)
+        with self._lock:
+            self._entries[key] = frame
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return frame.copy()
@@ -0,0 +1,260 @@
+"""Call, cache and latency metrics for the app's data functions.
+
+``instrument(name)`` wraps a cached data function and records, per
+function and ticker, how often it was called, how many of those calls
+missed the cache, how long hits and misses took and how many upstream
+errors were swallowed. The cached body reports a miss with
+``note_miss()`` (it only runs on a miss) and a handled exception with
+``note_error()``. Work that runs off the calling thread, such as a
+shared cache's background refresh, reports through ``background()``.
+
+Recording is off unless SMART_TRADE_METRICS=1 or ``enable()`` is called;
+while off a wrapped call costs one attribute check.
+"""
+import contextlib
+import functools
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Upper bounds (seconds) of the latency histogram buckets.
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+PREFIX = "smart_trade"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        if self.count == 0:
+            return math.nan
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms keyed by (function, ticker)"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = defaultdict(_Histogram)   # (function, ticker, "hit"/"miss")
+            self.errors = defaultdict(int)           # (function, ticker)
+            self.last_error = {}                     # (function, ticker) -> (timestamp, message)
+
+    def observe(self, function, ticker, miss, seconds, errors=()):
+        with self._lock:
+            self.latency[(function, ticker, "miss" if miss else "hit")].observe(seconds)
+            self._add_errors(function, ticker, errors)
+
+    def record_errors(self, function, ticker, errors):
+        """Count errors of work that is not a call, e.g. a background refresh"""
+        with self._lock:
+            self._add_errors(function, ticker, errors)
+
+    def _add_errors(self, function, ticker, errors):
+        # Caller holds the lock.
+        for error_ticker, message in errors:
+            key = (function, error_ticker or ticker)
+            self.errors[key] += 1
+            self.last_error[key] = (time.time(), message)
+
+    def summary(self, by_ticker=False):
+        """Rows of calls, hits, misses, hit rate, latency and errors"""
+        rows = {}
+        with self._lock:
+            items = list(self.latency.items())
+            errors = dict(self.errors)
+        for (function, ticker, result), hist in items:
+            key = (function, ticker) if by_ticker else (function,)
+            row = rows.setdefault(key, {"calls": 0, "hits": 0, "misses": 0, "errors": 0,
+                                        "hit_ms": _Histogram(), "miss_ms": _Histogram()})
+            row["calls"] += hist.count
+            row["hits" if result == "hit" else "misses"] += hist.count
+            merged = row[f"{result}_ms"]
+            merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+            merged.total += hist.total
+            merged.count += hist.count
+            merged.max = max(merged.max, hist.max)
+        for (function, ticker), n in errors.items():
+            key = (function, ticker) if by_ticker else (function,)
+            rows.setdefault(key, {"calls": 0, "hits": 0, "misses": 0, "errors": 0,
+                                  "hit_ms": _Histogram(), "miss_ms": _Histogram()})["errors"] += n
+
+        out = []
+        for key, row in sorted(rows.items()):
+            hit, miss = row.pop("hit_ms"), row.pop("miss_ms")
+            out.append(dict(
+                zip(("function", "ticker"), key),
+                **row,
+                hit_rate=row["hits"] / row["calls"] if row["calls"] else math.nan,
+                hit_mean_ms=hit.total / hit.count * 1000 if hit.count else math.nan,
+                miss_mean_ms=miss.total / miss.count * 1000 if miss.count else math.nan,
+                miss_p95_ms=miss.quantile(0.95) * 1000,
+                miss_max_ms=miss.max * 1000 if miss.count else math.nan,
+            ))
+        return out
+
+    def recent_errors(self, limit=50):
+        """Latest swallowed error per (function, ticker), newest first"""
+        with self._lock:
+            items = sorted(self.last_error.items(), key=lambda item: item[1][0], reverse=True)
+        return [{"function": f, "ticker": t, "time": ts, "error": msg} for (f, t), (ts, msg) in items[:limit]]
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            latency = sorted(self.latency.items())
+            errors = sorted(self.errors.items())
+        lines = [
+            f"# HELP {PREFIX}_calls_total Data function calls by cache result.",
+            f"# TYPE {PREFIX}_calls_total counter",
+        ]
+        for (function, ticker, result), hist in latency:
+            lines.append(f"{PREFIX}_calls_total{_labels(function=function, ticker=ticker, result=result)} {hist.count}")
+        lines += [
+            f"# HELP {PREFIX}_errors_total Upstream errors handled by data functions.",
+            f"# TYPE {PREFIX}_errors_total counter",
+        ]
+        for (function, ticker), n in errors:
+            lines.append(f"{PREFIX}_errors_total{_labels(function=function, ticker=ticker)} {n}")
+        lines += [
+            f"# HELP {PREFIX}_latency_seconds Data function latency by cache result.",
+            f"# TYPE {PREFIX}_latency_seconds histogram",
+        ]
+        for (function, ticker, result), hist in latency:
+            labels = dict(function=function, ticker=ticker, result=result)
+            cumulative = 0
+            for bound, n in zip(BUCKETS, hist.counts):
+                cumulative += n
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f"{PREFIX}_latency_seconds_bucket{_labels(**labels, le=le)} {cumulative}")
+            lines.append(f"{PREFIX}_latency_seconds_sum{_labels(**labels)} {hist.total!r}")
+            lines.append(f"{PREFIX}_latency_seconds_count{_labels(**labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+METRICS = Metrics(enabled=os.environ.get("SMART_TRADE_METRICS", "0") == "1")
+
+_local = threading.local()
+
+
+def enable(on=True):
+    METRICS.enabled = on
+
+
+def is_enabled():
+    return METRICS.enabled
+
+
+def _ticker_label(args, kwargs):
+    ticker = kwargs.get("ticker", kwargs.get("tickers", args[0] if args else None))
+    if ticker is None:
+        return "-"
+    if isinstance(ticker, (tuple, list)):
+        return f"batch[{len(ticker)}]"
+    return str(ticker)
+
+
+def instrument(name):
+    """Decorator recording calls, cache misses, latency and errors of a data function.
+
+    Apply it above the caching decorator so cache hits are counted too.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return fn(*args, **kwargs)
+            frame = {"miss": False, "errors": []}
+            stack = _local.__dict__.setdefault("stack", [])
+            stack.append(frame)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                frame["errors"].append((None, f"{type(e).__name__}: {e}"))
+                frame["miss"] = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                stack.pop()
+                METRICS.observe(name, _ticker_label(args, kwargs), frame["miss"], elapsed, frame["errors"])
+
+        # Keep the cache's controls reachable through the wrapper
+        for attr in ("cache", "clear", "refresh"):
+            if hasattr(fn, attr):
+                setattr(wrapper, attr, getattr(fn, attr))
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def background(name, kwargs=None):
+    """Collect note_error() calls and a raised error of work on a background thread.
+
+    The errors are counted against name like those of an instrumented call,
+    but no call or latency is recorded: the caller was already served.
+    """
+    if not METRICS.enabled:
+        yield
+        return
+    frame = {"miss": True, "errors": []}
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(frame)
+    try:
+        yield
+    except Exception as e:
+        frame["errors"].append((None, f"{type(e).__name__}: {e}"))
+        raise
+    finally:
+        stack.pop()
+        METRICS.record_errors(name, _ticker_label((), kwargs or {}), frame["errors"])
+
+
+def note_miss():
+    """Mark the innermost instrumented call as a cache miss (call from the cached body)"""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1]["miss"] = True
+
+
+def note_error(error, ticker=None):
+    """Record a handled upstream error against the innermost instrumented call"""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        message = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        stack[-1]["errors"].append((ticker, message))
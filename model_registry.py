@@ -0,0 +1,141 @@
+"""Local registry of trained forecasting models.
+
+Every save writes a new version directory per ticker::
+
+    <root>/<TICKER>/v0003/model.joblib    # the ForecastModel, uncompressed
+    <root>/<TICKER>/v0003/metadata.json   # features, train window, metrics
+    <root>/<TICKER>/LATEST                # "3"
+
+Models are written uncompressed so ``load`` can memory-map their arrays
+(``mmap_mode="r"``): loading is lazy and cheap, and pages of the artifact
+are shared between processes serving the same ticker. Writes go to a
+temporary directory that is renamed into place, so readers never see a
+half-written version.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+import joblib
+import pandas as pd
+
+from providers import safe_filename
+
+ARTIFACT = "model.joblib"
+METADATA = "metadata.json"
+
+
+class ModelRegistry:
+    """Versioned model artifacts with metadata, ``keep`` versions per ticker"""
+
+    def __init__(self, root, keep=3):
+        self.root = root
+        self.keep = keep
+        os.makedirs(root, exist_ok=True)
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.root, safe_filename(ticker))
+
+    def _version_dir(self, ticker, version):
+        return os.path.join(self._ticker_dir(ticker), f"v{version:04d}")
+
+    def versions(self, ticker):
+        """Stored version numbers, oldest first"""
+        try:
+            names = os.listdir(self._ticker_dir(ticker))
+        except OSError:
+            return []
+        return sorted(int(n[1:]) for n in names if n.startswith("v") and n[1:].isdigit())
+
+    def latest(self, ticker):
+        """Version LATEST points at, or None when nothing is stored"""
+        try:
+            with open(os.path.join(self._ticker_dir(ticker), "LATEST")) as fh:
+                return int(fh.read().strip())
+        except (OSError, ValueError):
+            versions = self.versions(ticker)
+            return versions[-1] if versions else None
+
+    def save(self, ticker, model, metadata=None):
+        """Store model as the next version and point LATEST at it. Returns the version"""
+        ticker_dir = self._ticker_dir(ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        versions = self.versions(ticker)
+        version = (versions[-1] if versions else 0) + 1
+        metadata = dict(metadata or {}, ticker=ticker, version=version, created=time.time())
+
+        tmp_dir = os.path.join(ticker_dir, f".tmp.{os.getpid()}.{threading.get_ident()}")
+        os.makedirs(tmp_dir, exist_ok=True)
+        joblib.dump(model, os.path.join(tmp_dir, ARTIFACT))
+        with open(os.path.join(tmp_dir, METADATA), "w") as fh:
+            json.dump(metadata, fh, indent=2, default=str)
+        os.replace(tmp_dir, self._version_dir(ticker, version))
+
+        latest_tmp = os.path.join(ticker_dir, f"LATEST.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(latest_tmp, "w") as fh:
+            fh.write(str(version))
+        os.replace(latest_tmp, os.path.join(ticker_dir, "LATEST"))
+
+        for old in self.versions(ticker)[:-self.keep] if self.keep else []:
+            shutil.rmtree(self._version_dir(ticker, old), ignore_errors=True)
+        return version
+
+    def metadata(self, ticker, version=None):
+        """Metadata dict of a version (latest by default), or None"""
+        version = self.latest(ticker) if version is None else version
+        if version is None:
+            return None
+        try:
+            with open(os.path.join(self._version_dir(ticker, version), METADATA)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, ticker, version=None, mmap_mode="r"):
+        """Model of a version (latest by default) with memory-mapped arrays, or None"""
+        version = self.latest(ticker) if version is None else version
+        if version is None:
+            return None
+        path = os.path.join(self._version_dir(ticker, version), ARTIFACT)
+        if not os.path.exists(path):
+            return None
+        return joblib.load(path, mmap_mode=mmap_mode)
+
+    def tickers(self):
+        """Tickers with at least one stored version"""
+        tickers = []
+        for name in sorted(os.listdir(self.root)):
+            meta = self._dir_metadata(name)
+            if meta is not None:
+                tickers.append(meta["ticker"])
+        return tickers
+
+    def _dir_metadata(self, name):
+        # Directory names are filename-safe tickers; the real ticker is in the metadata
+        ticker_dir = os.path.join(self.root, name)
+        if not os.path.isdir(ticker_dir):
+            return None
+        try:
+            with open(os.path.join(ticker_dir, "LATEST")) as fh:
+                version = int(fh.read().strip())
+            with open(os.path.join(ticker_dir, f"v{version:04d}", METADATA)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def summary(self):
+        """One row per ticker from the latest metadata, for the diagnostics page"""
+        rows = []
+        for name in sorted(os.listdir(self.root)):
+            meta = self._dir_metadata(name)
+            if meta is None:
+                continue
+            row = {"Ticker": meta["ticker"], "Version": meta["version"],
+                   "Trained": pd.Timestamp(meta["created"], unit="s").strftime("%Y-%m-%d %H:%M"),
+                   "Through": max((t for t in meta.get("trained_through", {}).values() if t), default=None)}
+            for horizon, metrics in meta.get("metrics", {}).items():
+                row[f"{horizon} hit rate"] = metrics.get("hit_rate")
+            rows.append(row)
+        return pd.DataFrame(rows)
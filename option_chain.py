@@ -0,0 +1,408 @@
+"""Option-chain snapshots in compact columnar storage.
+
+Rows use the NSE bhavcopy-like schema below (CSV or Parquet)::
+
+    timestamp, underlying, underlying_price, expiry, strike, option_type (CE/PE),
+    ltp, bid, ask, volume, oi[, iv]
+
+Each underlying is one ``ChainTable``: a dict of NumPy columns (float32
+prices, int64 counts, datetime64 keys) sorted by (timestamp, expiry, type,
+strike), so a snapshot is a contiguous slice found with ``searchsorted`` and
+strikes inside it are binary-searched too. At 57 bytes a row, a trading
+day of minute snapshots of a full NIFTY chain (~900k rows) takes about
+50 MB. Missing IVs are solved from the LTP at ingest. Tables persist as
+one ``.npy`` per column and are memory-mapped when loaded. Tables are keyed
+by the app's (Yahoo) ticker: NSE underlyings are mapped at ingest, so
+``NIFTY`` is stored as ``^NSEI`` and ``RELIANCE`` as ``RELIANCE.NS``.
+
+``synthetic_history`` stands in for a chain provider: it builds daily
+snapshots from a bar history (IV tracking realized volatility, a smile and
+a bell-shaped OI profile) so the page works without a chain feed.
+``synthetic_table`` keeps them in an in-memory ChainTable; they are never
+written to an ``OptionChainStore``, which holds real snapshots only.
+"""
+import glob
+import os
+import shutil
+import threading
+import zlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import options_pricing
+from providers import safe_filename
+
+COLUMNS = {
+    "timestamp": "datetime64[ns]",
+    "underlying_price": "float32",
+    "expiry": "datetime64[D]",
+    "strike": "float32",
+    "is_call": "bool",
+    "ltp": "float32",
+    "bid": "float32",
+    "ask": "float32",
+    "volume": "int64",
+    "oi": "int64",
+    "iv": "float32",
+}
+
+SORT_ORDER = ("timestamp", "expiry", "is_call", "strike")
+
+# NSE index symbols -> Yahoo tickers; other bare symbols are NSE equities (.NS)
+INDEX_TICKERS = {
+    "NIFTY": "^NSEI",
+    "NIFTY50": "^NSEI",
+    "BANKNIFTY": "^NSEBANK",
+    "FINNIFTY": "NIFTY_FIN_SERVICE.NS",
+    "MIDCPNIFTY": "NIFTY_MID_SELECT.NS",
+}
+
+IVStats = namedtuple("IVStats", ["current", "low", "high", "rank", "percentile", "days"])
+
+# Options expire at the close of the expiry date.
+EXPIRY_TIME = np.timedelta64(15 * 60 + 30, "m")
+
+
+def ticker_for(underlying):
+    """Yahoo ticker of an NSE underlying symbol (NIFTY -> ^NSEI, RELIANCE -> RELIANCE.NS)"""
+    symbol = str(underlying).strip().upper()
+    if symbol.replace(" ", "") in INDEX_TICKERS:
+        return INDEX_TICKERS[symbol.replace(" ", "")]
+    if symbol.startswith("^") or "." in symbol:
+        return str(underlying).strip()
+    return f"{symbol}.NS"
+
+
+def _years(timestamp, expiry):
+    # Time from snapshot to expiry in years, floored at a quarter day
+    remaining = (np.asarray(expiry, "datetime64[D]") + EXPIRY_TIME - np.asarray(timestamp, "datetime64[ns]"))
+    return np.maximum(remaining / np.timedelta64(1, "D"), 0.25) / options_pricing.DAYS_PER_YEAR
+
+
+def _frame_columns(df):
+    """Normalize a schema DataFrame into {column: array} in COLUMNS dtypes"""
+    df = df.rename(columns=str.lower)
+    option_type = df["option_type"].astype(str).str.upper()
+    columns = {
+        "timestamp": pd.to_datetime(df["timestamp"]).to_numpy("datetime64[ns]"),
+        "underlying_price": df["underlying_price"].to_numpy("float32"),
+        "expiry": pd.to_datetime(df["expiry"]).to_numpy("datetime64[D]"),
+        "strike": df["strike"].to_numpy("float32"),
+        "is_call": option_type.isin(["CE", "C", "CALL"]).to_numpy(),
+        "ltp": df["ltp"].to_numpy("float32"),
+        "bid": df.get("bid", df["ltp"]).to_numpy("float32"),
+        "ask": df.get("ask", df["ltp"]).to_numpy("float32"),
+        "volume": df.get("volume", pd.Series(0, index=df.index)).fillna(0).to_numpy("int64"),
+        "oi": df.get("oi", pd.Series(0, index=df.index)).fillna(0).to_numpy("int64"),
+        "iv": df["iv"].to_numpy("float32") if "iv" in df else np.full(len(df), np.nan, dtype="float32"),
+    }
+    missing = np.isnan(columns["iv"])
+    if missing.any():
+        years = _years(columns["timestamp"][missing], columns["expiry"][missing])
+        solved = options_pricing.implied_volatility(columns["ltp"][missing], columns["underlying_price"][missing],
+                                                    columns["strike"][missing], years,
+                                                    is_call=columns["is_call"][missing])
+        columns["iv"][missing] = solved
+    return columns
+
+
+class ChainSnapshot:
+    """One chain at one timestamp (views into the table's columns)"""
+
+    def __init__(self, underlying, timestamp, columns):
+        self.underlying = underlying
+        self.timestamp = pd.Timestamp(timestamp)
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["strike"])
+
+    @property
+    def spot(self):
+        return float(self.columns["underlying_price"][0]) if len(self) else np.nan
+
+    def expiries(self):
+        return [pd.Timestamp(e).date() for e in np.unique(self.columns["expiry"])]
+
+    def _bounds(self, expiry, is_call):
+        # Rows are sorted by (expiry, is_call, strike) inside a snapshot
+        expiry = np.datetime64(expiry, "D")
+        exp = self.columns["expiry"]
+        lo, hi = np.searchsorted(exp, expiry, "left"), np.searchsorted(exp, expiry, "right")
+        calls = self.columns["is_call"][lo:hi]
+        split = lo + int(np.searchsorted(calls, True, "left"))
+        return (split, hi) if is_call else (lo, split)
+
+    def side(self, expiry, is_call):
+        """{column: array} of the calls or puts of one expiry, by strike"""
+        lo, hi = self._bounds(expiry, is_call)
+        return {name: values[lo:hi] for name, values in self.columns.items()}
+
+    def atm_strike(self, expiry, spot=None):
+        """Listed strike nearest spot (the snapshot's underlying price by default)"""
+        strikes = self.side(expiry, True)["strike"]
+        if not len(strikes):
+            return np.nan
+        spot = self.spot if spot is None else spot
+        i = int(np.searchsorted(strikes, spot))
+        candidates = strikes[max(i - 1, 0):i + 1]
+        return float(candidates[np.argmin(np.abs(candidates - spot))])
+
+    def atm_iv(self, expiry=None, spot=None):
+        """Mean of the ATM call and put IV of expiry (nearest expiry by default)"""
+        expiries = self.expiries()
+        if not expiries:
+            return np.nan
+        expiry = expiries[0] if expiry is None else expiry
+        strike = self.atm_strike(expiry, spot)
+        ivs = []
+        for is_call in (True, False):
+            side = self.side(expiry, is_call)
+            i = int(np.searchsorted(side["strike"], strike))
+            if i < len(side["strike"]) and side["strike"][i] == strike:
+                ivs.append(side["iv"][i])
+        return float(np.nanmean(ivs)) if ivs and not np.all(np.isnan(ivs)) else np.nan
+
+    def totals(self):
+        """Call/put open interest and volume and the put/call OI ratio"""
+        calls = self.columns["is_call"]
+        oi, volume = self.columns["oi"], self.columns["volume"]
+        call_oi, put_oi = int(oi[calls].sum()), int(oi[~calls].sum())
+        return {
+            "call_oi": call_oi,
+            "put_oi": put_oi,
+            "oi": call_oi + put_oi,
+            "volume": int(volume.sum()),
+            "pcr": put_oi / call_oi if call_oi else np.nan,
+        }
+
+    def table(self, expiry):
+        """Strike x (call, put) DataFrame of one expiry, in the usual chain layout"""
+        frames = []
+        for is_call, prefix in ((True, "Call"), (False, "Put")):
+            side = self.side(expiry, is_call)
+            frames.append(pd.DataFrame({f"{prefix} {name.upper() if name in ('oi', 'iv', 'ltp') else name.title()}":
+                                        side[name] for name in ("oi", "volume", "iv", "ltp")},
+                                       index=pd.Index(side["strike"].astype(float), name="Strike")))
+        return frames[0].join(frames[1], how="outer")
+
+
+class ChainTable:
+    """All snapshots of one underlying, sorted by SORT_ORDER"""
+
+    def __init__(self, underlying, columns=None):
+        self.underlying = underlying
+        self.columns = columns or {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._index()
+
+    def _index(self):
+        times = self.columns["timestamp"]
+        self.times, self.starts = np.unique(times, return_index=True) if len(times) else (times, np.empty(0, int))
+        self._atm_iv = None
+
+    def __len__(self):
+        return len(self.columns["timestamp"])
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values())
+
+    def append(self, columns):
+        """Merge new rows; a snapshot timestamp already stored is replaced"""
+        if len(self):
+            keep = ~np.isin(self.columns["timestamp"], np.unique(columns["timestamp"]))
+            columns = {name: np.concatenate([np.asarray(self.columns[name])[keep], columns[name]])
+                       for name in COLUMNS}
+        order = np.lexsort([columns[name] for name in reversed(SORT_ORDER)])
+        self.columns = {name: np.ascontiguousarray(columns[name][order]) for name in COLUMNS}
+        self._index()
+
+    def snapshot(self, at=None):
+        """Latest snapshot at or before ``at`` (the latest one by default), or None"""
+        if not len(self.times):
+            return None
+        i = len(self.times) - 1 if at is None else \
+            int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(at), "ns"), "right")) - 1
+        if i < 0:
+            return None
+        lo = self.starts[i]
+        hi = self.starts[i + 1] if i + 1 < len(self.starts) else len(self)
+        return ChainSnapshot(self.underlying, self.times[i],
+                             {name: values[lo:hi] for name, values in self.columns.items()})
+
+    def atm_iv_history(self):
+        """Near-expiry ATM IV per snapshot as a Series indexed by timestamp.
+
+        Same definition as ChainSnapshot.atm_iv, computed for every snapshot
+        at once and kept until the table changes.
+        """
+        if self._atm_iv is None:
+            self._atm_iv = pd.Series(self._atm_iv_values(), index=pd.DatetimeIndex(self.times), name="atm_iv")
+        return self._atm_iv
+
+    def _atm_iv_values(self):
+        count = len(self.times)
+        if not count:
+            return np.empty(0)
+        snap = np.repeat(np.arange(count), np.diff(np.append(self.starts, len(self))))
+        expiry = self.columns["expiry"]
+        near = expiry == expiry[self.starts][snap]
+        strike = self.columns["strike"].astype(float)
+        spot = self.columns["underlying_price"][self.starts].astype(float)
+
+        # Nearest listed call strike per snapshot: order calls by (snapshot, distance);
+        # the sort is stable, so the lower strike wins a tie as in atm_strike
+        calls = np.flatnonzero(near & self.columns["is_call"])
+        order = np.lexsort((np.abs(strike[calls] - spot[snap[calls]]), snap[calls]))
+        groups, first = np.unique(snap[calls][order], return_index=True)
+        atm = np.full(count, np.nan)
+        atm[groups] = strike[calls[order[first]]]
+
+        # Mean of the call and put IV at that strike
+        iv = self.columns["iv"].astype(float)
+        rows = near & (strike == atm[snap]) & ~np.isnan(iv)
+        total = np.bincount(snap[rows], weights=iv[rows], minlength=count)
+        found = np.bincount(snap[rows], minlength=count)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(found > 0, total / found, np.nan)
+
+    def iv_stats(self, lookback=252):
+        """IV rank and percentile of the latest near-expiry ATM IV over ``lookback`` days"""
+        history = self.atm_iv_history().dropna()
+        if history.empty:
+            return None
+        daily = history.groupby(history.index.normalize()).last().tail(lookback)
+        current, low, high = float(history.iloc[-1]), float(daily.min()), float(daily.max())
+        rank = (current - low) / (high - low) if high > low else np.nan
+        percentile = float((daily < current).mean())
+        return IVStats(current, low, high, rank, percentile, len(daily))
+
+
+class OptionChainStore:
+    """ChainTables per underlying, persisted as memory-mapped .npy columns"""
+
+    def __init__(self, root):
+        self.root = root
+        self._tables = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, underlying):
+        return os.path.join(self.root, safe_filename(underlying))
+
+    def table(self, underlying):
+        """ChainTable for underlying, loaded (memory-mapped) on first use"""
+        with self._lock:
+            table = self._tables.get(underlying)
+            if table is None:
+                table = self._tables[underlying] = ChainTable(underlying, self._read(underlying))
+            return table
+
+    def _read(self, underlying):
+        try:
+            columns = {name: np.load(os.path.join(self._dir(underlying), f"{name}.npy"), mmap_mode="r")
+                       for name in COLUMNS}
+        except (OSError, ValueError):
+            return None
+        if any(columns[name].dtype != np.dtype(dtype) for name, dtype in COLUMNS.items()):
+            return None
+        return columns
+
+    def _save(self, table):
+        # Write a fresh directory and swap it in; readers keep their mappings
+        directory = self._dir(table.underlying)
+        tmp_dir = f"{directory}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name, values in table.columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+        old_dir = f"{directory}.old.{os.getpid()}.{threading.get_ident()}"
+        if os.path.exists(directory):
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def ingest(self, df):
+        """Add schema rows (any number of underlyings and snapshots). Returns rows ingested"""
+        if df is None or df.empty:
+            return 0
+        underlyings = df[df.columns[df.columns.str.lower() == "underlying"][0]].map(ticker_for)
+        for underlying, rows in df.groupby(underlyings.to_numpy()):
+            table = self.table(underlying)
+            with self._lock:
+                table.append(_frame_columns(rows))
+                self._save(table)
+        return len(df)
+
+    def ingest_files(self, pattern):
+        """Ingest every CSV/Parquet snapshot file matching a glob. Returns rows ingested"""
+        total = 0
+        for path in sorted(glob.glob(pattern)):
+            if path.endswith(".parquet"):
+                df = pd.read_parquet(path)
+            elif path.endswith(".csv"):
+                df = pd.read_csv(path)
+            else:
+                continue
+            total += self.ingest(df)
+        return total
+
+    def iv_stats(self, underlying, lookback=252):
+        """IV rank and percentile of the latest near-expiry ATM IV over ``lookback`` days"""
+        return self.table(underlying).iv_stats(lookback)
+
+
+def _synthetic_rows(spot, timestamp, expiries, base_iv, strikes, rng):
+    # Columns of one snapshot: Black-Scholes prices on a smile, OI peaking just OTM
+    timestamp = np.datetime64(pd.Timestamp(timestamp), "ns")
+    expiry = np.repeat(np.array(expiries, dtype="datetime64[D]"), 2 * len(strikes))
+    is_call = np.tile(np.repeat([True, False], len(strikes)), len(expiries))
+    strike = np.tile(strikes, 2 * len(expiries))
+    T = _years(timestamp, expiry)
+    moneyness = np.log(strike / spot) / (np.sqrt(T) * 10)
+    iv = base_iv * (1 + 1.5 * moneyness ** 2 - 0.4 * moneyness) * (1 + 0.02 * rng.standard_normal(len(strike)))
+    ltp = np.round(options_pricing.price(spot, strike, T, sigma=iv, is_call=is_call), 2)
+    oi_peak = spot * np.where(is_call, 1.03, 0.97)
+    oi = 1e6 * np.exp(-0.5 * ((strike - oi_peak) / (spot * 0.03)) ** 2) * rng.uniform(0.7, 1.3, len(strike))
+    return {
+        "timestamp": np.full(len(strike), timestamp), "underlying_price": np.full(len(strike), spot),
+        "expiry": expiry, "strike": strike, "option_type": np.where(is_call, "CE", "PE"),
+        "ltp": ltp, "bid": np.round(ltp * 0.995, 2), "ask": np.round(ltp * 1.005, 2),
+        "volume": (oi * rng.uniform(0.5, 2.0, len(strike))).astype(np.int64), "oi": oi.astype(np.int64), "iv": iv,
+    }
+
+
+def synthetic_chain(underlying, spot, timestamp, expiries, base_iv, strikes=None, seed=0):
+    """Schema DataFrame of one synthetic snapshot priced with Black-Scholes on a smile"""
+    strikes = options_pricing.strike_ladder(spot, 41) if strikes is None else np.asarray(strikes, dtype=float)
+    rows = _synthetic_rows(spot, timestamp, expiries, base_iv, strikes, np.random.default_rng(seed))
+    return pd.DataFrame(rows).assign(underlying=underlying)
+
+
+def synthetic_history(underlying, bars, days=252, expiries=3):
+    """Daily synthetic snapshots over the last ``days`` bars; IV follows 20-day realized volatility"""
+    close = bars['Close']
+    volatility = (close.pct_change().rolling(20).std() * np.sqrt(252)).to_numpy()
+    rng = np.random.default_rng(zlib.crc32(underlying.encode()))
+    chunks = []
+    for i in range(max(len(close) - days, 0), len(close)):
+        spot = float(close.iloc[i])
+        iv = 0.2 if np.isnan(volatility[i]) else float(volatility[i]) * 1.1
+        today = pd.Timestamp(close.index[i]).date()
+        listed = options_pricing.expiry_dates(today, weekly=expiries, monthly=1)[:expiries]
+        chunks.append(_synthetic_rows(spot, pd.Timestamp(today) + pd.Timedelta(EXPIRY_TIME), listed, iv,
+                                      options_pricing.strike_ladder(spot, 41), rng))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.DataFrame({name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]}).assign(
+        underlying=underlying)
+
+
+def synthetic_table(underlying, bars, days=252, expiries=3):
+    """In-memory ChainTable of synthetic_history (empty without bars)"""
+    table = ChainTable(underlying)
+    df = synthetic_history(underlying, bars, days, expiries) if bars is not None and len(bars) else pd.DataFrame()
+    if not df.empty:
+        table.append(_frame_columns(df))
+    return table
@@ -0,0 +1,160 @@
+"""Multi-leg option strategies: payoff, scenario P&L and risk metrics.
+
+A strategy is a list of ``Leg``s sharing one expiry. ``pnl_surface`` values
+every leg with Black-Scholes over a (spot x days elapsed x IV) grid in a
+single broadcast call. The expiry payoff is piecewise linear in the spot
+with kinks at the strikes, so ``analyze`` derives max profit, max loss and
+breakevens exactly from the kinks and the end slopes, and the probability
+of profit from a lognormal spot distribution over the profitable intervals.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+import options_pricing
+from options_pricing import RISK_FREE_RATE, norm_cdf
+
+# kind is "call", "put" or "stock"; quantity is signed (+ long, - short) in
+# units of the underlying per lot; premium is the entry price per unit.
+Leg = namedtuple("Leg", ["kind", "strike", "quantity", "premium"])
+
+STRATEGIES = ("Long Call", "Long Put", "Covered Call", "Bull Spread", "Iron Condor")
+
+# Moneyness of the main strike, as a fraction of spot (positive = out of the money)
+STRIKE_CHOICES = {"ATM": 0.0, "OTM 10%": 0.10, "OTM 20%": 0.20, "ITM 10%": -0.10}
+
+
+def strike_choices(strategy):
+    """STRIKE_CHOICES that make sense for a strategy (an iron condor's short strikes cannot be ITM)"""
+    if strategy == "Iron Condor":
+        return {name: moneyness for name, moneyness in STRIKE_CHOICES.items() if moneyness >= 0}
+    return dict(STRIKE_CHOICES)
+
+
+def _snap(value, step):
+    return round(value / step) * step
+
+
+def build(strategy, spot, T, sigma, r=RISK_FREE_RATE, moneyness=0.0, width=None, step=None):
+    """Legs of a named strategy priced at entry with Black-Scholes.
+
+    ``moneyness`` moves the main strike out of the money (in the strategy's
+    direction; negative moves it in the money) and ``width`` is the distance
+    to the other strikes (default 5% of spot). An iron condor needs
+    ``moneyness >= 0``, otherwise its short call would sit below its short put.
+    """
+    step = step or options_pricing.strike_step(spot)
+    width = max(_snap(width or spot * 0.05, step), step)
+
+    def leg(kind, strike, quantity):
+        premium = 0.0 if kind == "stock" else float(options_pricing.price(spot, strike, T, r, sigma,
+                                                                          is_call=kind == "call"))
+        return Leg(kind, float(strike), quantity, spot if kind == "stock" else premium)
+
+    up = _snap(spot * (1 + moneyness), step)
+    down = _snap(spot * (1 - moneyness), step)
+    if strategy == "Long Call":
+        return [leg("call", up, 1)]
+    if strategy == "Long Put":
+        return [leg("put", down, 1)]
+    if strategy == "Covered Call":
+        return [leg("stock", 0.0, 1), leg("call", up, -1)]
+    if strategy == "Bull Spread":
+        return [leg("call", up, 1), leg("call", up + width, -1)]
+    if strategy == "Iron Condor":
+        if moneyness < 0:
+            raise ValueError("An iron condor's short strikes must be at or out of the money")
+        short_put, short_call = down - width, up + width
+        return [leg("put", short_put - width, 1), leg("put", short_put, -1),
+                leg("call", short_call, -1), leg("call", short_call + width, 1)]
+    raise ValueError(f"Unknown strategy: {strategy}")
+
+
+def _arrays(legs):
+    kind = np.array([l.kind for l in legs])
+    return (kind, np.array([l.strike for l in legs], dtype=float),
+            np.array([l.quantity for l in legs], dtype=float), np.array([l.premium for l in legs], dtype=float))
+
+
+def net_premium(legs):
+    """Cash paid to open per lot (negative for a net credit)"""
+    _, _, quantity, premium = _arrays(legs)
+    return float(np.sum(quantity * premium))
+
+
+def payoff(legs, spots):
+    """P&L at expiry per lot for an array of spot prices"""
+    kind, strike, quantity, premium = _arrays(legs)
+    S = np.asarray(spots, dtype=float)[..., None]
+    value = np.where(kind == "call", np.maximum(S - strike, 0.0),
+                     np.where(kind == "put", np.maximum(strike - S, 0.0), S))
+    return np.sum(quantity * (value - premium), axis=-1)
+
+
+def pnl_surface(legs, spots, days, iv, T, r=RISK_FREE_RATE):
+    """P&L per lot on a (spot x days elapsed x IV) grid, one Black-Scholes call.
+
+    ``T`` is the time to expiry today in years; days past expiry are valued
+    at intrinsic.
+    """
+    kind, strike, quantity, premium = _arrays(legs)
+    S = np.asarray(spots, dtype=float)[:, None, None, None]
+    remaining = np.maximum(T - np.asarray(days, dtype=float) / options_pricing.DAYS_PER_YEAR, 0.0)[None, :, None, None]
+    sigma = np.asarray(iv, dtype=float)[None, None, :, None]
+    option = options_pricing.price(S, np.where(kind == "stock", 1.0, strike), remaining, r, sigma,
+                                   is_call=kind == "call")
+    value = np.where(kind == "stock", S, option)
+    return np.sum(quantity * (value - premium), axis=-1)
+
+
+def analyze(legs, spot, T, sigma, r=RISK_FREE_RATE):
+    """Exact expiry metrics per lot: max_profit/max_loss (inf when unlimited),
+    breakevens, net_premium and probability of profit under a lognormal spot
+    with volatility ``sigma`` and drift ``r``"""
+    kind, strike, quantity, _ = _arrays(legs)
+    kinks = np.unique(np.concatenate([[0.0], strike[kind != "stock"]]))
+    values = payoff(legs, kinks)
+    # Slope beyond the last strike: long calls and stock add, puts are worthless
+    right_slope = float(np.sum(quantity[(kind == "call") | (kind == "stock")]))
+
+    max_profit = math.inf if right_slope > 1e-12 else float(values.max())
+    max_loss = -math.inf if right_slope < -1e-12 else float(values.min())
+
+    # Breakevens: sign changes between kinks, and past the last kink
+    breakevens = []
+    for (x0, y0), (x1, y1) in zip(zip(kinks[:-1], values[:-1]), zip(kinks[1:], values[1:])):
+        if y0 == 0 and x0 > 0:
+            breakevens.append(float(x0))
+        elif y0 * y1 < 0:
+            breakevens.append(float(x0 - y0 * (x1 - x0) / (y1 - y0)))
+    if values[-1] == 0 and kinks[-1] > 0:
+        breakevens.append(float(kinks[-1]))
+    elif abs(right_slope) > 1e-12 and values[-1] * right_slope < 0:
+        breakevens.append(float(kinks[-1] - values[-1] / right_slope))
+
+    # Probability of profit: lognormal mass of the intervals where payoff > 0
+    edges = np.concatenate([[0.0], breakevens, [math.inf]])
+    probability = 0.0
+    sd = sigma * math.sqrt(max(T, options_pricing.MIN_T))
+    mean = math.log(spot) + (r - 0.5 * sigma ** 2) * T
+
+    def cdf(x):
+        if x <= 0:
+            return 0.0
+        if math.isinf(x):
+            return 1.0
+        return float(norm_cdf((math.log(x) - mean) / sd))
+
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        mid = (lo + hi) / 2 if math.isfinite(hi) else (lo + 1) * 2
+        if payoff(legs, [mid])[0] > 0:
+            probability += cdf(hi) - cdf(lo)
+
+    return {
+        "max_profit": max_profit,
+        "max_loss": max_loss,
+        "breakevens": breakevens,
+        "net_premium": net_premium(legs),
+        "probability_of_profit": probability,
+    }
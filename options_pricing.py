@@ -0,0 +1,218 @@
+"""Vectorized Black-Scholes / Black-76 pricing, Greeks and implied volatility.
+
+Every function broadcasts its array arguments with NumPy, so a whole
+(expiry x strike) chain is priced in one call. Conventions:
+
+* ``T`` in years, ``r`` and ``q`` continuously compounded, ``sigma`` annual
+* vega and rho per 1 percentage point, theta per calendar day
+* Black-76 (options on futures) is Black-Scholes with the carry q = r
+
+The normal CDF is scipy's ``ndtr`` when scipy is installed, otherwise a
+rational approximation accurate to ~1e-7.
+"""
+import math
+from datetime import date, timedelta
+
+import numpy as np
+
+try:
+    from scipy.special import ndtr
+except ImportError:
+    ndtr = None
+
+RISK_FREE_RATE = 0.065
+DAYS_PER_YEAR = 365.0
+
+# NSE index options expire on Tuesdays; the monthly is the last one of the month.
+EXPIRY_WEEKDAY = 1
+
+# Below this time to expiry (about an hour) options are valued at intrinsic.
+MIN_T = 1e-4
+MIN_SIGMA = 1e-4
+
+_SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * np.square(x)) / _SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal CDF over arrays"""
+    if ndtr is not None:
+        return ndtr(x)
+    # Abramowitz & Stegun 26.2.17
+    x = np.asarray(x, dtype=float)
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = 1.0 - norm_pdf(x) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+
+def _inputs(S, K, T, sigma, is_call):
+    S, K, T, sigma = (np.asarray(a, dtype=float) for a in (S, K, T, sigma))
+    return S, K, np.maximum(T, MIN_T), np.maximum(sigma, MIN_SIGMA), np.asarray(is_call, dtype=bool), T
+
+
+def price(S, K, T, r=RISK_FREE_RATE, sigma=0.2, q=0.0, is_call=True):
+    """Black-Scholes price of calls (is_call True) and puts; intrinsic value at expiry"""
+    S, K, Tc, sigma, is_call, T = _inputs(S, K, T, sigma, is_call)
+    sqrt_t = np.sqrt(Tc)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * Tc) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    disc_s = S * np.exp(-q * Tc)
+    disc_k = K * np.exp(-r * Tc)
+    call = disc_s * norm_cdf(d1) - disc_k * norm_cdf(d2)
+    put = disc_k * norm_cdf(-d2) - disc_s * norm_cdf(-d1)
+    value = np.where(is_call, call, put)
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    return np.where(T <= MIN_T, intrinsic, value)
+
+
+def greeks(S, K, T, r=RISK_FREE_RATE, sigma=0.2, q=0.0, is_call=True):
+    """{price, delta, gamma, vega, theta, rho} arrays for broadcast inputs"""
+    S, K, Tc, sigma, is_call, T = _inputs(S, K, T, sigma, is_call)
+    sqrt_t = np.sqrt(Tc)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma ** 2) * Tc) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    exp_q = np.exp(-q * Tc)
+    exp_r = np.exp(-r * Tc)
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1, cdf_d2 = norm_cdf(d1), norm_cdf(d2)
+    cdf_md1, cdf_md2 = 1.0 - cdf_d1, 1.0 - cdf_d2
+
+    call = S * exp_q * cdf_d1 - K * exp_r * cdf_d2
+    put = K * exp_r * cdf_md2 - S * exp_q * cdf_md1
+    common_theta = -S * exp_q * pdf_d1 * sigma / (2 * sqrt_t)
+    call_theta = common_theta - r * K * exp_r * cdf_d2 + q * S * exp_q * cdf_d1
+    put_theta = common_theta + r * K * exp_r * cdf_md2 - q * S * exp_q * cdf_md1
+
+    expired = T <= MIN_T
+    itm = np.where(is_call, S > K, S < K)
+    out = {
+        "price": np.where(is_call, call, put),
+        "delta": np.where(is_call, exp_q * cdf_d1, -exp_q * cdf_md1),
+        "gamma": exp_q * pdf_d1 / (S * sigma * sqrt_t),
+        "vega": S * exp_q * pdf_d1 * sqrt_t / 100,
+        "theta": np.where(is_call, call_theta, put_theta) / DAYS_PER_YEAR,
+        "rho": np.where(is_call, K * Tc * exp_r * cdf_d2, -K * Tc * exp_r * cdf_md2) / 100,
+    }
+    if np.any(expired):
+        intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+        out["price"] = np.where(expired, intrinsic, out["price"])
+        out["delta"] = np.where(expired, np.where(itm, np.where(is_call, 1.0, -1.0), 0.0), out["delta"])
+        for name in ("gamma", "vega", "theta", "rho"):
+            out[name] = np.where(expired, 0.0, out[name])
+    return out
+
+
+def black76(F, K, T, r=RISK_FREE_RATE, sigma=0.2, is_call=True):
+    """Black-76 price and Greeks of options on a future/forward F (delta is w.r.t. F)"""
+    return greeks(F, K, T, r, sigma, q=r, is_call=is_call)
+
+
+def implied_volatility(option_price, S, K, T, r=RISK_FREE_RATE, q=0.0, is_call=True,
+                       tol=1e-6, max_iter=100, low=1e-4, high=5.0):
+    """Implied volatility for arrays of option prices.
+
+    NaN outside the no-arbitrage bounds and where the time value is below
+    1e-6 of the spot (deep ITM/OTM quotes carry no volatility information).
+
+    Newton steps on vega, safeguarded by a bisection bracket that shrinks
+    every iteration, so options with tiny vega still converge.
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (option_price, S, K, T)),
+                                 np.asarray(is_call, dtype=bool))
+    shape = arrays[0].shape
+    option_price, S, K, T, is_call = (a.ravel() for a in arrays)
+    Tc = np.maximum(T, MIN_T)
+    disc_s = S * np.exp(-q * Tc)
+    disc_k = K * np.exp(-r * Tc)
+    lower_bound = np.where(is_call, np.maximum(disc_s - disc_k, 0.0), np.maximum(disc_k - disc_s, 0.0))
+    upper_bound = np.where(is_call, disc_s, disc_k)
+    valid = (option_price - lower_bound > 1e-6 * S) & (option_price < upper_bound) & (T > MIN_T)
+
+    lo = np.full(option_price.shape, low)
+    hi = np.full(option_price.shape, high)
+    # Brenner-Subrahmanyam start, clipped into the bracket
+    sigma = np.clip(np.sqrt(2 * np.pi / Tc) * option_price / S, low * 10, high / 2)
+    active = valid.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        g = greeks(S[active], K[active], T[active], r, sigma[active], q, is_call[active])
+        diff = g["price"] - option_price[active]
+        converged = np.abs(diff) < tol * np.maximum(option_price[active], 1.0)
+        s, l, h = sigma[active], lo[active], hi[active]
+        h = np.where(diff > 0, s, h)
+        l = np.where(diff <= 0, s, l)
+        vega = g["vega"] * 100
+        # Tiny vega overflows the Newton step; those fall back to bisection below
+        with np.errstate(all="ignore"):
+            newton = s - diff / vega
+        step = np.where((vega > 1e-10) & (newton > l) & (newton < h), newton, 0.5 * (l + h))
+        sigma[active] = np.where(converged, s, step)
+        lo[active], hi[active] = l, h
+        idx = np.flatnonzero(active)
+        active[idx[converged | (h - l < tol)]] = False
+    return np.where(valid, sigma, np.nan).reshape(shape)
+
+
+def chain_greeks(spot, strikes, expiries, r=RISK_FREE_RATE, sigma=0.2, q=0.0):
+    """Call and put Greeks on an (expiry x strike) grid.
+
+    ``expiries`` are times to expiry in years; ``sigma`` is a scalar, one
+    value per expiry or a full (expiry x strike) IV surface. Returns
+    {"call": {greek: 2-D array}, "put": {...}}.
+    """
+    K = np.asarray(strikes, dtype=float)[None, :]
+    T = np.asarray(expiries, dtype=float)[:, None]
+    sigma = np.asarray(sigma, dtype=float)
+    if sigma.ndim == 1:
+        sigma = sigma[:, None]
+    both = greeks(spot, K[None], T[None], r, sigma, q, np.array([True, False])[:, None, None])
+    shape = (2, T.shape[0], K.shape[1])
+    return {side: {name: np.broadcast_to(values, shape)[i] for name, values in both.items()}
+            for i, side in enumerate(("call", "put"))}
+
+
+def strike_step(spot):
+    """Strike interval NSE uses around this price level"""
+    for limit, step in ((250, 2.5), (500, 5), (1000, 10), (2500, 20), (5000, 50), (20000, 100)):
+        if spot < limit:
+            return step
+    return 50 if spot < 40000 else 100
+
+
+def strike_ladder(spot, count=41, step=None):
+    """``count`` strikes centred on the strike nearest spot"""
+    step = step or strike_step(spot)
+    atm = round(spot / step) * step
+    return atm + step * (np.arange(count) - count // 2)
+
+
+def _last_expiry_of_month(year, month):
+    following = date(year + month // 12, month % 12 + 1, 1)
+    last = following - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - EXPIRY_WEEKDAY) % 7)
+
+
+def expiry_dates(today=None, weekly=4, monthly=3):
+    """The next ``weekly`` weekly expiries plus the next ``monthly`` monthly ones, sorted"""
+    today = today or date.today()
+    first = today + timedelta(days=(EXPIRY_WEEKDAY - today.weekday()) % 7)
+    dates = {first + timedelta(weeks=i) for i in range(weekly)}
+    year, month, found = today.year, today.month, 0
+    while found < monthly:
+        expiry = _last_expiry_of_month(year, month)
+        if expiry >= today:
+            dates.add(expiry)
+            found += 1
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return sorted(dates)
+
+
+def years_to(expiry, today=None):
+    """Time to an expiry date in years; an option on its expiry day keeps a quarter day"""
+    today = today or date.today()
+    return max((expiry - today).days, 0.25) / DAYS_PER_YEAR
@@ -0,0 +1,126 @@
+"""Portfolio holdings and vectorized valuation.
+
+Holdings are lots: one row per purchase with a ticker, a quantity and the
+price paid (a CSV file or an uploaded one). ``positions`` nets the lots per
+ticker with one factorize + bincount, and ``value`` prices every position
+against one batch of quotes, so a portfolio of thousands of lots costs a
+handful of array operations and no per-row Python.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Accepted header spellings (compared lower-cased, spaces and dashes as "_")
+COLUMN_ALIASES = {
+    "ticker": ("ticker", "symbol", "stock", "instrument", "scrip"),
+    "quantity": ("quantity", "qty", "shares", "units"),
+    "avg_price": ("avg_price", "average_price", "buy_price", "price", "cost", "avg_cost"),
+}
+
+SAMPLE_HOLDINGS = pd.DataFrame({
+    "ticker": ["RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "INFY.NS", "ICICIBANK.NS"],
+    "quantity": [10, 25, 15, 30, 20],
+    "avg_price": [2450.0, 3200.0, 1650.0, 1500.0, 950.0],
+})
+
+PortfolioSummary = namedtuple("PortfolioSummary", ["investment", "value", "pnl", "pnl_pct", "day_change",
+                                                   "day_change_pct", "positions", "lots", "missing"])
+
+
+def normalize_holdings(df):
+    """Lots frame with ticker, quantity and avg_price columns.
+
+    Tickers without an exchange suffix get ".NS"; rows without a ticker or
+    with a zero quantity are dropped. Raises ValueError when a column is
+    missing.
+    """
+    names = {c: str(c).strip().lower().replace(" ", "_").replace("-", "_") for c in df.columns}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        match = next((c for c, name in names.items() if name in aliases), None)
+        if match is None:
+            raise ValueError(f"Holdings need a {field} column (one of: {', '.join(aliases)})")
+        columns[field] = df[match]
+
+    ticker = columns["ticker"].astype(str).str.strip().str.upper()
+    listed = ticker.str.contains(".", regex=False) | ticker.str.startswith("^")
+    lots = pd.DataFrame({
+        "ticker": ticker.where(listed, ticker + ".NS"),
+        "quantity": pd.to_numeric(columns["quantity"], errors="coerce"),
+        "avg_price": pd.to_numeric(columns["avg_price"], errors="coerce"),
+    })
+    keep = (ticker != "") & (ticker != "NAN") & lots["quantity"].fillna(0).ne(0) & lots["avg_price"].notna()
+    return lots[keep].reset_index(drop=True)
+
+
+def read_holdings(source):
+    """Lots from a CSV path or file-like object"""
+    return normalize_holdings(pd.read_csv(source))
+
+
+def positions(lots):
+    """Net quantity, average price and investment per ticker, in first-seen order"""
+    codes, tickers = pd.factorize(lots["ticker"])
+    quantity = lots["quantity"].to_numpy(dtype=float)
+    cost = quantity * lots["avg_price"].to_numpy(dtype=float)
+    net = np.bincount(codes, weights=quantity, minlength=len(tickers))
+    investment = np.bincount(codes, weights=cost, minlength=len(tickers))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_price = np.where(net != 0, investment / net, np.nan)
+    return pd.DataFrame({"Quantity": net, "Avg Price": avg_price, "Investment": investment},
+                        index=pd.Index(tickers, name="Ticker"))
+
+
+def value(lots, last, previous):
+    """Value positions at ``last`` prices (Series by ticker) vs ``previous`` closes.
+
+    Returns a PortfolioSummary whose ``positions`` frame adds Current Price,
+    Current Value, P&L, P&L %, Day Change and Weight (share of the valued
+    portfolio). Tickers without a price are listed in ``missing`` and left
+    out of the totals.
+    """
+    frame = positions(lots)
+    price = last.reindex(frame.index).to_numpy(dtype=float)
+    prev = previous.reindex(frame.index).to_numpy(dtype=float)
+    quantity = frame["Quantity"].to_numpy()
+    investment = frame["Investment"].to_numpy()
+
+    current = quantity * price
+    pnl = current - investment
+    day_change = quantity * (price - prev)
+    priced = ~np.isnan(price)
+    total_value = float(current[priced].sum())
+    total_investment = float(investment[priced].sum())
+    total_day = float(np.nansum(day_change))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame["Current Price"] = price
+        frame["Current Value"] = current
+        frame["P&L"] = pnl
+        frame["P&L %"] = pnl / np.abs(investment) * 100
+        frame["Day Change"] = day_change
+        frame["Day Change %"] = (price / prev - 1) * 100
+        frame["Weight"] = current / total_value if total_value else np.nan
+
+    pnl_total = total_value - total_investment
+    previous_value = total_value - total_day
+    return PortfolioSummary(
+        investment=total_investment,
+        value=total_value,
+        pnl=pnl_total,
+        pnl_pct=pnl_total / abs(total_investment) * 100 if total_investment else 0.0,
+        day_change=total_day,
+        day_change_pct=total_day / abs(previous_value) * 100 if previous_value else 0.0,
+        positions=frame,
+        lots=len(lots),
+        missing=list(frame.index[~priced]),
+    )
+
+
+def allocation(frame, slices=10):
+    """Current value of the largest ``slices`` positions plus one "Others" slice"""
+    values = frame["Current Value"].dropna().sort_values(ascending=False)
+    if len(values) <= slices:
+        return values
+    top = values.iloc[:slices]
+    return pd.concat([top, pd.Series({"Others": values.iloc[slices:].sum()})])
@@ -0,0 +1,165 @@
+"""Background refresh of the ticker universe, aligned to NSE trading hours.
+
+A PrefetchScheduler runs one daemon thread per process. During the NSE
+session (09:15-15:30 IST, Monday to Friday) it refreshes every ticker on a
+fixed cadence aligned to the clock; outside it, it refreshes shortly before
+the open and after the close, then sleeps. Work is done in small batches
+with a pause in between, waits while interactive loads are in flight, and
+backs off exponentially when refreshes fail. Exchange holidays
+are not modelled; a holiday simply costs a few idle refreshes.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = (9, 15)
+MARKET_CLOSE = (15, 30)
+PRE_OPEN = timedelta(minutes=10)
+POST_CLOSE = timedelta(minutes=5)
+
+
+def _at(day, hour_minute):
+    return day.replace(hour=hour_minute[0], minute=hour_minute[1], second=0, microsecond=0)
+
+
+def is_market_open(now=None):
+    """True during the NSE cash session"""
+    now = (now or datetime.now(IST)).astimezone(IST)
+    return now.weekday() < 5 and _at(now, MARKET_OPEN) <= now < _at(now, MARKET_CLOSE)
+
+
+def next_run(now=None, interval=300):
+    """When the next scheduled refresh is due (aware datetime in IST).
+
+    In session: the next multiple of ``interval`` seconds since midnight,
+    capped at the post-close refresh. Otherwise: the next pre-open, open
+    or post-close refresh on a weekday.
+    """
+    now = (now or datetime.now(IST)).astimezone(IST)
+    if is_market_open(now):
+        midnight = _at(now, (0, 0))
+        elapsed = (now - midnight).total_seconds()
+        aligned = midnight + timedelta(seconds=(int(elapsed // interval) + 1) * interval)
+        return min(aligned, _at(now, MARKET_CLOSE) + POST_CLOSE)
+    for offset in range(8):
+        day = now + timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for candidate in (_at(day, MARKET_OPEN) - PRE_OPEN, _at(day, MARKET_OPEN),
+                          _at(day, MARKET_CLOSE) + POST_CLOSE):
+            if candidate > now:
+                return candidate
+    return now + timedelta(seconds=interval)
+
+
+class PrefetchScheduler:
+    """Periodically calls ``refresh(batch)`` over ``tickers`` in the background.
+
+    ``refresh`` returns {ticker: error} for failures (or raises). A cycle in
+    which every ticker fails counts as a failure and the next attempt is
+    delayed by ``backoff * 2**(failures - 1)`` seconds (capped at
+    ``max_backoff``) instead of waiting for the schedule. ``busy()``, when
+    given, is polled before each batch and the scheduler yields while it
+    returns True.
+    """
+
+    def __init__(self, refresh, tickers, interval=300, batch_size=10, pause=1.0,
+                 backoff=30.0, max_backoff=1800.0, busy=None, max_wait=30.0):
+        self.refresh = refresh
+        self.tickers = list(dict.fromkeys(tickers))
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.busy = busy
+        self.max_wait = max_wait
+        self.failures = 0
+        self.cycles = 0
+        self.last_run = None
+        self.last_duration = None
+        self.last_errors = {}
+        self.next_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the background thread (idempotent); the first cycle runs immediately"""
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="market-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _yield_to_interactive(self):
+        waited = 0.0
+        while self.busy is not None and self.busy() and waited < self.max_wait:
+            if self._stop.wait(self.pause):
+                return
+            waited += self.pause
+
+    def run_once(self):
+        """Refresh every ticker once, batch by batch. Returns {ticker: error}"""
+        started = time.monotonic()
+        errors = {}
+        for i in range(0, len(self.tickers), self.batch_size):
+            if self._stop.is_set():
+                break
+            if i:
+                self._stop.wait(self.pause)
+            self._yield_to_interactive()
+            batch = self.tickers[i:i + self.batch_size]
+            try:
+                errors.update(self.refresh(batch) or {})
+            except Exception as e:
+                errors.update({ticker: str(e) for ticker in batch})
+
+        self.cycles += 1
+        self.last_run = datetime.now(IST)
+        self.last_duration = time.monotonic() - started
+        self.last_errors = errors
+        if self.tickers and len(errors) >= len(self.tickers):
+            self.failures += 1
+        else:
+            self.failures = 0
+        return errors
+
+    def _delay(self):
+        if self.failures:
+            delay = min(self.backoff * 2 ** (self.failures - 1), self.max_backoff)
+            delay *= random.uniform(0.8, 1.2)
+            self.next_run = datetime.now(IST) + timedelta(seconds=delay)
+            return delay
+        self.next_run = next_run(interval=self.interval)
+        return max((self.next_run - datetime.now(IST)).total_seconds(), 0.0)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            if self._stop.wait(self._delay()):
+                break
+
+    def status(self):
+        """Snapshot for the diagnostics page"""
+        return {
+            "running": self.running,
+            "tickers": len(self.tickers),
+            "cycles": self.cycles,
+            "last_run": self.last_run,
+            "last_duration_s": self.last_duration,
+            "failed_tickers": len(self.last_errors),
+            "consecutive_failures": self.failures,
+            "next_run": self.next_run,
+            "market_open": is_market_open(),
+        }
@@ -0,0 +1,319 @@
+"""Market data providers - the only place that talks to the upstream feed.
+
+Every price or fundamentals request made by the app goes through a
+MarketDataProvider. YahooProvider is the production feed; ReplayProvider
+serves recorded fixtures from disk with optional artificial latency so pages
+can be benchmarked and load-tested offline.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# frames: {ticker: OHLCV frame} for symbols that returned data,
+# errors: {ticker: message} for symbols that failed or came back empty.
+BatchResult = namedtuple("BatchResult", ["frames", "errors"])
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def empty_ohlcv():
+    """Empty frame with the standard OHLCV columns"""
+    return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+
+def normalize_ohlcv(df, ticker=None):
+    """Flatten provider output to a plain Open/High/Low/Close/Volume frame.
+
+    yfinance returns (Price, Ticker) MultiIndex columns for downloads, so the
+    ticker level is dropped here and the index is made tz-naive and sorted.
+    """
+    if df is None or not hasattr(df, 'empty') or df.empty:
+        return empty_ohlcv()
+
+    if isinstance(df.columns, pd.MultiIndex):
+        price_level = next(
+            (lvl for lvl in range(df.columns.nlevels) if 'Close' in df.columns.get_level_values(lvl)),
+            0,
+        )
+        other_level = 1 - price_level if df.columns.nlevels == 2 else None
+        if other_level is not None:
+            symbols = df.columns.get_level_values(other_level).unique()
+            key = ticker if ticker in symbols else symbols[0]
+            df = df.xs(key, axis=1, level=other_level)
+        else:
+            df = df.droplevel([lvl for lvl in range(df.columns.nlevels) if lvl != price_level], axis=1)
+
+    df = df.reindex(columns=OHLCV_COLUMNS).astype(float)
+    df.columns.name = None
+    df = df.dropna(subset=["Close"])
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.rename("Date")
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+def period_start(period, last_bar):
+    """Resolve a yfinance style period against the last available bar.
+
+    Returns an int (number of trailing trading bars), a Timestamp (first
+    calendar date to include) or None (whole history).
+    """
+    if period in (None, "", "max"):
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=last_bar.year, month=1, day=1)
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    count, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return count
+    if unit == "wk":
+        return last_bar.normalize() - pd.DateOffset(weeks=count)
+    if unit == "mo":
+        return last_bar.normalize() - pd.DateOffset(months=count)
+    return last_bar.normalize() - pd.DateOffset(years=count)
+
+
+def slice_history(df, start=None, period=None):
+    """Rows of an OHLCV frame from start (inclusive) or for a period"""
+    if df.empty:
+        return df
+    if start is not None:
+        return df[df.index >= pd.Timestamp(start)]
+    first = period_start(period, df.index[-1])
+    if first is None:
+        return df
+    if isinstance(first, int):
+        return df.iloc[-first:] if first else df.iloc[:0]
+    return df[df.index >= first]
+
+
+def safe_filename(ticker):
+    """Ticker symbol made safe for use as a file name (^NSEI -> _NSEI)"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+
+
+def _fetch_pooled(provider, tickers, start=None, period=None, max_workers=8):
+    def fetch_one(ticker):
+        try:
+            return ticker, provider.history(ticker, start=start, period=period), None
+        except Exception as e:
+            return ticker, None, str(e)
+
+    frames, errors = {}, {}
+    if not tickers:
+        return BatchResult(frames, errors)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+        for ticker, df, error in pool.map(fetch_one, tickers):
+            if error is not None:
+                errors[ticker] = error
+            elif df is None or df.empty:
+                errors[ticker] = "no data returned"
+            else:
+                frames[ticker] = df
+    return BatchResult(frames, errors)
+
+
+class MarketDataProvider:
+    """Interface every market data backend implements.
+
+    ``history`` returns a normalized daily OHLCV frame, ``info`` a dict of
+    fundamentals in yfinance ``Ticker.info`` naming. ``history_many`` may be
+    overridden by feeds with a native batch endpoint; the default fans out
+    over a bounded thread pool.
+    """
+
+    name = "base"
+    max_workers = 8
+
+    def history(self, ticker, start=None, period=None):
+        raise NotImplementedError
+
+    def history_many(self, tickers, start=None, period=None):
+        return _fetch_pooled(self, list(dict.fromkeys(tickers)), start=start, period=period,
+                             max_workers=self.max_workers)
+
+    def info(self, ticker):
+        raise NotImplementedError
+
+
+class YahooProvider(MarketDataProvider):
+    """Daily OHLCV history and fundamentals from Yahoo Finance"""
+
+    name = "yahoo"
+
+    def history(self, ticker, start=None, period=None):
+        """Daily bars for ticker, either from start (inclusive) or for a yfinance period"""
+        if start is not None:
+            data = yf.download(ticker, start=pd.Timestamp(start).strftime("%Y-%m-%d"),
+                               progress=False, auto_adjust=True)
+        else:
+            data = yf.download(ticker, period=period or "max", progress=False, auto_adjust=True)
+        return normalize_ohlcv(data, ticker)
+
+    def history_many(self, tickers, start=None, period=None):
+        """Daily bars for many tickers in a single download, split per symbol"""
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return BatchResult({}, {})
+        kwargs = dict(progress=False, auto_adjust=True, group_by="ticker", threads=True)
+        try:
+            if start is not None:
+                data = yf.download(tickers, start=pd.Timestamp(start).strftime("%Y-%m-%d"), **kwargs)
+            else:
+                data = yf.download(tickers, period=period or "max", **kwargs)
+        except Exception as e:
+            return BatchResult({}, {ticker: str(e) for ticker in tickers})
+
+        frames, errors = {}, {}
+        symbols = data.columns.get_level_values(0) if isinstance(data.columns, pd.MultiIndex) else []
+        for ticker in tickers:
+            if ticker not in symbols:
+                errors[ticker] = "no data returned"
+                continue
+            df = normalize_ohlcv(data[ticker], ticker)
+            if df.empty:
+                errors[ticker] = "no data returned"
+            else:
+                frames[ticker] = df
+        return BatchResult(frames, errors)
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info or {}
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves recorded fixtures from a directory, deterministically.
+
+    Fixtures are ``<TICKER>.csv`` (Date, Open, High, Low, Close, Volume) and
+    optionally ``<TICKER>.info.json``, as written by ``record_fixtures``.
+    Periods are resolved against the last recorded bar rather than today, so
+    a replay returns the same rows on every run. ``latency`` seconds (plus up
+    to ``jitter`` seconds drawn from a seeded RNG) are slept per call to
+    mimic a remote feed; ``calls`` counts requests per method.
+    """
+
+    name = "replay"
+
+    def __init__(self, root, latency=0.0, jitter=0.0, seed=0):
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _delay(self, method):
+        with self._lock:
+            self.calls[method] += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _frame(self, ticker):
+        if ticker not in self._frames:
+            path = os.path.join(self.root, f"{safe_filename(ticker)}.csv")
+            if not os.path.exists(path):
+                raise KeyError(f"No replay fixture for {ticker}")
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+            self._frames[ticker] = normalize_ohlcv(df, ticker)
+        return self._frames[ticker]
+
+    def history(self, ticker, start=None, period=None):
+        self._delay("history")
+        return slice_history(self._frame(ticker), start=start, period=period).copy()
+
+    def history_many(self, tickers, start=None, period=None):
+        self._delay("history_many")
+        frames, errors = {}, {}
+        for ticker in dict.fromkeys(tickers):
+            try:
+                df = slice_history(self._frame(ticker), start=start, period=period)
+            except KeyError as e:
+                errors[ticker] = e.args[0]
+                continue
+            if df.empty:
+                errors[ticker] = "no data returned"
+            else:
+                frames[ticker] = df.copy()
+        return BatchResult(frames, errors)
+
+    def info(self, ticker):
+        self._delay("info")
+        path = os.path.join(self.root, f"{safe_filename(ticker)}.info.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as fh:
+            return json.load(fh)
+
+
+def record_fixtures(provider, tickers, root, period="max", with_info=True):
+    """Record history (and info) for tickers from provider into a replay directory.
+
+    Returns {ticker: error message} for tickers that could not be recorded.
+    """
+    os.makedirs(root, exist_ok=True)
+    result = fetch_many(provider, tickers, period=period)
+    errors = dict(result.errors)
+    for ticker, df in result.frames.items():
+        df.to_csv(os.path.join(root, f"{safe_filename(ticker)}.csv"))
+        if with_info:
+            try:
+                info = provider.info(ticker)
+            except Exception as e:
+                errors[ticker] = str(e)
+                continue
+            with open(os.path.join(root, f"{safe_filename(ticker)}.info.json"), "w") as fh:
+                json.dump(info, fh, default=str)
+    return errors
+
+
+def create_provider(name="yahoo", **options):
+    """Build a provider by name: "yahoo" or "replay" (options: root, latency, jitter, seed)"""
+    if name == "yahoo":
+        return YahooProvider()
+    if name == "replay":
+        return ReplayProvider(**options)
+    raise ValueError(f"Unknown market data provider: {name}")
+
+
+def provider_from_env(environ=None):
+    """Provider selected by SMART_TRADE_PROVIDER and SMART_TRADE_REPLAY_* variables"""
+    environ = os.environ if environ is None else environ
+    name = environ.get("SMART_TRADE_PROVIDER", "yahoo")
+    if name != "replay":
+        return create_provider(name)
+    return create_provider(
+        "replay",
+        root=environ.get("SMART_TRADE_REPLAY_DIR", "fixtures"),
+        latency=float(environ.get("SMART_TRADE_REPLAY_LATENCY", "0")),
+        jitter=float(environ.get("SMART_TRADE_REPLAY_JITTER", "0")),
+        seed=int(environ.get("SMART_TRADE_REPLAY_SEED", "0")),
+    )
+
+
+def fetch_many(provider, tickers, start=None, period=None, max_workers=8):
+    """Fetch many tickers through provider, batched when it supports it.
+
+    Duck-typed providers without ``history_many`` are called per symbol from
+    a bounded thread pool. A failing symbol is reported in ``errors`` and
+    never discards the others.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if hasattr(provider, "history_many"):
+        return provider.history_many(tickers, start=start, period=period)
+    return _fetch_pooled(provider, tickers, start=start, period=period, max_workers=max_workers)
@@ -0,0 +1,210 @@
+"""Portfolio risk from the daily returns of the holdings.
+
+``ReturnMoments`` keeps the (date x ticker) return matrix of a holdings set
+together with its running sums and cross-product matrix, so the covariance
+is ``(R'R - s s' / n) / (n - 1)`` without another pass over the history.
+When the price matrix gains bars only the new return rows are added, and
+rows that fall out of the front of the window are subtracted. A revised
+last (forming) bar replaces just the last return row; a history that no
+longer matches the stored prices otherwise is rebuilt.
+
+Returns are simple daily returns. A ticker is flat (zero return) before its
+first price, matching ``backtest.price_matrix``. VaR and CVaR are one-day
+losses as positive fractions of the portfolio value: historical from the
+portfolio return series, parametric from a normal with the sample mean and
+covariance.
+"""
+import math
+import threading
+from collections import OrderedDict, namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+TRADING_DAYS = 252
+CONFIDENCE = 0.95
+BENCHMARK = "^NSEI"
+
+RiskReport = namedtuple("RiskReport", ["beta", "volatility", "var", "cvar", "parametric_var", "parametric_cvar",
+                                       "diversification_ratio", "effective_holdings", "observations", "coverage"])
+
+
+def simple_returns(values):
+    """Row-over-row returns of a (date x ticker) price array; NaN (not yet listed) is 0"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = values[1:] / values[:-1] - 1.0
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+class ReturnMoments:
+    """Return matrix and running first/second moments of a fixed set of tickers"""
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.version = None
+        self._reset()
+
+    def _reset(self):
+        k = len(self.columns)
+        self.index = None
+        self.returns = np.empty((0, k))
+        self.sum = np.zeros(k)
+        self.cross = np.zeros((k, k))
+        self._last_prices = None
+        self._previous_prices = None
+
+    def __len__(self):
+        return len(self.returns)
+
+    def _add(self, returns):
+        self.returns = np.concatenate([self.returns, returns])
+        self.sum += returns.sum(axis=0)
+        self.cross += returns.T @ returns
+
+    def _drop_last(self):
+        old = self.returns[-1:]
+        self.returns = self.returns[:-1]
+        self.index = self.index[:-1]
+        self.sum -= old.sum(axis=0)
+        self.cross -= old.T @ old
+
+    def _drop(self, count):
+        old = self.returns[:count]
+        self.returns = self.returns[count:]
+        self.index = self.index[count:]
+        self.sum -= old.sum(axis=0)
+        self.cross -= old.T @ old
+
+    def update(self, close):
+        """Bring the moments up to a (date x ticker) close frame. Returns the rows added or replaced"""
+        if not len(close):
+            return 0
+        last_row = close.iloc[-1].reindex(list(self.columns)).to_numpy(dtype=float)
+        # The last bar's prices are part of the version: they move intraday
+        version = (close.index[0], close.index[-1], len(close), last_row.tobytes())
+        if version == self.version:
+            return 0
+        values = close.reindex(columns=list(self.columns)).to_numpy(dtype=float)
+        start = None
+        if self.index is not None and len(self.index):
+            pos = close.index.searchsorted(self.index[-1])
+            if pos < len(close) and close.index[pos] == self.index[-1]:
+                if np.allclose(values[pos], self._last_prices, equal_nan=True):
+                    start = pos
+                elif pos > 0 and self._previous_prices is not None and \
+                        np.allclose(values[pos - 1], self._previous_prices, equal_nan=True):
+                    # Only the stored last bar was revised: recompute its return row
+                    self._drop_last()
+                    start = pos - 1
+        if start is None:
+            self._reset()
+            start = 0
+            self.index = close.index[1:1]
+
+        added = simple_returns(values[start:])
+        self._add(added)
+        self.index = self.index.append(close.index[start + 1:])
+        # Copies: values may be a view of the caller's frame
+        self._last_prices = values[-1].copy()
+        self._previous_prices = values[-2].copy() if len(values) > 1 else None
+        # Rows before the window's first return date have left the history
+        stale = int(self.index.searchsorted(close.index[1])) if len(close) > 1 else len(self.index)
+        if stale:
+            self._drop(stale)
+        self.version = version
+        return len(added)
+
+    def mean(self):
+        return self.sum / max(len(self), 1)
+
+    def covariance(self):
+        n = len(self)
+        if n < 2:
+            return np.full(self.cross.shape, np.nan)
+        return (self.cross - np.outer(self.sum, self.sum) / n) / (n - 1)
+
+
+def portfolio_risk(moments, weights, benchmark=BENCHMARK, confidence=CONFIDENCE):
+    """RiskReport of a portfolio with ``weights`` (Series of position values by ticker).
+
+    Weights are normalized over the tickers with history; ``coverage`` is
+    their share of the gross position value. Beta is against ``benchmark``.
+    """
+    if len(moments) < 2 or not len(weights):
+        return None
+    gross = float(weights.abs().sum())
+    w = weights.reindex(list(moments.columns)).fillna(0.0).to_numpy(dtype=float, copy=True)
+    if benchmark in moments.columns:
+        w[moments.columns.index(benchmark)] = 0.0
+    total = w.sum()
+    if not total:
+        return None
+    coverage = float(np.abs(w).sum() / gross) if gross else 0.0
+    w = w / total
+
+    cov = moments.covariance()
+    variance = float(w @ cov @ w)
+    sigma = math.sqrt(max(variance, 0.0))
+    beta = math.nan
+    if benchmark in moments.columns:
+        b = moments.columns.index(benchmark)
+        beta = float(cov[b] @ w / cov[b, b]) if cov[b, b] > 0 else math.nan
+
+    # Historical: empirical tail of the portfolio's daily returns
+    daily = moments.returns @ w
+    var = -float(np.quantile(daily, 1 - confidence))
+    tail = daily[daily <= -var]
+    cvar = -float(tail.mean()) if len(tail) else var
+
+    # Parametric: normal with the sample mean and covariance
+    mu = float(moments.mean() @ w)
+    z = NormalDist().inv_cdf(confidence)
+    parametric_var = -(mu - z * sigma)
+    parametric_cvar = -(mu - sigma * math.exp(-0.5 * z * z) / math.sqrt(2 * math.pi) / (1 - confidence))
+
+    # Weighted average stock volatility over portfolio volatility (1 = no diversification)
+    stock_sigma = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    diversification = float(np.abs(w) @ stock_sigma / sigma) if sigma > 0 else math.nan
+
+    return RiskReport(
+        beta=beta,
+        volatility=sigma * math.sqrt(TRADING_DAYS),
+        var=var,
+        cvar=cvar,
+        parametric_var=parametric_var,
+        parametric_cvar=parametric_cvar,
+        diversification_ratio=diversification,
+        effective_holdings=float(1.0 / np.sum(w ** 2)),
+        observations=len(moments),
+        coverage=coverage,
+    )
+
+
+class RiskCache:
+    """ReturnMoments per holdings set, kept up to date with each new price matrix.
+
+    Reruns with the same data version reuse the covariance as is; a price
+    matrix with new bars only adds their return rows. Position sizes can
+    change freely: only the ticker set selects the moments.
+    """
+
+    def __init__(self, maxsize=32, benchmark=BENCHMARK):
+        self.maxsize = maxsize
+        self.benchmark = benchmark
+        self._moments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, close, weights, confidence=CONFIDENCE):
+        """RiskReport for weights (position values by ticker) from a (date x ticker) close frame"""
+        if close is None or close.empty:
+            return None
+        key = tuple(sorted(close.columns))
+        with self._lock:
+            moments = self._moments.get(key)
+            if moments is None:
+                moments = self._moments[key] = ReturnMoments(key)
+            self._moments.move_to_end(key)
+            while len(self._moments) > self.maxsize:
+                self._moments.popitem(last=False)
+            moments.update(close)
+            return portfolio_risk(moments, weights, self.benchmark, confidence)
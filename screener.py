@@ -0,0 +1,126 @@
+"""Universe screener over a precomputed ticker x metric table.
+
+``metric_table`` turns each ticker's bars and the fundamentals table into
+one row per ticker: latest price and returns, the indicators of
+indicators.DEFAULT_INDICATORS (the definitions the market trends page uses)
+and fundamentals. Every ticker keeps its own trading calendar: the bars are
+stacked right-aligned (row -1 is each ticker's last bar, shorter histories
+are NaN-padded at the top), so one vectorized pass gives the same values
+as computing each ticker alone, without the flat filler bars a union
+calendar would insert on other markets' trading days. ``screen`` filters it with an expression such as
+``rsi14 < 30 and pe < 20``, which is checked against a whitelist of syntax
+and column names before pandas evaluates it.
+"""
+import ast
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+FUNDAMENTAL_COLUMNS = {"trailingPE": "pe", "dividendYield": "dividend_yield", "marketCap": "market_cap", "beta": "beta"}
+
+TRADING_DAYS = 252
+
+RETURN_WINDOWS = {"change_pct": 1, "return_1w": 5, "return_1m": 21, "return_3m": 63, "return_1y": 252}
+
+EXAMPLE_FILTERS = {
+    "Oversold value": "rsi14 < 30 and pe < 20",
+    "Momentum": "return_3m > 10 and price > sma20 and macd_hist > 0",
+    "Squeeze near lower band": "bb_pct < 0.1 and volatility20 < 30",
+    "Large caps paying dividends": "market_cap > 1e12 and dividend_yield > 1",
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Lt, ast.LtE, ast.Gt,
+    ast.GtE, ast.Eq, ast.NotEq, ast.Name, ast.Load, ast.Constant,
+)
+
+
+def _last_row(values):
+    # Latest value per column (the matrices are right-aligned on each
+    # ticker's own last bar).
+    return values[-1] if len(values) else np.full(values.shape[1:], np.nan)
+
+
+def stacked_bars(frames, column="Close"):
+    """(bars x ticker) array of each frame's own bars, right-aligned and NaN-padded at the top"""
+    length = max((len(df) for df in frames.values()), default=0)
+    out = np.full((length, len(frames)), np.nan)
+    for j, df in enumerate(frames.values()):
+        if len(df):
+            out[length - len(df):, j] = df[column].to_numpy(dtype=float)
+    return out
+
+
+def metric_table(frames, fundamentals=None):
+    """Ticker x metric DataFrame from {ticker: OHLCV frame}.
+
+    Returns are in percent over each ticker's own trading days,
+    volatility20 is annualized percent, bb_pct is the position inside the
+    Bollinger bands (0 lower, 1 upper) and fundamentals (a
+    FundamentalsStore.table()) are joined by ticker with the dividend yield
+    in percent.
+    """
+    if not frames:
+        return pd.DataFrame()
+    tickers = pd.Index(list(frames))
+    c = stacked_bars(frames)
+    has_range = all('High' in df and 'Low' in df for df in frames.values())
+    h = stacked_bars(frames, "High") if has_range else None
+    l = stacked_bars(frames, "Low") if has_range else None
+    names = [n for n in indicators.DEFAULT_INDICATORS if h is not None or not n.startswith("atr")]
+    values = indicators.compute(c, h, l, names)
+
+    price = _last_row(c)
+    table = {"price": price}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name, window in RETURN_WINDOWS.items():
+            past = c[-window - 1] if len(c) > window else np.full(len(tickers), np.nan)
+            table[name] = (price / past - 1.0) * 100
+        for name in names:
+            table[name] = _last_row(values[name])
+        table["volatility20"] = table["volatility20"] * np.sqrt(TRADING_DAYS) * 100
+        width = table["bb_upper"] - table["bb_lower"]
+        table["bb_pct"] = np.where(width > 0, (price - table["bb_lower"]) / width, np.nan)
+        table["vs_sma20"] = (price / table["sma20"] - 1.0) * 100
+        if "atr14" in table:
+            table["atr_pct"] = table["atr14"] / price * 100
+    frame = pd.DataFrame(table, index=pd.Index(tickers, name="Ticker"))
+
+    if fundamentals is not None and not fundamentals.empty:
+        fund = fundamentals.reindex(tickers)[list(FUNDAMENTAL_COLUMNS)].rename(columns=FUNDAMENTAL_COLUMNS)
+        fund["dividend_yield"] = fund["dividend_yield"] * 100
+        frame = frame.join(fund)
+    else:
+        for column in FUNDAMENTAL_COLUMNS.values():
+            frame[column] = np.nan
+    return frame
+
+
+def validate_filter(expr, columns):
+    """Raise ValueError unless expr only compares numbers and known metric columns"""
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter syntax: {e.msg}")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in filter: {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id not in columns:
+            raise ValueError(f"Unknown metric: {node.id}")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or
+                                               not isinstance(node.value, (int, float))):
+            raise ValueError(f"Only numbers can be compared, got {node.value!r}")
+
+
+def screen(table, expr="", sort_by=None, ascending=False, limit=None):
+    """Rows of table matching expr (all rows when empty), sorted by sort_by"""
+    result = table
+    if expr and expr.strip():
+        validate_filter(expr, set(table.columns))
+        result = table.query(expr)
+    if sort_by:
+        result = result.sort_values(sort_by, ascending=ascending, na_position="last")
+    return result.head(limit) if limit else result
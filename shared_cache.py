@@ -0,0 +1,191 @@
+"""Process-wide cache shared by every session, with single-flight loading.
+
+One in-flight load per key: concurrent callers of a missing key wait for
+the first caller's result instead of each hitting upstream. Once an entry
+is older than ``ttl`` it is still served for up to ``stale_ttl`` more
+seconds while a single background refresh replaces it, so an expiring key
+never stalls a page. The number of entries is bounded with LRU eviction.
+
+Caches live in a module-level registry, so they survive Streamlit reruns
+(which re-execute app.py) and are shared by all sessions in the process.
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from instrumentation import background
+
+
+class SharedCache:
+    """Thread-safe TTL + LRU cache with single-flight and stale-while-revalidate"""
+
+    def __init__(self, ttl=300, stale_ttl=None, maxsize=256, name="shared_cache"):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.maxsize = maxsize
+        self.stats = Counter()
+        self._entries = OrderedDict()   # key -> (value, stored_at)
+        self._inflight = {}             # key -> Future of the running load
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, loader):
+        """Value for key, calling loader() at most once at a time per key"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = time.monotonic() - stored_at
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    if age < self.ttl:
+                        self.stats["hits"] += 1
+                    else:
+                        self.stats["stale_hits"] += 1
+                        if key not in self._inflight:
+                            self._start_refresh(key, loader)
+                    return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.stats["misses"] += 1
+            else:
+                self.stats["waits"] += 1
+
+        if leader:
+            self._load(key, loader, future)
+        return future.result()
+
+    def refresh(self, key, loader):
+        """Reload key now, unless a load of it is already in flight.
+
+        The current value keeps being served until the new one is stored.
+        Returns False when another load was already running.
+        """
+        with self._lock:
+            if key in self._inflight:
+                return False
+            future = self._inflight[key] = Future()
+            self.stats["refreshes"] += 1
+        self._load(key, loader, future)
+        return future.exception() is None
+
+    def busy(self):
+        """True while any load of this cache is in flight"""
+        return bool(self._inflight)
+
+    def _start_refresh(self, key, loader):
+        # Caller holds the lock.
+        future = self._inflight[key] = Future()
+        self.stats["refreshes"] += 1
+        threading.Thread(target=self._load, args=(key, self._tracked(key, loader), future), daemon=True,
+                         name=f"cache-refresh-{key!r:.40}").start()
+
+    def _tracked(self, key, loader):
+        # The refresh thread has no instrumented call on its stack, so give the
+        # loader one; otherwise its errors never reach the metrics.
+        try:
+            kwargs = dict(key)
+        except (TypeError, ValueError):
+            kwargs = {}
+
+        def load():
+            with background(self.name, kwargs):
+                return loader()
+        return load
+
+    def _load(self, key, loader, future):
+        try:
+            value = loader()
+        except BaseException as e:
+            # A failed refresh keeps serving the stale value; waiters get the error.
+            with self._lock:
+                self.stats["errors"] += 1
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._inflight.pop(key, None)
+        future.set_result(value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats.clear()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(name, ttl=300, stale_ttl=None, maxsize=256):
+    """The process-wide cache called name, created on first use"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = SharedCache(ttl, stale_ttl, maxsize, name)
+        return _registry[name]
+
+
+def caches():
+    """{name: SharedCache} of every cache created in this process"""
+    with _registry_lock:
+        return dict(_registry)
+
+
+def clear_all():
+    for cache in caches().values():
+        cache.clear()
+
+
+def _copy(value):
+    # Callers get their own copy of frames and dicts so one session cannot
+    # mutate what another is served.
+    return value.copy() if hasattr(value, "copy") else value
+
+
+def cached(name, ttl=300, stale_ttl=None, maxsize=256, copy=True):
+    """Decorator memoizing a function in the shared cache ``name``.
+
+    Arguments must be hashable; defaults are filled in so f(x) and
+    f(x, default) share an entry. ``f.refresh(*args)`` reloads an entry
+    ahead of its expiry.
+    """
+    cache = get_cache(name, ttl, stale_ttl, maxsize)
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple(bound.arguments.items())
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            value = cache.get(make_key(args, kwargs), lambda: fn(*args, **kwargs))
+            return _copy(value) if copy else value
+
+        def refresh(*args, **kwargs):
+            return cache.refresh(make_key(args, kwargs), lambda: fn(*args, **kwargs))
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        wrapper.refresh = refresh
+        return wrapper
+    return decorator
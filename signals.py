@@ -0,0 +1,201 @@
+"""Trading signals for the ticker universe, precomputed into a store.
+
+A signal combines the forecasting model with the indicator engine:
+
+* model   - next-week expected return divided by its RMSE, squashed by tanh
+* trend   - sign of the MACD histogram and of price vs SMA 50
+* RSI     - mean reversion outside 30 / 70
+
+The weighted score lies in [-1, 1]; above BUY_THRESHOLD it is a BUY, below
+-BUY_THRESHOLD a SELL, otherwise a HOLD (the trend alone never crosses the
+threshold). Confidence is the model's
+probability that the next-month return has the signal's sign. Targets and
+stops come from forecasting.trade_levels (mirrored below the price for a
+SELL).
+
+``SignalStore`` keeps the latest signal per ticker as one structured array
+persisted to ``signals.npy``; pages read it instead of computing anything,
+so they render in the same time whatever the universe size.
+"""
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from forecasting import trade_levels
+
+WEIGHTS = {"model": 0.5, "trend": 0.3, "rsi": 0.2}
+BUY_THRESHOLD = 0.35
+
+Signal = namedtuple("Signal", ["ticker", "signal", "score", "confidence", "price", "target", "stop_loss",
+                               "expected_return", "accuracy", "rsi", "bar_time", "generated"])
+
+SIGNAL_DTYPE = np.dtype([("ticker", "U32"), ("signal", "U4")] +
+                        [(f, "<f8") for f in Signal._fields[2:]])
+
+
+def _normal_cdf(z):
+    return 0.5 * (1 + math.erf(z / math.sqrt(2)))
+
+
+def compute_signal(ticker, df, forecast, generated=None):
+    """Signal for ticker from its bars and ForecastCache forecast, or None"""
+    if forecast is None or "next_week" not in forecast.horizons or "next_month" not in forecast.horizons:
+        return None
+    close = df['Close'].to_numpy(dtype=float)
+    values = indicators.compute(close, None, None, ("rsi14", "macd_hist", "sma50"))
+    rsi = indicators.last_valid(values["rsi14"])
+    macd_hist = indicators.last_valid(values["macd_hist"])
+    sma50 = indicators.last_valid(values["sma50"])
+    price = forecast.price
+
+    week = forecast.horizons["next_week"]
+    month = forecast.horizons["next_month"]
+    rmse = week["rmse"] if week["rmse"] and not math.isnan(week["rmse"]) else math.nan
+    model = math.tanh(math.log1p(week["return"]) / rmse) if not math.isnan(rmse) else 0.0
+    trend = 0.5 * np.sign(np.nan_to_num(macd_hist)) + 0.5 * np.sign(np.nan_to_num(price - sma50))
+    rsi_term = 0.0 if math.isnan(rsi) else float(np.clip((50 - rsi) / 20, -1, 1)) if rsi < 30 or rsi > 70 else 0.0
+    score = WEIGHTS["model"] * model + WEIGHTS["trend"] * float(trend) + WEIGHTS["rsi"] * rsi_term
+
+    signal = "BUY" if score > BUY_THRESHOLD else "SELL" if score < -BUY_THRESHOLD else "HOLD"
+    p_up = _normal_cdf(math.log1p(month["return"]) / month["rmse"]) \
+        if month["rmse"] and not math.isnan(month["rmse"]) else 0.5
+    confidence = p_up if signal == "BUY" else 1 - p_up if signal == "SELL" else 1 - abs(2 * p_up - 1)
+
+    stop_loss, target, _ = trade_levels(forecast)
+    if signal == "SELL":
+        stop_loss, target = 2 * price - stop_loss, 2 * price - target
+
+    return Signal(ticker, signal, score, confidence, price, target, stop_loss, month["return"],
+                  week["hit_rate"], rsi, pd.Timestamp(df.index[-1]).timestamp(),
+                  time.time() if generated is None else generated)
+
+
+class SignalStore:
+    """Latest Signal per ticker, persisted as ``signals.npy``"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._records = self._read()
+
+    @property
+    def path(self):
+        return os.path.join(self.root, "signals.npy")
+
+    def _read(self):
+        try:
+            records = np.load(self.path)
+        except (OSError, ValueError):
+            return np.empty(0, dtype=SIGNAL_DTYPE)
+        return records if records.dtype == SIGNAL_DTYPE else np.empty(0, dtype=SIGNAL_DTYPE)
+
+    def __len__(self):
+        return len(self._records)
+
+    def put(self, signals):
+        """Replace the stored signals of these tickers and save"""
+        signals = [s for s in signals if s is not None]
+        if not signals:
+            return
+        with self._lock:
+            replaced = {s.ticker for s in signals}
+            keep = self._records[~np.isin(self._records["ticker"], list(replaced))]
+            new = np.array([tuple(s) for s in signals], dtype=SIGNAL_DTYPE)
+            self._records = np.concatenate([keep, new])
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as fh:
+                np.save(fh, self._records)
+            os.replace(tmp_path, self.path)
+
+    def get(self, ticker):
+        with self._lock:
+            rows = self._records[self._records["ticker"] == ticker]
+        return Signal(*rows[0].tolist()) if len(rows) else None
+
+    def table(self):
+        """Signals as a DataFrame indexed by ticker, strongest first"""
+        with self._lock:
+            records = self._records.copy()
+        frame = pd.DataFrame({name: records[name] for name in SIGNAL_DTYPE.names[1:]},
+                             index=pd.Index(records["ticker"], name="Ticker"))
+        frame = frame.reindex(frame["score"].abs().sort_values(ascending=False).index)
+        for column in ("bar_time", "generated"):
+            frame[column] = pd.to_datetime(frame[column], unit="s")
+        return frame
+
+
+class SignalEngine:
+    """Computes and stores signals for batches of tickers.
+
+    ``load_bars(ticker)`` returns the bars a forecast is made from and
+    ``forecast(ticker, df)`` the ForecastCache forecast for them. ``busy()``,
+    when given, is polled before each ticker and the engine waits (up to
+    ``max_wait`` seconds) while it returns True, so background runs give
+    way to interactive requests between tickers. ``start()`` runs in a
+    background thread so a page never waits for a whole universe.
+    """
+
+    def __init__(self, store, load_bars, forecast, busy=None, pause=0.5, max_wait=30.0):
+        self.store = store
+        self.load_bars = load_bars
+        self.forecast = forecast
+        self.busy = busy
+        self.pause = pause
+        self.max_wait = max_wait
+        self.last_run = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        """True while a run started with start() is in progress"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, tickers):
+        """Run for tickers in a background thread. Returns False when a run is already going"""
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(target=self.run, args=(list(tickers), True), daemon=True,
+                                            name="signal-engine")
+            self._thread.start()
+            return True
+
+    def _yield_to_interactive(self):
+        waited = 0.0
+        while self.busy is not None and self.busy() and waited < self.max_wait:
+            time.sleep(self.pause)
+            waited += self.pause
+
+    def run(self, tickers, background=False):
+        """Recompute signals for tickers. Returns {ticker: error}
+
+        With ``background`` the engine yields to interactive work before
+        each ticker and stores each signal as soon as it is computed, so
+        readers see the table fill in.
+        """
+        signals, errors = [], {}
+        generated = self.last_run = time.time()
+        for ticker in tickers:
+            if background:
+                self._yield_to_interactive()
+            try:
+                df = self.load_bars(ticker)
+                signal = compute_signal(ticker, df, self.forecast(ticker, df), generated)
+                if signal is None:
+                    errors[ticker] = "not enough history"
+                elif background:
+                    self.store.put([signal])
+                else:
+                    signals.append(signal)
+            except Exception as e:
+                errors[ticker] = str(e)
+        self.store.put(signals)
+        return errors
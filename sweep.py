@@ -0,0 +1,119 @@
+"""Grid search over strategy parameters and risk settings.
+
+The price array is placed in shared memory once and every worker process
+attaches to it instead of receiving a pickled copy. Work is split by
+strategy parameter set: a worker generates that set's signals once and then
+evaluates every risk combination (stop loss x take profit x position size)
+in a single vectorized simulate() call over a (time, combinations) matrix.
+"""
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import performance, signal_positions, simulate, trade_stats
+
+# Below this many combinations process start-up costs more than it saves.
+POOL_MIN_COMBINATIONS = 5000
+
+DEFAULT_SWEEP = {
+    "ma_crossover": {"fast": [5, 10, 15, 20, 30], "slow": [40, 50, 100, 150, 200]},
+    "rsi": {"period": [7, 10, 14, 21], "lower": [20, 25, 30, 35], "upper": [65, 70, 75, 80]},
+    "macd": {"fast": [8, 12, 16], "slow": [21, 26, 34], "signal": [5, 9, 13]},
+    "bollinger": {"window": [10, 15, 20, 30], "num_std": [1.5, 2.0, 2.5, 3.0]},
+}
+
+_worker = {}
+
+
+def parameter_grid(ranges):
+    """Every combination of {name: [values]} as a list of dicts"""
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(ranges[n] for n in names))]
+
+
+def _attach(shm_name, shape, dtype):
+    # Process pool initializer: map the shared close array without copying.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm
+    _worker["close"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _evaluate(strategy, params, risk, first, capital, commission, close=None):
+    close = _worker["close"] if close is None else close
+    target = signal_positions(strategy, close, **params)[first:]
+    window = close[first:]
+    k = len(risk)
+    sim = simulate(
+        np.repeat(window[:, None], k, axis=1),
+        np.repeat(target[:, None], k, axis=1),
+        stop_loss=risk[:, 0],
+        take_profit=risk[:, 1],
+        position_size=risk[:, 2],
+        commission=commission,
+        capital=capital,
+    )
+    perf = performance(sim["equity"], capital)
+    stats = trade_stats(sim, commission)
+    return np.column_stack([
+        perf["total_return"], perf["max_drawdown"], perf["sharpe"], stats["trades"], stats["win_rate"],
+    ])
+
+
+def _pool_context():
+    # Forking a multi-threaded server process is unsafe, so workers are started
+    # from a clean interpreter.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def run_sweep(close, strategy, param_ranges, stop_losses, take_profits, position_sizes,
+              first=0, capital=100000.0, commission=0.0, max_workers=None, rank_by="sharpe"):
+    """Evaluate the full grid and return a results frame sorted by rank_by.
+
+    close is the full price history (signals are warmed up on it) and
+    trading starts at bar ``first``. Risk settings are fractions. With
+    max_workers=1, or fewer than POOL_MIN_COMBINATIONS combinations,
+    everything runs in-process.
+    """
+    close = np.ascontiguousarray(close, dtype=float)
+    strategy_grid = parameter_grid(param_ranges)
+    risk = np.array(list(itertools.product(stop_losses, take_profits, position_sizes)), dtype=float)
+    if not strategy_grid or len(risk) == 0:
+        return pd.DataFrame()
+
+    workers = max_workers or os.cpu_count() or 1
+    workers = min(workers, len(strategy_grid))
+    if workers <= 1 or len(strategy_grid) * len(risk) < POOL_MIN_COMBINATIONS:
+        blocks = [_evaluate(strategy, p, risk, first, capital, commission, close=close) for p in strategy_grid]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=close.nbytes)
+        try:
+            np.ndarray(close.shape, dtype=close.dtype, buffer=shm.buf)[:] = close
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                     initializer=_attach,
+                                     initargs=(shm.name, close.shape, close.dtype.str)) as pool:
+                futures = [pool.submit(_evaluate, strategy, p, risk, first, capital, commission)
+                           for p in strategy_grid]
+                blocks = [f.result() for f in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    rows = []
+    for params, block in zip(strategy_grid, blocks):
+        for (sl, tp, size), (total, drawdown, sharpe, trades, win_rate) in zip(risk, block):
+            rows.append(dict(params, stop_loss=sl, take_profit=tp, position_size=size,
+                             total_return=total, max_drawdown=drawdown, sharpe=sharpe,
+                             trades=int(trades), win_rate=win_rate))
+    results = pd.DataFrame(rows)
+    return results.sort_values(rank_by, ascending=False, ignore_index=True)
+
+
+def heatmap_table(results, x, y, metric="sharpe"):
+    """Best metric value for each (y, x) pair, best over all other dimensions"""
+    return results.pivot_table(index=y, columns=x, values=metric, aggfunc="max")
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import write_fixtures  # noqa: E402
+from providers import safe_filename  # noqa: E402
+
+
+@pytest.fixture
+def replay_dir(tmp_path, monkeypatch):
+    """Replay fixture directory selected through the environment, like the app"""
+    root = tmp_path / "fixtures"
+    monkeypatch.setenv("SMART_TRADE_PROVIDER", "replay")
+    monkeypatch.setenv("SMART_TRADE_REPLAY_DIR", str(root))
+    return root
+
+
+def make_fixtures(root, tickers, bars=800, end="2025-12-31"):
+    write_fixtures(str(root), tickers, bars=bars, end=end)
+
+
+def fixture_path(root, ticker):
+    return os.path.join(str(root), f"{safe_filename(ticker)}.csv")
+
+
+def read_fixture(root, ticker):
+    return pd.read_csv(fixture_path(root, ticker), index_col=0, parse_dates=True)
+
+
+def write_fixture(root, ticker, df):
+    df.to_csv(fixture_path(root, ticker))
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import fixture_path, make_fixtures, read_fixture, write_fixture
+
+from bar_store import BarStore
+from providers import provider_from_env
+
+
+def _store(tmp_path, **options):
+    return BarStore(str(tmp_path / "bars"), provider_from_env(), **options)
+
+
+def _new_provider(store):
+    # ReplayProvider caches fixtures in memory; a new one rereads them
+    store.provider = provider_from_env()
+    return store.provider
+
+
+def test_refresh_merges_overlap_and_appends(replay_dir, tmp_path):
+    make_fixtures(replay_dir, ["TCS.NS"], bars=300)
+    full = read_fixture(replay_dir, "TCS.NS")
+    write_fixture(replay_dir, "TCS.NS", full.iloc[:290])
+    store = _store(tmp_path)
+    assert store.refresh("TCS.NS") == 290
+
+    # The forming bar is revised and ten new bars arrive
+    revised = full.copy()
+    revised.iloc[289, revised.columns.get_loc("Close")] *= 1.01
+    write_fixture(replay_dir, "TCS.NS", revised)
+    provider = _new_provider(store)
+    assert store.refresh("TCS.NS", force=True) == 10
+    assert provider.calls["history"] == 1
+
+    stored = store.load("TCS.NS")
+    assert len(stored) == 300
+    assert stored.index.equals(revised.index)
+    np.testing.assert_allclose(stored["Close"].to_numpy(), revised["Close"].to_numpy())
+
+
+def test_revised_history_triggers_full_reload(replay_dir, tmp_path):
+    make_fixtures(replay_dir, ["INFY.NS"], bars=300)
+    full = read_fixture(replay_dir, "INFY.NS")
+    write_fixture(replay_dir, "INFY.NS", full.iloc[:299])
+    store = _store(tmp_path)
+    store.refresh("INFY.NS")
+
+    # A 1:2 split re-adjusts the whole series, including settled overlap bars
+    adjusted = full.copy()
+    adjusted[["Open", "High", "Low", "Close"]] /= 2
+    write_fixture(replay_dir, "INFY.NS", adjusted)
+    provider = _new_provider(store)
+    store.refresh("INFY.NS", force=True)
+    # One update request from the overlap, then one full reload
+    assert provider.calls["history"] == 2
+    np.testing.assert_allclose(store.load("INFY.NS")["Close"].to_numpy(), adjusted["Close"].to_numpy())
+
+
+def test_refresh_many_makes_at_most_two_batched_calls(replay_dir, tmp_path):
+    tickers = ["TCS.NS", "INFY.NS", "ITC.NS", "LT.NS"]
+    make_fixtures(replay_dir, tickers, bars=200)
+    store = _store(tmp_path)
+    assert store.refresh_many(tickers[:2]) == {}
+
+    provider = _new_provider(store)
+    errors = store.refresh_many(tickers + ["MISSING.NS"], force=True)
+    assert list(errors) == ["MISSING.NS"]
+    assert provider.calls["history_many"] == 2
+    assert provider.calls["history"] == 0
+    assert all(len(store.load(t)) == 200 for t in tickers)
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_failed_refresh_backs_off(replay_dir, tmp_path, batched):
+    make_fixtures(replay_dir, ["ITC.NS"], bars=100)
+    store = _store(tmp_path, min_refresh_interval=300)
+    store.refresh("ITC.NS")
+    os.utime(store.path("ITC.NS"), (0, 0))  # stored bars are stale
+
+    os.remove(fixture_path(replay_dir, "ITC.NS"))  # upstream outage
+    provider = _new_provider(store)
+    for _ in range(3):
+        if batched:
+            store.get_many(["ITC.NS"], "1mo")
+        else:
+            assert len(store.get("ITC.NS", "max")) == 100
+    assert provider.calls["history"] + provider.calls["history_many"] == 1
+    assert store.is_fresh("ITC.NS")
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from conftest import make_fixtures
+
+from fundamentals import FundamentalsStore
+from providers import provider_from_env
+
+
+class _Outage:
+    def __init__(self):
+        self.calls = 0
+
+    def info(self, ticker):
+        self.calls += 1
+        raise ConnectionError("upstream down")
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_failed_fetch_backs_off(replay_dir, tmp_path, stored):
+    make_fixtures(replay_dir, ["ITC.NS"], bars=50)
+    store = FundamentalsStore(str(tmp_path / "fundamentals"), provider_from_env(), max_age=300)
+    if stored:
+        assert store.get("ITC.NS").marketCap > 0
+        with store._lock:
+            store._records["updated"] = 0  # stored record is stale
+
+    store.provider = outage = _Outage()
+    if not stored:
+        with pytest.raises(RuntimeError):
+            store.get("ITC.NS")
+    for _ in range(3):
+        record = store.get("ITC.NS")
+        assert (record.marketCap > 0) == stored
+    assert store.refresh_many(["ITC.NS"]) == {}
+    assert outage.calls == 1
+
+    # Once the failure is max_age old the ticker is retried
+    store._failed_at["ITC.NS"] = time.time() - 300
+    store.provider = provider_from_env()
+    assert store.get("ITC.NS").marketCap > 0
+    assert store.is_fresh("ITC.NS") and "ITC.NS" not in store._failed_at
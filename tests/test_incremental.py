@@ -0,0 +1,33 @@
+import numpy as np
+
+from conftest import make_fixtures, read_fixture, write_fixture
+
+import indicators
+from bar_store import BarStore
+from incremental import DEFAULT_STREAMING, refresh_state
+from providers import provider_from_env
+
+TICKER = "INFY.NS"
+
+
+def test_refresh_state_feeds_only_new_bars(replay_dir, tmp_path):
+    make_fixtures(replay_dir, [TICKER], bars=300)
+    full = read_fixture(replay_dir, TICKER)
+    write_fixture(replay_dir, TICKER, full.iloc[:-1])
+    store = BarStore(str(tmp_path / "bars"), provider_from_env())
+    store.refresh(TICKER)
+
+    state = refresh_state(store, TICKER)
+    assert state.bars == len(full) - 1
+    assert store.load_state(TICKER, "indicators") is not None
+
+    write_fixture(replay_dir, TICKER, full)
+    store.provider = provider_from_env()
+    store.refresh(TICKER, force=True)
+    state = refresh_state(store, TICKER)
+    # The stored last bar is fed again (it may have been revised), then the new one
+    assert state.bars == len(full)
+
+    batch = indicators.compute(store.load(TICKER)['Close'].to_numpy(), None, None, DEFAULT_STREAMING)
+    for name, value in state.values().items():
+        assert np.isclose(value, batch[name][-1], rtol=1e-9), name
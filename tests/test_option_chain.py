@@ -0,0 +1,52 @@
+import importlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+import options_pricing
+from option_chain import OptionChainStore, ticker_for
+
+
+def _bhavcopy(path, underlying="NIFTY", spot=24000.0):
+    # NSE-style rows: bare underlying symbol, CE/PE types, no IV column
+    strikes = options_pricing.strike_ladder(spot, 11)
+    expiry = pd.Timestamp("2026-01-27")
+    rows = []
+    for option_type in ("CE", "PE"):
+        ltp = options_pricing.price(spot, strikes, 20 / 365, sigma=0.15, is_call=option_type == "CE")
+        rows.append(pd.DataFrame({
+            "TIMESTAMP": "2026-01-06 15:30", "UNDERLYING": underlying, "UNDERLYING_PRICE": spot,
+            "EXPIRY": expiry.date(), "STRIKE": strikes, "OPTION_TYPE": option_type,
+            "LTP": np.round(ltp, 2), "VOLUME": 100, "OI": 1000,
+        }))
+    pd.concat(rows).to_csv(path, index=False)
+    return len(strikes) * 2
+
+
+def test_ticker_for_maps_nse_symbols():
+    assert ticker_for("NIFTY") == "^NSEI"
+    assert ticker_for("BANKNIFTY") == "^NSEBANK"
+    assert ticker_for("reliance") == "RELIANCE.NS"
+    assert ticker_for("^NSEI") == "^NSEI"
+    assert ticker_for("TCS.NS") == "TCS.NS"
+
+
+def test_ingested_bhavcopy_is_found_by_app_ticker(replay_dir, tmp_path, monkeypatch):
+    rows = _bhavcopy(tmp_path / "nifty.csv")
+    _bhavcopy(tmp_path / "reliance.csv", "RELIANCE", 1400.0)
+    monkeypatch.setenv("SMART_TRADE_DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("SMART_TRADE_PREFETCH", "0")
+    monkeypatch.setenv("SMART_TRADE_OPTION_CHAINS", str(tmp_path / "*.csv"))
+    sys.modules.pop("app", None)
+    app = importlib.import_module("app")
+    app.get_option_chain_store.clear()
+
+    table, synthetic = app.get_option_chain("^NSEI")
+    assert not synthetic
+    assert len(table) == rows
+    assert table.snapshot().spot == 24000.0
+    assert not app.get_option_chain("RELIANCE.NS")[1]
+
+    # Stored tables survive a restart under the same key
+    assert len(OptionChainStore(app.get_option_chain_store().root).table("^NSEI")) == rows
@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+import option_strategies
+from option_strategies import STRATEGIES, analyze, build, payoff, pnl_surface, strike_choices
+from options_pricing import norm_cdf
+
+SPOT, T, SIGMA, R = 24000.0, 30 / 365, 0.15, 0.065
+
+
+def _probability_above(x):
+    mean = math.log(SPOT) + (R - 0.5 * SIGMA ** 2) * T
+    return 1 - float(norm_cdf((math.log(x) - mean) / (SIGMA * math.sqrt(T))))
+
+
+def _legs(strategy, moneyness=0.0):
+    return build(strategy, SPOT, T, SIGMA, R, moneyness, width=1200, step=50)
+
+
+def test_long_call():
+    (call,) = _legs("Long Call", 0.10)
+    result = analyze([call], SPOT, T, SIGMA, R)
+    assert call.strike == 26400 and call.quantity == 1
+    assert result["max_profit"] == math.inf
+    assert result["max_loss"] == pytest.approx(-call.premium)
+    assert result["breakevens"] == [pytest.approx(call.strike + call.premium)]
+    assert result["probability_of_profit"] == pytest.approx(_probability_above(call.strike + call.premium))
+    assert payoff([call], [call.strike + 500])[0] == pytest.approx(500 - call.premium)
+
+
+def test_long_put():
+    (put,) = _legs("Long Put", -0.10)
+    result = analyze([put], SPOT, T, SIGMA, R)
+    assert put.strike == 26400
+    assert result["max_profit"] == pytest.approx(put.strike - put.premium)
+    assert result["max_loss"] == pytest.approx(-put.premium)
+    assert result["breakevens"] == [pytest.approx(put.strike - put.premium)]
+    assert result["probability_of_profit"] == pytest.approx(1 - _probability_above(put.strike - put.premium))
+
+
+@pytest.mark.parametrize("moneyness, strike", [(0.0, 24000), (0.10, 26400), (-0.10, 21600)])
+def test_covered_call(moneyness, strike):
+    stock, call = _legs("Covered Call", moneyness)
+    assert stock.kind == "stock" and call.strike == strike and call.quantity == -1
+    result = analyze([stock, call], SPOT, T, SIGMA, R)
+    assert result["max_profit"] == pytest.approx(strike - SPOT + call.premium)
+    assert result["max_loss"] == pytest.approx(-(SPOT - call.premium))
+    assert result["breakevens"] == [pytest.approx(SPOT - call.premium)]
+    assert result["net_premium"] == pytest.approx(SPOT - call.premium)
+
+
+def test_bull_spread():
+    long_call, short_call = _legs("Bull Spread")
+    debit = long_call.premium - short_call.premium
+    result = analyze([long_call, short_call], SPOT, T, SIGMA, R)
+    assert short_call.strike - long_call.strike == 1200
+    assert result["max_profit"] == pytest.approx(1200 - debit)
+    assert result["max_loss"] == pytest.approx(-debit)
+    assert result["breakevens"] == [pytest.approx(long_call.strike + debit)]
+
+
+@pytest.mark.parametrize("moneyness", [0.0, 0.10])
+def test_iron_condor(moneyness):
+    legs = _legs("Iron Condor", moneyness)
+    strikes = [leg.strike for leg in legs]
+    assert strikes == sorted(strikes) and len(set(strikes)) == 4
+    assert [leg.quantity for leg in legs] == [1, -1, -1, 1]
+    credit = -option_strategies.net_premium(legs)
+    result = analyze(legs, SPOT, T, SIGMA, R)
+    assert credit > 0
+    assert result["max_profit"] == pytest.approx(credit)
+    assert result["max_loss"] == pytest.approx(-(1200 - credit))
+    assert result["breakevens"] == [pytest.approx(strikes[1] - credit), pytest.approx(strikes[2] + credit)]
+    assert 0 < result["probability_of_profit"] < 1
+
+
+def test_iron_condor_rejects_itm_strikes():
+    assert "ITM 10%" not in strike_choices("Iron Condor")
+    with pytest.raises(ValueError):
+        _legs("Iron Condor", -0.10)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_every_offered_strike_builds(strategy):
+    for moneyness in strike_choices(strategy).values():
+        legs = _legs(strategy, moneyness)
+        spots = np.linspace(SPOT * 0.7, SPOT * 1.3, 61)
+        # Valued at expiry, the surface is the payoff
+        surface = pnl_surface(legs, spots, [T * 365], [SIGMA], T, R)
+        np.testing.assert_allclose(surface[:, 0, 0], payoff(legs, spots), atol=1e-6)
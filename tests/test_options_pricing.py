@@ -0,0 +1,109 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+import options_pricing
+from options_pricing import expiry_dates, greeks, implied_volatility, price, years_to
+
+S, R, Q = 100.0, 0.065, 0.02
+K = np.array([60.0, 90.0, 100.0, 110.0, 160.0])
+T = np.array([[0.02], [0.25], [2.0]])
+
+
+def test_put_call_parity():
+    for sigma in (0.05, 0.3, 1.2):
+        call = price(S, K, T, R, sigma, Q, is_call=True)
+        put = price(S, K, T, R, sigma, Q, is_call=False)
+        np.testing.assert_allclose(call - put, S * np.exp(-Q * T) - K * np.exp(-R * T), atol=1e-9)
+
+
+def test_fallback_normal_cdf(monkeypatch):
+    x = np.linspace(-6, 6, 121)
+    expected = options_pricing.norm_cdf(x)
+    monkeypatch.setattr(options_pricing, "ndtr", None)
+    np.testing.assert_allclose(options_pricing.norm_cdf(x), expected, atol=1e-7)
+
+
+@pytest.mark.parametrize("is_call", [True, False])
+def test_greeks_match_finite_differences(is_call):
+    sigma = 0.25
+    g = greeks(S, K, T, R, sigma, Q, is_call)
+
+    def value(s=S, t=T, r=R, v=sigma):
+        return price(s, K, t, r, v, Q, is_call)
+
+    h = 1e-3
+    np.testing.assert_allclose(g["price"], value(), atol=1e-12)
+    np.testing.assert_allclose(g["delta"], (value(s=S + h) - value(s=S - h)) / (2 * h), atol=1e-6)
+    np.testing.assert_allclose(g["gamma"], (value(s=S + h) - 2 * value() + value(s=S - h)) / h ** 2, atol=1e-4)
+    # vega and rho per percentage point, theta per calendar day
+    np.testing.assert_allclose(g["vega"], (value(v=sigma + 1e-5) - value(v=sigma - 1e-5)) / 2e-5 / 100, atol=1e-6)
+    np.testing.assert_allclose(g["rho"], (value(r=R + 1e-5) - value(r=R - 1e-5)) / 2e-5 / 100, atol=1e-6)
+    dt = 1e-5
+    theta = -(value(t=T + dt) - value(t=T - dt)) / (2 * dt) / options_pricing.DAYS_PER_YEAR
+    np.testing.assert_allclose(g["theta"], theta, atol=1e-6)
+
+
+def test_expired_options_are_intrinsic():
+    g = greeks(S, K, 0.0, is_call=True)
+    np.testing.assert_allclose(g["price"], np.maximum(S - K, 0))
+    np.testing.assert_array_equal(g["delta"], (S > K).astype(float))
+    assert not np.any(g["gamma"]) and not np.any(g["vega"])
+
+
+@pytest.mark.parametrize("is_call", [True, False])
+def test_implied_volatility_round_trip(is_call):
+    strikes = np.linspace(50, 200, 31)
+    sigmas = np.array([0.05, 0.15, 0.4, 0.9, 2.0])[:, None, None]
+    years = np.array([1 / 365, 0.05, 0.5, 3.0])[None, :, None]
+    quotes = price(S, strikes, years, R, sigmas, Q, is_call)
+    solved = implied_volatility(quotes, S, strikes, years, R, Q, is_call)
+    assert solved.shape == quotes.shape
+
+    lower = np.where(is_call, np.maximum(S * np.exp(-Q * years) - strikes * np.exp(-R * years), 0),
+                     np.maximum(strikes * np.exp(-R * years) - S * np.exp(-Q * years), 0))
+    informative = quotes - lower > 1e-6 * S
+    # Deep ITM/OTM quotes without time value carry no volatility information
+    assert np.all(np.isnan(solved[~informative]))
+    assert informative.sum() > informative.size // 2
+    # Every informative quote is repriced within the solver tolerance...
+    repriced = price(S, strikes, years, R, np.where(informative, solved, 0.2), Q, is_call)
+    assert np.all(np.abs(repriced - quotes)[informative] <= 1e-6 * np.maximum(quotes, 1.0)[informative])
+    # ...which pins the volatility down to that tolerance over vega
+    vega = greeks(S, strikes, years, R, sigmas, Q, is_call)["vega"] * 100
+    sensitive = informative & (vega > 1.0)
+    assert sensitive.sum() > informative.sum() // 2
+    error = np.abs(solved - sigmas)[sensitive]
+    assert np.all(error <= 1e-6 * np.maximum(quotes, 1.0)[sensitive] / vega[sensitive] * 1.5)
+
+
+def test_implied_volatility_with_tiny_vega():
+    # Far OTM one day before expiry: vega is ~1e-7 but the quote still has time value
+    quote = price(S, 130.0, 1 / 365, R, 1.5, is_call=True)
+    assert greeks(S, 130.0, 1 / 365, R, 1.5)["vega"] < 1e-2
+    with np.errstate(over="raise", divide="raise", invalid="raise"):
+        assert implied_volatility(quote, S, 130.0, 1 / 365, R) == pytest.approx(1.5, rel=1e-3)
+
+
+def test_implied_volatility_out_of_bounds_is_nan():
+    call = price(S, 100.0, 0.5, R, 0.3)
+    quotes = np.array([call, -1.0, 0.0, S * 1.01, 1e-9])
+    assert np.all(np.isnan(implied_volatility(quotes[1:], S, 100.0, 0.5, R)))
+    assert np.isnan(implied_volatility(call, S, 100.0, 0.0, R))  # expired
+    assert np.isnan(implied_volatility(39.0, S, 60.0, 0.5, R))  # below intrinsic
+    assert implied_volatility(call, S, 100.0, 0.5, R) == pytest.approx(0.3, rel=1e-4)
+
+
+def test_expiry_dates_tuesdays_and_month_end():
+    # 6 Jan 2026 is itself a Tuesday expiry; the monthly is the last Tuesday
+    assert expiry_dates(date(2026, 1, 6), weekly=2, monthly=2) == [
+        date(2026, 1, 6), date(2026, 1, 13), date(2026, 1, 27), date(2026, 2, 24)]
+    # 31 Mar 2026 is the last Tuesday of March: weekly and monthly coincide
+    assert expiry_dates(date(2026, 3, 31), weekly=1, monthly=1) == [date(2026, 3, 31)]
+    # After April's last Tuesday (28th) the next monthly is May's (26th)
+    assert expiry_dates(date(2026, 4, 29), weekly=1, monthly=1) == [date(2026, 5, 5), date(2026, 5, 26)]
+    # December rolls into the next year
+    assert expiry_dates(date(2026, 12, 30), weekly=0, monthly=1) == [date(2027, 1, 26)]
+    assert all(d.weekday() == options_pricing.EXPIRY_WEEKDAY for d in expiry_dates(date(2026, 2, 1)))
+    assert years_to(date(2026, 1, 6), date(2026, 1, 6)) == 0.25 / options_pricing.DAYS_PER_YEAR
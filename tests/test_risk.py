@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from risk import ReturnMoments
+
+
+def _prices(rows=300, tickers=5, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (rows, tickers))
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=pd.bdate_range("2024-01-01", periods=rows),
+                        columns=[f"S{i}" for i in range(tickers)])
+
+
+def test_revised_bar_and_sliding_window_stay_incremental():
+    prices = _prices()
+    moments = ReturnMoments(prices.columns)
+    window = prices.iloc[:250].copy()
+    assert moments.update(window) == 249
+
+    # The forming bar moves intraday: only its return row is replaced
+    window.iloc[-1] *= 1.003
+    assert moments.update(window) == 1
+    assert len(moments) == 249
+
+    # The next bar arrives and the window slides by one
+    slid = prices.iloc[1:251].copy()
+    slid.iloc[-2] = window.iloc[-1]
+    assert moments.update(slid) == 1
+
+    fresh = ReturnMoments(prices.columns)
+    fresh.update(slid)
+    assert moments.index.equals(fresh.index)
+    np.testing.assert_allclose(moments.covariance(), fresh.covariance(), atol=1e-15)
+    np.testing.assert_allclose(moments.covariance(), np.cov(fresh.returns.T), atol=1e-15)
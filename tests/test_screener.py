@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_fixtures, read_fixture
+
+import indicators
+from screener import metric_table, screen
+
+
+def test_metric_row_matches_ticker_alone(tmp_path):
+    make_fixtures(tmp_path, ["TCS.NS", "AAPL"], bars=400)
+    nse = read_fixture(tmp_path, "TCS.NS")
+    us = read_fixture(tmp_path, "AAPL")
+    # Different holiday calendars and history lengths
+    nse = nse.drop(nse.index[[-3, -20, -45]])
+    us = us.iloc[50:].drop(us.index[[-2, -10]])
+    table = metric_table({"TCS.NS": nse, "AAPL": us})
+
+    for ticker, df in (("TCS.NS", nse), ("AAPL", us)):
+        close = df['Close'].to_numpy(dtype=float)
+        own = indicators.compute(close, df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float))
+        row = table.loc[ticker]
+        for name in ("rsi14", "sma20", "macd_hist", "bb_upper", "atr14"):
+            assert np.isclose(row[name], own[name][-1], rtol=1e-9), (ticker, name)
+        assert np.isclose(row["volatility20"], own["volatility20"][-1] * np.sqrt(252) * 100)
+        assert np.isclose(row["return_1m"], (close[-1] / close[-22] - 1) * 100)
+
+
+def test_screen_filters_and_sorts():
+    table = pd.DataFrame({"rsi14": [25.0, 45.0, 28.0], "pe": [12.0, 8.0, 30.0]},
+                         index=pd.Index(["A", "B", "C"], name="Ticker"))
+    assert list(screen(table, "rsi14 < 30 and pe < 20").index) == ["A"]
+    assert list(screen(table, sort_by="rsi14").index) == ["B", "C", "A"]
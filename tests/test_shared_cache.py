@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from instrumentation import METRICS, note_error
+from shared_cache import cached
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(METRICS, "enabled", True)
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+def _wait_idle(cache):
+    deadline = time.monotonic() + 5
+    while cache.busy() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_background_refresh_errors_reach_metrics(metrics):
+    calls = []
+
+    @cached("test_refresh_errors", ttl=0, stale_ttl=60)
+    def load(ticker):
+        calls.append(ticker)
+        if len(calls) == 2:
+            note_error("no data returned")
+        if len(calls) == 3:
+            raise RuntimeError("upstream down")
+        return len(calls)
+
+    assert load("TCS.NS") == 1
+    for _ in range(2):
+        # Stale value is served while the refresh runs on its own thread
+        load("TCS.NS")
+        _wait_idle(load.cache)
+
+    assert len(calls) == 3
+    assert metrics.errors[("test_refresh_errors", "TCS.NS")] == 2
+    assert load.cache.stats["errors"] == 1
+    assert [e["error"] for e in metrics.recent_errors()] == ["RuntimeError: upstream down"]
+    assert 'errors_total{function="test_refresh_errors",ticker="TCS.NS"} 2' in metrics.prometheus()
@@ -0,0 +1,39 @@
+import threading
+
+from conftest import make_fixtures, read_fixture
+
+from forecasting import ForecastCache
+from signals import SignalEngine, SignalStore
+
+TICKERS = ["TCS.NS", "INFY.NS", "ITC.NS"]
+
+
+def test_start_fills_the_store_in_the_background(tmp_path):
+    make_fixtures(tmp_path, TICKERS, bars=600)
+    frames = {t: read_fixture(tmp_path, t) for t in TICKERS}
+    release = threading.Event()
+
+    def load_bars(ticker):
+        if ticker != TICKERS[0]:
+            release.wait(10)
+        return frames[ticker]
+
+    store = SignalStore(str(tmp_path / "signals"))
+    forecasts = ForecastCache()
+    engine = SignalEngine(store, load_bars, forecasts.get, pause=0.01)
+    assert engine.start(TICKERS)
+    assert not engine.start(TICKERS)  # one run at a time
+
+    # The first signal is readable while the rest of the run is blocked
+    for _ in range(500):
+        if len(store):
+            break
+        release.wait(0.02)
+    assert engine.running
+    assert list(store.table().index) == [TICKERS[0]]
+
+    release.set()
+    engine._thread.join(30)
+    assert not engine.running
+    assert sorted(store.table().index) == sorted(TICKERS)
+    assert engine.last_run is not None
@@ -0,0 +1,71 @@
+import os
+import pickle
+
+import numpy as np
+
+from conftest import make_fixtures, read_fixture, write_fixture
+
+from bar_store import BarStore
+from forecasting import ForecastCache, HorizonModel
+from model_registry import ModelRegistry
+from providers import provider_from_env
+from train_models import registry_root, train_one
+
+TICKER = "TCS.NS"
+
+
+def _refresh(data_dir):
+    provider = provider_from_env()
+    store = BarStore(os.path.join(data_dir, "bars", provider.name), provider)
+    store.refresh(TICKER, force=True)
+    return store
+
+
+def test_sliding_window_warm_starts_registry_model(replay_dir, tmp_path):
+    make_fixtures(replay_dir, [TICKER], bars=801, end="2025-12-30")
+    full = read_fixture(replay_dir, TICKER)
+    data_dir = str(tmp_path / "data")
+
+    write_fixture(replay_dir, TICKER, full.iloc[:-1])
+    _refresh(data_dir)
+    first = train_one(TICKER, data_dir, period="2y", validated=False)
+    assert first["status"] == "ok" and not first["warm_start"]
+
+    registry = ModelRegistry(registry_root(data_dir, "replay"))
+    before = registry.load(TICKER, mmap_mode=None)
+    samples = before.models["next_day"].samples
+
+    # One more bar: the 2y window now starts a bar later
+    write_fixture(replay_dir, TICKER, full)
+    store = _refresh(data_dir)
+    second = train_one(TICKER, data_dir, period="2y", validated=False)
+    assert second["status"] == "ok"
+    assert second["warm_start"]
+    assert second["new_rows"] == len(before.horizons)
+    after = registry.load(TICKER, mmap_mode=None)
+    assert after.models["next_day"].samples == samples + 1
+
+    # The app's cache continues the registry model on the slid window too
+    cache = ForecastCache(loader=lambda t: registry.load(t, version=first["version"]))
+    window = store.get(TICKER, "2y", refresh=False)
+    assert window.index[0] != before.origin
+    assert cache.get(TICKER, window) is not None
+    assert cache.model(TICKER).models["next_day"].samples == samples + 1
+
+
+def test_running_mae_survives_old_artifacts():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(300, 4)), rng.normal(0, 0.01, 300)
+    model = HorizonModel()
+    model.fit(X, y)
+    predicted = model.predict(X[-10:])
+    before = model.absolute_error
+    model.update(X[-10:], y[-10:])
+    assert np.isclose(model.absolute_error - before, np.sum(np.abs(predicted - y[-10:])))
+    assert model.mae <= model.rmse
+
+    # A model pickled before absolute_error existed loads with an unknown MAE
+    del model.__dict__["absolute_error"]
+    old = pickle.loads(pickle.dumps(model))
+    old.update(X[:5], y[:5])
+    assert np.isnan(old.mae) and not np.isnan(old.rmse)
@@ -0,0 +1,19 @@
+import json
+
+from conftest import make_fixtures, read_fixture
+
+from validation import CALIBRATION_BINS, validate
+
+
+def test_validate_reports_calibration_per_horizon(tmp_path):
+    make_fixtures(tmp_path, ["TCS.NS"], bars=400)
+    result = validate(read_fixture(tmp_path, "TCS.NS"), jobs=1)
+    assert result
+    for name, metrics in result.items():
+        bins = metrics["calibration"]
+        assert len(bins) == CALIBRATION_BINS, name
+        assert sum(b["samples"] for b in bins) == metrics["samples"]
+        predicted = [b["predicted"] for b in bins]
+        assert predicted == sorted(predicted)
+    # Stored as registry metadata
+    assert json.loads(json.dumps(result)) == result
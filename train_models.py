@@ -0,0 +1,113 @@
+"""Train forecasting models for the whole universe into the model registry.
+
+Run alongside the app (never from it), e.g. from cron after the close:
+
+    python train_models.py                         # every stock in app.py
+    python train_models.py --tickers TCS.NS INFY.NS --jobs 4
+    python train_models.py --full                  # ignore stored models
+
+Bars are refreshed once in the parent with batched fetches; tickers are then
+trained in parallel worker processes (joblib), each writing a new version to
+the registry. A stored model whose last trained bars are still in the
+history window is warm-started and only learns the bars it has not seen, so
+nightly runs over a sliding ``--period`` window are incremental. Each version's metadata also records a walk-forward validation
+(validation.py) of the ticker, which the app shows as forecast confidence.
+The app loads these models lazily on first use.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+from joblib import Parallel, delayed
+
+from bar_store import BarStore
+from forecasting import ForecastModel
+from model_registry import ModelRegistry
+from providers import provider_from_env
+from validation import validate
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("SMART_TRADE_DATA_DIR", os.path.join(HERE, ".market_data"))
+
+
+def registry_root(data_dir, provider_name):
+    return os.path.join(data_dir, "models", provider_name)
+
+
+def universe(path=os.path.join(HERE, "app.py")):
+    """Stock tickers of app.py (indices are not forecast)"""
+    from bench import app_tickers
+    return [t for t in app_tickers(path) if not t.startswith("^")]
+
+
+def train_one(ticker, data_dir, period="5y", full=False, validated=True):
+    """Train (or warm-start) one ticker and save a new registry version. Returns a result row"""
+    started = time.perf_counter()
+    provider = provider_from_env()
+    store = BarStore(os.path.join(data_dir, "bars", provider.name), provider)
+    registry = ModelRegistry(registry_root(data_dir, provider.name))
+    try:
+        df = store.get(ticker, period, refresh=False)
+        if df.empty:
+            return {"ticker": ticker, "status": "no data"}
+        model = None if full else registry.load(ticker, mmap_mode=None)
+        warm = model is not None and model.continues(df)
+        if not warm:
+            model = ForecastModel()
+            model.origin = df.index[0]
+        added = model.update(df)
+        if not any(m.samples for m in model.models.values()):
+            return {"ticker": ticker, "status": "too little history", "bars": len(df)}
+        if warm and not added:
+            return {"ticker": ticker, "status": "ok", "version": registry.latest(ticker), "warm_start": True,
+                    "new_rows": 0, "bars": len(df), "seconds": round(time.perf_counter() - started, 3)}
+        metadata = dict(model.metadata(), provider=provider.name, period=period, bars=len(df),
+                        train_start=df.index[0].isoformat(), train_end=df.index[-1].isoformat(),
+                        warm_start=warm, new_rows=added)
+        if validated:
+            # Threads inside a worker process would only oversubscribe the cores
+            metadata["validation"] = validate(df, jobs=1)
+        version = registry.save(ticker, model, metadata)
+        return {"ticker": ticker, "status": "ok", "version": version, "warm_start": warm, "new_rows": added,
+                "bars": len(df), "seconds": round(time.perf_counter() - started, 3),
+                **{f"{name}_hit_rate": m["hit_rate"] for name, m in metadata["metrics"].items()}}
+    except Exception as e:
+        return {"ticker": ticker, "status": f"error: {e}"}
+
+
+def train_universe(tickers, data_dir=DATA_DIR, period="5y", jobs=-1, full=False, refresh=True, validated=True):
+    """Refresh bars for tickers, then train them in parallel. Returns a result DataFrame"""
+    if refresh:
+        provider = provider_from_env()
+        store = BarStore(os.path.join(data_dir, "bars", provider.name), provider)
+        store.refresh_many(tickers)
+    rows = Parallel(n_jobs=jobs)(delayed(train_one)(t, data_dir, period, full, validated) for t in tickers)
+    return pd.DataFrame(rows).set_index("ticker")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train forecasting models into the local model registry")
+    parser.add_argument("--tickers", nargs="+", help="tickers to train (default: every stock in app.py)")
+    parser.add_argument("--period", default="5y", help="history used for training (default 5y)")
+    parser.add_argument("--jobs", type=int, default=-1, help="worker processes (default: one per core)")
+    parser.add_argument("--full", action="store_true", help="retrain from scratch instead of warm-starting")
+    parser.add_argument("--no-validate", action="store_true", help="skip walk-forward validation")
+    parser.add_argument("--no-refresh", action="store_true", help="train on the stored bars without fetching")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers or universe()
+    started = time.perf_counter()
+    results = train_universe(tickers, args.data_dir, args.period, args.jobs, args.full,
+                               not args.no_refresh, not args.no_validate)
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        print(results)
+    failed = results[results["status"] != "ok"]
+    print(f"trained {len(results) - len(failed)}/{len(results)} tickers in {time.perf_counter() - started:.1f}s")
+    return 1 if len(failed) == len(results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Walk-forward validation of the forecasting models.
+
+The history is cut into consecutive test windows of ``test_size`` bars. For
+each window a fresh model is trained on the bars before it (expanding, or
+the last ``train_size`` bars) and scored on the window, so every prediction
+is out of sample. Training rows whose forward return would reach into the
+test window are dropped to avoid look-ahead.
+
+Features and targets are computed once for the whole history and shared by
+every window. Windows run on a thread pool: the SGD inner loop releases the
+GIL, and threads share the feature matrix without copying it.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from forecasting import HORIZONS, INITIAL_EPOCHS, HorizonModel, features, forward_returns
+
+MIN_TRAIN = 252
+TEST_SIZE = 21
+CALIBRATION_BINS = 5
+
+
+def _window(X, y, valid, start, split, end, horizon, seed):
+    # Train on labeled rows [start, split - horizon), predict rows [split, end)
+    train = np.flatnonzero(valid[start:split - horizon]) + start
+    test = np.flatnonzero(valid[split:end]) + split
+    if len(train) < MIN_TRAIN // 2 or not len(test):
+        return None
+    model = HorizonModel(seed)
+    model._partial_fit(X[train], y[train], epochs=INITIAL_EPOCHS)
+    residual = float(np.std(model.predict(X[train]) - y[train]))
+    return test, model.predict(X[test]), residual
+
+
+def walk_forward(df, horizons=HORIZONS, train_size=None, test_size=TEST_SIZE, min_train=MIN_TRAIN,
+                 jobs=-1, seed=0):
+    """Out-of-sample predictions for every horizon over rolling windows.
+
+    Returns a DataFrame with one row per (date, horizon): the predicted and
+    realized forward log return and the training residual std of the model
+    that made the prediction. ``train_size=None`` trains on all prior bars.
+    """
+    if df is None or len(df) < min_train + test_size:
+        return pd.DataFrame(columns=["horizon", "predicted", "realized", "residual"])
+    X = features(df)
+    close = df['Close'].to_numpy(dtype=float)
+    valid_x = ~np.isnan(X).any(axis=1)
+    targets = {name: forward_returns(close, h) for name, h in horizons.items()}
+
+    tasks = []
+    for name, horizon in horizons.items():
+        y = targets[name]
+        valid = valid_x & ~np.isnan(y)
+        for split in range(min_train, len(df), test_size):
+            start = 0 if train_size is None else max(0, split - train_size)
+            tasks.append((name, (X, y, valid, start, split, min(split + test_size, len(df)), horizon, seed)))
+
+    results = Parallel(n_jobs=jobs, prefer="threads")(delayed(_window)(*args) for _, args in tasks)
+
+    frames = []
+    for (name, args), result in zip(tasks, results):
+        if result is None:
+            continue
+        test, predicted, residual = result
+        frames.append(pd.DataFrame({"horizon": name, "predicted": predicted, "realized": args[1][test],
+                                    "residual": residual}, index=df.index[test]))
+    if not frames:
+        return pd.DataFrame(columns=["horizon", "predicted", "realized", "residual"])
+    return pd.concat(frames)
+
+
+def summarize(predictions, horizons=HORIZONS):
+    """Per-horizon hit rate, MAE, RMSE and band coverage of walk_forward() output.
+
+    Returns are in fractions. ``coverage`` is the share of realized returns
+    inside the +/- one residual std band (0.68 when the spread is calibrated).
+    """
+    rows = {}
+    for name in horizons:
+        p = predictions[predictions["horizon"] == name]
+        if p.empty:
+            continue
+        error = p["predicted"] - p["realized"]
+        rows[name] = {
+            "samples": len(p),
+            "hit_rate": float(np.mean(np.sign(p["predicted"]) == np.sign(p["realized"]))),
+            "mae": float(error.abs().mean()),
+            "rmse": float(math.sqrt((error ** 2).mean())),
+            "coverage": float(np.mean(error.abs() <= p["residual"])),
+            "baseline_mae": float(p["realized"].abs().mean()),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def calibration(predictions, horizon, bins=CALIBRATION_BINS):
+    """Mean predicted vs realized return and hit rate per predicted-return quantile bin"""
+    p = predictions[predictions["horizon"] == horizon]
+    if len(p) < bins:
+        return pd.DataFrame(columns=["predicted", "realized", "hit_rate", "samples"])
+    bucket = pd.qcut(p["predicted"].rank(method="first"), bins, labels=False)
+    hit = np.sign(p["predicted"]) == np.sign(p["realized"])
+    grouped = p.assign(hit=hit).groupby(bucket)
+    return pd.DataFrame({
+        "predicted": grouped["predicted"].mean(),
+        "realized": grouped["realized"].mean(),
+        "hit_rate": grouped["hit"].mean(),
+        "samples": grouped.size(),
+    }).rename_axis("bin")
+
+
+def _json_row(row):
+    return {k: (int(v) if k == "samples" else float(v)) for k, v in row.items()}
+
+
+def validate(df, horizons=HORIZONS, **options):
+    """walk_forward() + summarize() as a JSON-serializable {horizon: metrics} dict.
+
+    Each horizon's metrics include ``calibration``: the calibration() bins
+    as a list of rows, lowest predicted return first.
+    """
+    predictions = walk_forward(df, horizons, **options)
+    summary = summarize(predictions, horizons)
+    return {name: dict(_json_row(row),
+                       calibration=[_json_row(b) for b in calibration(predictions, name).to_dict(orient="records")])
+            for name, row in summary.to_dict(orient="index").items()}